@@ -0,0 +1,450 @@
+"""Persistent structure_ctx cache — lazy, per channel, memory-mapped.
+
+A render's ctx is a LazyCtx: a graph of Channels (photo.GRAPH, plus the
+sidecar channels render adds), each computed on first access from its
+upstream channels and the few source params it declares. A genome that
+only hatches never pays for Canny; one that changes only n_bands reuses
+gray, the tensor field and edges, and recomputes tone_bands alone.
+
+Every channel is cached under its own key: photo + sidecar bytes, the
+params it reads, the keys of its inputs, its function, and a digest of
+the source it comes from (its function's module and this one, see
+source_digest) — edit the extraction and its channels re-key themselves;
+ENGINE_VERSION is left for what the source cannot show (a cv2 upgrade).
+Two layers, so fresh preview subprocesses, m1 runs, review builds and
+test runs open warm channels instead of recomputing them:
+
+  in memory  CHANNEL_CACHE, a byte-bounded LRU shared by every ctx of
+             the process
+  on disk    <dir>/<key[:2]>/<key>/0.npy 1.npy ... meta.json
+
+Arrays are uncompressed .npy, loaded with mmap_mode="r": a warm channel
+opens in milliseconds, several processes share one page-cache copy, and
+the channels are read-only (nothing downstream may write into a ctx
+array).
+
+Location: $GART_CTX_CACHE (a directory, or "off"), else runs/ctx_cache.
+Bounded by $GART_CTX_DISK_MB (default 4096): every write prunes the
+least recently used entries (last load or write) past it, so stale keys
+age out instead of piling up.
+
+Every render sees its ctx through a CtxView: base channels are shared
+read-only, anything a render writes (plan_masses, plan_outline_mask, ...)
+lands in the view's overlay and dies with it, and channels derived purely
+from the base (emphasis distance maps) go through derived() — memoized
+across renders under their own budget.
+"""
+
+import dataclasses
+import functools
+import hashlib
+import importlib
+import json
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import Callable, Mapping, MutableMapping
+from pathlib import Path
+
+import numpy as np
+
+from .page import Page
+
+log = logging.getLogger(__name__)
+
+ENGINE_VERSION = 2
+DEFAULT_DIR = Path(__file__).parent.parent / "runs" / "ctx_cache"
+SIDECARS = (".normals.npz", ".semantic.npz", ".scene.npz", ".scene.json")
+
+# in-memory budgets (MB): shared base channels, and derived channels
+CTX_MEM_MB = float(os.environ.get("GART_CTX_MEM_MB", 2048))
+DERIVED_MEM_MB = float(os.environ.get("GART_DERIVED_MEM_MB", 512))
+CTX_DISK_MB = float(os.environ.get("GART_CTX_DISK_MB", 4096))
+
+_DIGESTS: dict = {}
+
+
+def nbytes(obj) -> int:
+    """Array bytes held by a (nested) ctx value."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, MutableMapping):
+        return sum(nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(v) for v in obj)
+    return 0
+
+
+class LRUCache:
+    """Byte-accounted LRU. Inserting past max_bytes evicts the least
+    recently used entries (never the one just inserted). Values are sized
+    by nbytes() unless put() is told otherwise (e.g. shapely geometry)."""
+
+    def __init__(self, max_mb: float):
+        self.max_bytes = int(max_mb * 2**20)
+        self.nbytes = 0
+        self._d: OrderedDict = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self._d
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    def get(self, key, default=None):
+        if key not in self._d:
+            return default
+        self._d.move_to_end(key)
+        return self._d[key][0]
+
+    def __getitem__(self, key):
+        if key not in self._d:
+            raise KeyError(key)
+        return self.get(key)
+
+    def put(self, key, value, size: int | None = None) -> None:
+        if key in self._d:
+            self.nbytes -= self._d.pop(key)[1]
+        size = nbytes(value) if size is None else size
+        self._d[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes and len(self._d) > 1:
+            k, (_v, sz) = self._d.popitem(last=False)
+            self.nbytes -= sz
+            log.debug("evicted %s (%.0f MB)", str(k)[:24], sz / 2**20)
+
+    def clear(self) -> None:
+        self._d.clear()
+        self.nbytes = 0
+
+
+CHANNEL_CACHE = LRUCache(CTX_MEM_MB)
+DERIVED = LRUCache(DERIVED_MEM_MB)
+_MISS = object()
+
+
+@dataclasses.dataclass(frozen=True)
+class Channel:
+    """One node of a ctx graph: fn(ctx, *inputs) over the named upstream
+    channels, reading only the source params it lists (ctx.p[name]).
+    disk=False keeps it out of the on-disk cache (cheap, or not arrays);
+    memo=False out of CHANNEL_CACHE too (views of another channel)."""
+    fn: Callable
+    inputs: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+    disk: bool = True
+    memo: bool = True
+
+
+class LazyCtx(Mapping):
+    """A structure ctx computed channel by channel, on first access.
+
+    root: digest of everything outside p the channels read (the photo and
+    its sidecars, see photo_digest); None = no caching at all, every
+    channel computed here (direct load_structure_ctx users). values:
+    plain entries that are not channels. scratch: directory for out-of-
+    core channels (photo.py). What this ctx computes or loads it pins
+    for its own lifetime, so an LRU eviction mid-render costs nothing."""
+
+    def __init__(self, graph: dict, path: str, p: dict,
+                 root: str | None = None, values: dict | None = None,
+                 scratch: str | Path | None = None):
+        self.graph = graph
+        self.path = path
+        self.p = p
+        self.root = root
+        self.scratch = scratch
+        self._vals = dict(values or {})
+        self._keys: dict = {}
+
+    def channel_key(self, name: str) -> str:
+        if name not in self._keys:
+            ch = self.graph[name]
+            src = source_digest(ch.fn.__module__)
+            h = hashlib.sha256(
+                f"channel {src}\n{self.root}\n"
+                f"{ch.fn.__module__}.{ch.fn.__qualname__}\n".encode())
+            h.update(json.dumps({k: self.p.get(k) for k in ch.params},
+                                sort_keys=True).encode())
+            for i in ch.inputs:
+                h.update(self.channel_key(i).encode())
+            self._keys[name] = h.hexdigest()
+        return self._keys[name]
+
+    def __getitem__(self, name):
+        if name not in self._vals:
+            self._vals[name] = self._fetch(self.graph[name], name)
+        return self._vals[name]
+
+    def _fetch(self, ch: Channel, name: str):
+        if self.root is None:
+            return ch.fn(self, *(self[i] for i in ch.inputs))
+        key = self.channel_key(name)
+        v = CHANNEL_CACHE.get(key, _MISS)
+        if v is _MISS:
+            v = _load(key) if ch.disk else _MISS
+            if v is _MISS:
+                v = ch.fn(self, *(self[i] for i in ch.inputs))
+                if ch.disk:
+                    _save(key, v)
+            if ch.memo:
+                CHANNEL_CACHE.put(key, v)
+        return v
+
+    def __contains__(self, name) -> bool:
+        return name in self._vals or name in self.graph  # no compute
+
+    def __iter__(self):
+        yield from self._vals
+        yield from (k for k in self.graph if k not in self._vals)
+
+    def __len__(self) -> int:
+        return len(self._vals.keys() | self.graph.keys())
+
+    def materialize(self) -> "LazyCtx":
+        """Compute every channel now."""
+        for name in self.graph:
+            self[name]
+        return self
+
+
+class CtxView(MutableMapping):
+    """Per-render copy-on-write view of a shared base ctx. Reads fall
+    through to the base; writes land in the overlay, so one render's
+    plan state can never leak into the next or into the cache."""
+
+    def __init__(self, base: dict, key: str | None):
+        self.base = base
+        self.key = key
+        self.overlay: dict = {}
+
+    def __getitem__(self, k):
+        if k in self.overlay:
+            return self.overlay[k]
+        return self.base[k]
+
+    def __setitem__(self, k, v) -> None:
+        self.overlay[k] = v
+
+    def __delitem__(self, k) -> None:
+        del self.overlay[k]  # base channels are not the view's to drop
+
+    def __iter__(self):
+        yield from self.overlay
+        yield from (k for k in self.base if k not in self.overlay)
+
+    def __contains__(self, k) -> bool:
+        return k in self.overlay or k in self.base
+
+    def __len__(self) -> int:
+        return len(self.overlay.keys() | self.base.keys())
+
+    def materialize(self) -> None:
+        """Compute every lazy base channel now — before fork(), so pool
+        workers inherit them instead of each computing its own."""
+        if isinstance(self.base, LazyCtx):
+            self.base.materialize()
+
+
+def pyramid(graph: dict, level: int, halvers: dict) -> dict:
+    """graph seen `level` octaves down. Every channel moves to <name>@0
+    (same keys, so the full-resolution caches are shared), and each name
+    in halvers is rebound to <name>@<level>: <name>@0 halved level times by
+    halvers[name] (fn(ctx, value) -> value at half the resolution). Names
+    without a halver stay reachable as <name>@0 only."""
+    if level <= 0:
+        return graph
+    g = {f"{n}@0": dataclasses.replace(
+        ch, inputs=tuple(f"{i}@0" for i in ch.inputs))
+        for n, ch in graph.items()}
+    for name, fn in halvers.items():
+        if f"{name}@0" not in g:
+            continue
+        for j in range(1, level + 1):
+            g[f"{name}@{j}"] = Channel(fn, (f"{name}@{j - 1}",), disk=False)
+        g[name] = g[f"{name}@{level}"]
+    return g
+
+
+def derived(ctx, name, fn):
+    """Memoized channel computed purely from BASE channels. Through a
+    CtxView it is shared by every render of that ctx (bounded by
+    DERIVED_MEM_MB); a plain ctx dict (direct load_structure_ctx users)
+    simply stores it on itself, as does a view without a key."""
+    if isinstance(ctx, CtxView) and ctx.key is None:
+        if name not in ctx.overlay:
+            ctx.overlay[name] = fn()
+        return ctx.overlay[name]
+    if isinstance(ctx, CtxView):
+        k = (ctx.key, name)
+        v = DERIVED.get(k)
+        if v is None:
+            v = fn()
+            DERIVED.put(k, v)
+        return v
+    if name not in ctx:
+        ctx[name] = fn()
+    return ctx[name]
+
+
+def cache_dir() -> Path | None:
+    d = os.environ.get("GART_CTX_CACHE")
+    if d is not None and d.strip().lower() in ("", "0", "off", "none"):
+        return None
+    return Path(d) if d else DEFAULT_DIR
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 of the file bytes, memoized on (path, mtime, size)."""
+    st = os.stat(path)
+    k = (str(path), st.st_mtime_ns, st.st_size)
+    if k not in _DIGESTS:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _DIGESTS[k] = h.hexdigest()
+    return _DIGESTS[k]
+
+
+@functools.cache
+def source_digest(module: str) -> str:
+    """Digest of module's source and this file's (plus ENGINE_VERSION):
+    what a channel computed by module's code, stored by this one, is."""
+    h = hashlib.sha256(f"engine v{ENGINE_VERSION}".encode())
+    for m in sorted({module, __name__}):
+        f = getattr(importlib.import_module(m), "__file__", None)
+        h.update(f"{m}:{file_digest(f) if f else '-'}\n".encode())
+    return h.hexdigest()
+
+
+def photo_digest(photo: str) -> str:
+    """Digest of the photo and the frozen sidecars next to it
+    (.normals/.semantic/.scene.npz): a LazyCtx root."""
+    h = hashlib.sha256(file_digest(photo).encode())
+    stem = Path(photo).with_suffix("")
+    for suf in SIDECARS:
+        p = Path(f"{stem}{suf}")
+        h.update(f"{suf}:{file_digest(p) if p.exists() else '-'}".encode())
+    return h.hexdigest()
+
+
+def ctx_key(photo: str, params: dict, page_size: str,
+            margin_mm: float) -> str:
+    """Key of a whole ctx (stage memo, derived channels)."""
+    h = hashlib.sha256()
+    h.update(f"ctx {source_digest(f'{__package__}.photo')}\n".encode())
+    h.update(photo_digest(photo).encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    h.update(f"{page_size}|{float(margin_mm)!r}".encode())
+    return h.hexdigest()
+
+
+def _entry(key: str) -> Path | None:
+    d = cache_dir()
+    return None if d is None else d / key[:2] / key
+
+
+def _load(key: str):
+    """-> a channel value with memory-mapped arrays, or _MISS."""
+    ent = _entry(key)
+    if ent is None or not (ent / "meta.json").exists():
+        return _MISS
+    try:
+        meta = json.loads((ent / "meta.json").read_text())
+        items = []
+        for i, it in enumerate(meta["items"]):
+            kind = it["kind"]
+            if kind == "page":
+                items.append(Page(**it["page"]))
+            elif kind == "none":
+                items.append(None)
+            else:
+                a = np.load(ent / f"{i}.npy", mmap_mode="r")
+                items.append(list(a) if kind == "list" else a)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.warning("ctx cache entry %s unreadable (%s); rebuilding",
+                    key[:12], e)
+        return _MISS
+    try:
+        os.utime(ent / "meta.json")  # last use, for prune()
+    except OSError:
+        pass  # read-only cache: it just never looks recent
+    return tuple(items) if meta["tuple"] else items[0]
+
+
+def _save(key: str, value) -> None:
+    """Write a channel value under key (atomic: tmp dir + rename). Values
+    are arrays, lists of same-shape arrays (tone_bands, stacked to one
+    file), Pages, None, or tuples of those."""
+    ent = _entry(key)
+    if ent is None or ent.exists():
+        return
+    tmp = ent.with_name(f"{ent.name}.tmp{os.getpid()}")
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        items = value if isinstance(value, tuple) else (value,)
+        meta = {"tuple": isinstance(value, tuple), "items": []}
+        for i, v in enumerate(items):
+            if v is None:
+                meta["items"].append({"kind": "none"})
+            elif isinstance(v, Page):
+                meta["items"].append({"kind": "page",
+                                      "page": dataclasses.asdict(v)})
+            elif isinstance(v, list):  # band by band: no stacked copy
+                out = np.lib.format.open_memmap(
+                    tmp / f"{i}.npy", "w+", v[0].dtype, (len(v),) +
+                    v[0].shape)
+                for j, b in enumerate(v):
+                    out[j] = b
+                out.flush()
+                del out
+                meta["items"].append({"kind": "list"})
+            else:
+                np.save(tmp / f"{i}.npy", np.ascontiguousarray(v))
+                meta["items"].append({"kind": "array"})
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=1))
+        os.rename(tmp, ent)
+    except OSError as e:  # read-only disk, or another process won the race
+        if not ent.exists():
+            log.warning("ctx cache write failed (%s)", e)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    prune(keep=ent)
+
+
+def prune(max_mb: float | None = None, keep: Path | None = None) -> int:
+    """Delete least recently used entries (meta.json mtime: last load or
+    write) until the disk cache holds at most max_mb (default
+    CTX_DISK_MB), never `keep`. -> entries deleted. An entry another
+    process is reading stays readable (mmaps outlive the unlink) or
+    fails its load cleanly and is rebuilt."""
+    d = cache_dir()
+    if d is None or not d.is_dir():
+        return 0
+    budget = (CTX_DISK_MB if max_mb is None else max_mb) * 2**20
+    ents = []
+    for meta in d.glob("*/*/meta.json"):
+        ent = meta.parent
+        if ".tmp" in ent.name:
+            continue  # still being written
+        try:
+            size = sum(f.stat().st_size for f in ent.iterdir())
+            ents.append((meta.stat().st_mtime_ns, size, ent))
+        except OSError:
+            continue  # pruned under us
+    total = sum(size for _t, size, _e in ents)
+    gone = 0
+    for _t, size, ent in sorted(ents, key=lambda e: e[0]):
+        if total <= budget:
+            break
+        if ent == keep:
+            continue
+        shutil.rmtree(ent, ignore_errors=True)
+        total -= size
+        gone += 1
+    if gone:
+        log.info("ctx cache: pruned %d entries to %.0f MB", gone,
+                 total / 2**20)
+    return gone
@@ -19,7 +19,8 @@ Feature lines come from the frozen normal map (creases), the scene plan
 import cv2
 import numpy as np
 
-from .geom import Polyline, resample
+from .ctxcache import derived
+from .geom import Lines, Polyline, resample
 
 DEFAULTS = {
     "falloff_mm": 30.0,
@@ -33,10 +34,12 @@ DEFAULTS = {
 
 
 def _feature_dist_mm(ctx: dict, sources: tuple) -> np.ndarray:
-    """Distance (mm) to the nearest feature line. Cached on ctx."""
-    key = ("_feature_dist", tuple(sorted(sources)))
-    if key in ctx:
-        return ctx[key]
+    """Distance (mm) to the nearest feature line. Memoized per ctx."""
+    return derived(ctx, ("_feature_dist", tuple(sorted(sources))),
+                   lambda: _compute_feature_dist(ctx, sources))
+
+
+def _compute_feature_dist(ctx: dict, sources: tuple) -> np.ndarray:
     page = ctx["page"]
     h, w = ctx["gray"].shape
     lines = np.zeros((h, w), bool)
@@ -57,11 +60,10 @@ def _feature_dist_mm(ctx: dict, sources: tuple) -> np.ndarray:
     else:
         dist = cv2.distanceTransform(
             (~lines).astype(np.uint8), cv2.DIST_L2, 3) * page.mm_per_px
-    ctx[key] = dist.astype(np.float32)
-    return ctx[key]
+    return dist.astype(np.float32)
 
 
-def emphasis_gate(lines: list[Polyline], ctx: dict, params: dict | None,
+def emphasis_gate(lines: Lines, ctx: dict, params: dict | None,
                   rng: np.random.Generator) -> list[Polyline]:
     p = {**DEFAULTS, **(params or {})}
     dist = _feature_dist_mm(ctx, tuple(p["sources"]))
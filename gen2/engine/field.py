@@ -3,10 +3,23 @@
 All tracing happens in page mm. The orientation field is sampled bilinearly
 in doubled-angle space (cos2θ/sin2θ) so 0/180° wraparound never cancels.
 Line spacing is enforced with a Jobard–Lehrer style occupancy grid.
+
+trace_streamlines is the reference tracer: one point at a time, in mm.
+trace_streamlines_lockstep (flow_hatch "tracer": "lockstep") traces the
+same seeds under the same rules, but in pixel space and a batch of seeds
+at a time: field lookups, mask tests and spacing queries are one NumPy
+call per step for the whole batch. Same look, different float rounding —
+hence opt-in, so stored genomes keep their exact polylines.
+trace_streamlines_jobard ("seeding": "jobard") seeds beside accepted
+lines instead of from a grid; trace_streamlines_atlas ("seeding":
+"atlas") clips lines from a per-photo multi-density atlas.
 """
 
 import numpy as np
 
+from .ctxcache import derived
+from .geom import PolylineBatch, resample
+
 
 class FieldSampler:
     def __init__(self, ctx):
@@ -136,3 +149,715 @@ def trace_streamlines(mask: np.ndarray, ctx: dict, spacing_mm: float,
         lines.append(line)
         grid.add_line(line[::2])
     return lines
+
+
+# ---------------------------------------------------------------- lockstep
+
+
+def _field(ctx) -> np.ndarray:
+    """(H, W, 3) lookup of cos2θ, sin2θ, coherence, built once per ctx."""
+    def build():
+        th = np.asarray(ctx["orientation"], np.float64)
+        return np.dstack([np.cos(2 * th), np.sin(2 * th),
+                          np.asarray(ctx["coherence"], np.float64)])
+    return derived(ctx, "_field_c2s2coh", build)
+
+
+def _bilinear(arr: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """FieldSampler._bilinear over arrays of px coordinates, all channels
+    of an (H, W, C) lookup at once -> (N, C)."""
+    h, w = arr.shape[:2]
+    x0 = np.minimum(np.maximum(x.astype(np.int64), 0), w - 2)
+    y0 = np.minimum(np.maximum(y.astype(np.int64), 0), h - 2)
+    fx = np.minimum(np.maximum(x - x0, 0.0), 1.0)[:, None]
+    fy = np.minimum(np.maximum(y - y0, 0.0), 1.0)[:, None]
+    flat = arr.reshape(h * w, -1)  # one flat gather per corner
+    i = y0 * w + x0
+    return ((flat[i] * (1 - fx) + flat[i + 1] * fx) * (1 - fy)
+            + (flat[i + w] * (1 - fx) + flat[i + w + 1] * fx) * fy)
+
+
+def _theta(field: np.ndarray, p: np.ndarray, fallback: float,
+           min_coherence: float) -> np.ndarray:
+    """FieldSampler.theta_at for (N,2) px points."""
+    h, w = field.shape[:2]
+    x, y = p[:, 0], p[:, 1]
+    c2, s2, coh = _bilinear(field, x, y).T
+    ok = (x >= 0) & (x < w - 1) & (y >= 0) & (y < h - 1)
+    ok &= coh >= min_coherence
+    return np.where(ok, 0.5 * np.arctan2(s2, c2), fallback)
+
+
+class CellGrid:
+    """SpacingGrid as arrays: accepted points kept sorted by cell id
+    (row-major), so a cell row's points are one contiguous slice and a
+    query for N points is five searchsorted calls plus one gather."""
+
+    def __init__(self, spacing: float):
+        self.cell = spacing / 2.0
+        self.r2 = (spacing * 0.85) ** 2  # SpacingGrid.too_close factor
+        self.keys = np.zeros(0, np.int64)
+        self.pts = np.zeros((0, 2))
+
+    def _cell(self, p: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return (np.floor(p[:, 0] / self.cell).astype(np.int64),
+                np.floor(p[:, 1] / self.cell).astype(np.int64))
+
+    @staticmethod
+    def _key(cx, cy):
+        return (cy << 32) + cx  # cx may go negative: still row-ordered
+
+    def add(self, p: np.ndarray) -> None:
+        k = self._key(*self._cell(p))
+        order = np.argsort(k, kind="stable")
+        at = np.searchsorted(self.keys, k[order], side="right")
+        self.keys = np.insert(self.keys, at, k[order])
+        self.pts = np.insert(self.pts, at, p[order], axis=0)
+
+    def too_close(self, q: np.ndarray) -> np.ndarray:
+        """-> bool per query point."""
+        out = np.zeros(len(q), bool)
+        if not len(self.keys) or not len(q):
+            return out
+        cx, cy = self._cell(q)
+        rows = cy[:, None] + np.arange(-2, 3)[None, :]
+        a = np.searchsorted(self.keys, self._key(cx[:, None] - 2, rows))
+        b = np.searchsorted(self.keys, self._key(cx[:, None] + 2, rows),
+                            side="right")
+        cnt = (b - a).ravel()
+        tot = int(cnt.sum())
+        if tot == 0:
+            return out
+        owner = np.repeat(np.arange(len(q)).repeat(5), cnt)
+        idx = np.repeat(a.ravel() - np.cumsum(cnt) + cnt, cnt) \
+            + np.arange(tot)
+        d = self.pts[idx] - q[owner]
+        hit = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] < self.r2
+        out[owner[hit]] = True
+        return out
+
+
+class _BatchTracer:
+    """Lockstep integration + in-order acceptance, in pixel space; shared
+    by the lockstep and Jobard–Lehrer tracers.
+
+    trace(seeds) integrates every seed both ways at once against the
+    lines accepted so far, then accepts the batch's lines in seed order,
+    each cut at its first vertex too close to an earlier batch-mate —
+    the serial stop rule. stream(feed) keeps a pool of seeds in flight
+    instead, accepting each line as soon as it stops (Jobard–Lehrer).
+
+    integrator "euler": fixed step_mm, exactly trace_streamlines' steps.
+    integrator "rk4": classic RK4 on the line field (every stage aligned
+    with the heading), step adapted between step_mm and max_step_mm so
+    the drawn chord strays at most max_sag_mm from the arc it stands for
+    (sagitta ~ step x turn / 8): halved past that and on a failed step
+    (so lines still end snug against the mask and their neighbours),
+    grown 1.5x while under a third of it. Straight runs take long steps,
+    bends short ones, and no step drifts further than a curve's own
+    flattening would."""
+
+    def __init__(self, mask: np.ndarray, ctx: dict, spacing_mm: float,
+                 step_mm: float, max_len_mm: float,
+                 fallback_angle_deg: float, min_coherence: float,
+                 angle_offset_deg: float, min_len_mm: float,
+                 integrator: str = "euler", max_step_mm: float = 3.0,
+                 max_sag_mm: float = 0.1):
+        if integrator not in ("euler", "rk4"):
+            raise ValueError(f"unknown integrator {integrator!r}")
+        self.page = ctx["page"]
+        self.field = _field(ctx)
+        self.mask = np.asarray(mask)  # a memmapped band indexes slowly
+        self.h, self.w = self.mask.shape
+        mpp = self.page.mm_per_px
+        self.spacing = spacing_mm / mpp
+        self.step_mm, self.step = step_mm, step_mm / mpp
+        self.max_step = max(max_step_mm, step_mm) / mpp
+        self.half_len = max_len_mm / 2 / mpp
+        self.n_steps = int(max_len_mm / step_mm) // 2
+        self.fallback = np.deg2rad(fallback_angle_deg)
+        self.offset = np.deg2rad(angle_offset_deg)
+        self.min_coherence = min_coherence
+        self.min_len_mm = min_len_mm
+        self.integrator = integrator
+        self.max_sag = max_sag_mm / mpp
+        self.grid = CellGrid(self.spacing)
+        self.lost = self.integrated = 0
+
+    def inside(self, p: np.ndarray) -> np.ndarray:
+        xi, yi = p[:, 0].astype(np.int64), p[:, 1].astype(np.int64)
+        ok = (xi >= 0) & (xi < self.w) & (yi >= 0) & (yi < self.h)
+        ok[ok] = self.mask[yi[ok], xi[ok]]
+        return ok
+
+    def _dir(self, p: np.ndarray) -> np.ndarray:
+        th = _theta(self.field, p, self.fallback,
+                    self.min_coherence) + self.offset
+        return np.column_stack([np.cos(th), np.sin(th)])
+
+    def _dir_along(self, p: np.ndarray, ref: np.ndarray) -> np.ndarray:
+        d = self._dir(p)
+        flip = (d * ref).sum(1) < 0
+        d[flip] = -d[flip]
+        return d
+
+    def _euler(self, seeds: np.ndarray) -> tuple:
+        k = len(seeds)
+        p = np.concatenate([seeds, seeds])  # backward k, then forward k
+        sign = np.repeat([-1.0, 1.0], k)
+        prev = np.zeros_like(p)
+        n = np.zeros(2 * k, np.int64)
+        buf = np.empty((self.n_steps, 2 * k, 2))
+        alive = np.arange(2 * k)
+        for t in range(self.n_steps):
+            d = self._dir(p[alive])
+            if t == 0:
+                d *= sign[alive, None]
+            else:
+                flip = (d * prev[alive]).sum(1) < 0
+                d[flip] = -d[flip]
+            q = p[alive] + d * self.step
+            ok = self.inside(q)
+            ok[ok] = ~self.grid.too_close(q[ok])
+            alive, d, q = alive[ok], d[ok], q[ok]
+            if not len(alive):
+                break
+            buf[t, alive] = q
+            n[alive] += 1
+            prev[alive], p[alive] = d, q
+        return buf, n, n * self.step
+
+    def _rk4(self, seeds: np.ndarray) -> tuple:
+        k = len(seeds)
+        p = np.concatenate([seeds, seeds])
+        prev = self._dir(p) * np.repeat([-1.0, 1.0], k)[:, None]
+        h = np.full(2 * k, self.step)
+        run = np.zeros(2 * k)
+        n = np.zeros(2 * k, np.int64)
+        buf = np.empty((int(self.half_len / self.step) + 2, 2 * k, 2))
+        alive = np.arange(2 * k)
+        while len(alive):
+            alive = alive[self._rk4_advance(alive, p, prev, h, run, n, buf)]
+        return buf, n, run
+
+    def _rk4_advance(self, alive, p, prev, h, run, n, buf) -> np.ndarray:
+        """One adaptive RK4 step of walkers `alive`, in place on the
+        walker arrays. -> bool per walker: still walking."""
+        hmin = self.step
+        P, H = p[alive], h[alive][:, None]
+        k1 = self._dir_along(P, prev[alive])
+        k2 = self._dir_along(P + H / 2 * k1, k1)
+        k3 = self._dir_along(P + H / 2 * k2, k1)
+        k4 = self._dir_along(P + H * k3, k1)
+        d = k1 + 2 * k2 + 2 * k3 + k4
+        norm = np.hypot(d[:, 0], d[:, 1])[:, None]
+        d = np.where(norm > 1e-9, d / np.maximum(norm, 1e-9), k1)
+        q = P + d * H
+        # a long step must not hop over a neighbour: test the chord at
+        # intervals no longer than the separation radius (its own count
+        # per walker, ending on q), all stops of all walkers in one query
+        sub = np.ceil(H[:, 0] / (0.85 * self.spacing)).astype(np.int64)
+        w = np.repeat(np.arange(len(P)), sub)
+        j = np.arange(len(w)) - np.repeat(np.cumsum(sub) - sub, sub) + 1
+        m = P[w] + d[w] * (H[w, 0] * (j / sub[w]))[:, None]
+        end = j == sub[w]
+        m[end] = q
+        free = self.inside(m)
+        free[free] = ~self.grid.too_close(m[free])
+        ok = np.bincount(w[~free], minlength=len(P)) == 0
+        sag = H[:, 0] * np.arccos(np.clip((k1 * k4).sum(1), -1, 1)) / 8
+        retry = (~ok | (sag > self.max_sag)) & (H[:, 0] > hmin)
+        h[alive[retry]] = np.maximum(H[retry, 0] / 2, hmin)
+        go = ok & ~retry
+        a = alive[go]
+        buf[n[a], a] = q[go]
+        n[a] += 1
+        prev[a], p[a] = d[go], q[go]
+        run[a] += H[go, 0]
+        easy = a[sag[go] < self.max_sag / 3]
+        h[easy] = np.minimum(h[easy] * 1.5, self.max_step)
+        return (go | retry) & (run[alive] < self.half_len) \
+            & (n[alive] < len(buf))
+
+    def _euler_advance(self, alive, p, prev, h, run, n, buf) -> np.ndarray:
+        """_rk4_advance's fixed-step euler twin (walkers start with prev
+        = their heading, so no first-step special case)."""
+        P = p[alive]
+        d = self._dir_along(P, prev[alive])
+        q = P + d * self.step
+        ok = self.inside(q)
+        ok[ok] = ~self.grid.too_close(q[ok])
+        a = alive[ok]
+        buf[n[a], a] = q[ok]
+        n[a] += 1
+        prev[a], p[a] = d[ok], q[ok]
+        run[a] += self.step
+        return ok & (n[alive] < self.n_steps)
+
+    def _near(self, q: np.ndarray, pts: np.ndarray) -> np.ndarray:
+        """CellGrid.too_close of q against just pts (same test, same
+        bools): pairwise when small, else through a throwaway grid."""
+        if len(q) * len(pts) > 1 << 16:
+            g = CellGrid(self.spacing)
+            g.add(pts)
+            return g.too_close(q)
+        d = pts[None] - q[:, None]
+        return (d[..., 0] * d[..., 0] + d[..., 1] * d[..., 1]
+                < self.grid.r2).any(1)
+
+    def _long_enough(self, pts: np.ndarray) -> bool:
+        if len(pts) < 2:
+            return False
+        if self.integrator == "euler":
+            return (len(pts) - 1) * self.step_mm >= self.min_len_mm
+        seg = np.diff(pts, axis=0)
+        return (np.hypot(seg[:, 0], seg[:, 1]).sum()
+                * self.page.mm_per_px >= self.min_len_mm)
+
+    def trace(self, seeds: np.ndarray,
+              drop_short: bool = False) -> list[tuple]:
+        """(k,2) px seeds -> accepted [(pts_px, n_back, seed index)];
+        the accepted lines join the occupancy grid. drop_short skips,
+        up front, lines too short to keep even uncut — the same lines
+        come out, minus their spacing queries, but `lost` no longer
+        counts their vertices."""
+        k = len(seeds)
+        buf, n, run = (self._euler if self.integrator == "euler"
+                       else self._rk4)(seeds)
+        lanes = np.arange(k)
+        if drop_short:
+            lanes = lanes[self._may_keep(run[:k] + run[k:])]
+        accepted = self._accept([(seeds[b], buf[:n[b], b],
+                                  buf[:n[k + b], k + b]) for b in lanes])
+        self.integrated = int(n.sum())
+        return [(pts, n_back, int(lanes[i])) for pts, n_back, i in accepted]
+
+    def _may_keep(self, run: np.ndarray) -> np.ndarray:
+        """Whole walked length (px) long enough to keep, uncut?"""
+        return run * self.page.mm_per_px >= self.min_len_mm * (1 - 1e-9)
+
+    def _accept(self, walks: list, recheck: bool = False) -> list[tuple]:
+        """Accept [(seed, back, fwd)] lines in order, each cut at its
+        first vertex too close to an earlier one's — or, with recheck,
+        to any accepted line: lines accepted while it was in flight.
+        -> [(pts_px, n_back, index into walks)]; adds them to the grid
+        and sets `lost`.
+
+        Cuts, lengths and bboxes are whole-batch array ops; only a line
+        whose bbox comes within the spacing radius of an earlier one's
+        is tested against its accepted predecessors, one at a time."""
+        k = len(walks)
+        if not k:
+            self.lost = 0
+            return []
+        nb = np.array([len(w[1]) for w in walks], np.int64)
+        nf = np.array([len(w[2]) for w in walks], np.int64)
+        q = np.concatenate([np.concatenate([seed[None, :], back, fwd])
+                            for seed, back, fwd in walks])
+        cnt = 1 + nb + nf
+        off = np.cumsum(cnt) - cnt
+        wid = np.repeat(np.arange(k), cnt)
+        t = np.arange(len(q)) - off[wid]  # 0 seed, then back, then fwd
+        fwd = t > nb[wid]
+        pos = np.where(fwd, t - 1 - nb[wid], t - 1)  # index in its run
+        cb, cf, dead = nb.copy(), nf.copy(), np.zeros(k, bool)
+
+        def cut(hit: np.ndarray) -> None:
+            """Cut each line before its first vertex in hit."""
+            dead[wid[hit & (t == 0)]] = True
+            b, f = hit & (t > 0) & ~fwd, hit & fwd
+            np.minimum.at(cb, wid[b], pos[b])
+            np.minimum.at(cf, wid[f], pos[f])
+
+        if recheck:
+            cut(self.grid.too_close(q))
+        # step lengths, each vertex from the one before it on its line
+        pred = np.where(fwd & (pos == 0), off[wid], np.arange(len(q)) - 1)
+        pred[t == 0] = 0
+        seg = q - q[pred]
+        seg = np.where(t > 0, np.hypot(seg[:, 0], seg[:, 1]), 0.0)
+
+        def kept() -> np.ndarray:
+            return (t == 0) | np.where(fwd, pos < cf[wid], pos < cb[wid])
+
+        def long_enough(keep: np.ndarray) -> np.ndarray:
+            if self.integrator == "euler":
+                return (cb + cf) * self.step_mm >= self.min_len_mm
+            run = np.bincount(wid[keep], seg[keep], minlength=k)
+            return (cb + cf > 0) & (run * self.page.mm_per_px
+                                    >= self.min_len_mm)
+
+        keep = kept()
+        ok = ~dead & long_enough(keep)
+        lo = np.minimum.reduceat(np.where(keep[:, None], q, np.inf), off)
+        hi = np.maximum.reduceat(np.where(keep[:, None], q, -np.inf), off)
+        r = np.sqrt(self.grid.r2)
+        cand = np.flatnonzero(~dead)  # short ones are cut too, for `lost`
+        bl, bh = lo[cand] - r, hi[cand] + r
+        over = ((bl[:, None, 0] <= hi[cand][None, :, 0])
+                & (bh[:, None, 0] >= lo[cand][None, :, 0])
+                & (bl[:, None, 1] <= hi[cand][None, :, 1])
+                & (bh[:, None, 1] >= lo[cand][None, :, 1]))
+        over = np.tril(over, -1)  # earlier lines only
+        occ = {}
+        for i in np.flatnonzero(over.any(1)):
+            w = cand[i]
+            mates = cand[:i][over[i, :i] & ok[cand[:i]]]
+            if not len(mates):
+                continue
+            for j in mates:
+                if j not in occ:
+                    occ[j] = self._occupancy([self._line(q, off, cb, cf, nb,
+                                                         j)])
+            mine = wid == w
+            hit = np.zeros(len(q), bool)
+            hit[mine] = self._near(q[mine],
+                                   np.concatenate([occ[j] for j in mates]))
+            cut(hit)
+            keep = kept()
+            ok[w] = not dead[w] and long_enough(keep)[w]
+        self.lost = int(np.where(dead, nb + nf, nb - cb + nf - cf).sum())
+        acc = np.flatnonzero(ok)
+        lines = [self._line(q, off, cb, cf, nb, w) for w in acc]
+        if lines:
+            self.grid.add(self._occupancy(lines))
+        return [(pts, int(cb[w]), int(w)) for pts, w in zip(lines, acc)]
+
+    @staticmethod
+    def _line(q, off, cb, cf, nb, w) -> np.ndarray:
+        """Walk w's accepted line: back run reversed, seed, fwd run."""
+        o = off[w]
+        return np.concatenate([q[o + cb[w]:o:-1], q[o:o + 1],
+                               q[o + 1 + nb[w]:o + 1 + nb[w] + cf[w]]])
+
+    def _occupancy(self, lines: list) -> np.ndarray:
+        """Grid points of lines: at most ~one step apart, whatever the
+        step (euler: every other vertex, as the serial tracer)."""
+        if self.integrator == "euler":
+            return np.concatenate([ln[::2] for ln in lines])
+        return PolylineBatch.from_lines(lines).resample(self.step).verts
+
+    def stream(self, feed, cap: int):
+        """Trace seeds from feed(m) -> (<= m, 2) px seeds, cap in flight
+        at once; yields the px lines accepted at each step, each as soon
+        as both its walkers stop. Every freed slot is refilled before the
+        next step, so the pool never idles on a batch's longest line,
+        and each line's seeds can be fed in right after it (Jobard–
+        Lehrer). Ends when feed has nothing left and the pool drains."""
+        lanes = 2 * cap  # seed slot b: back walker b, forward cap + b
+        p, prev = np.zeros((lanes, 2)), np.zeros((lanes, 2))
+        h, run = np.zeros(lanes), np.zeros(lanes)
+        n = np.zeros(lanes, np.int64)
+        live = np.zeros(lanes, bool)
+        seeds, busy = np.zeros((cap, 2)), np.zeros(cap, bool)
+        buf = np.empty((int(self.half_len / self.step) + 2, lanes, 2))
+        advance = (self._euler_advance if self.integrator == "euler"
+                   else self._rk4_advance)
+        done_walks = []  # stopped, slot already reused, not yet accepted
+        while True:
+            slot = np.flatnonzero(~busy)
+            new = feed(len(slot)) if len(slot) else slot
+            slot = slot[:len(new)]
+            if len(slot):
+                w = np.concatenate([slot, cap + slot])
+                seeds[slot], busy[slot] = new, True
+                p[w] = np.concatenate([new, new])
+                prev[w] = self._dir(p[w]) \
+                    * np.repeat([-1.0, 1.0], len(slot))[:, None]
+                h[w], run[w], n[w], live[w] = self.step, 0.0, 0, True
+            alive = np.flatnonzero(live)
+            if len(alive):
+                live[alive] = advance(alive, p, prev, h, run, n, buf)
+                done = np.flatnonzero(busy & ~live[:cap] & ~live[cap:])
+                busy[done] = False
+                done = done[self._may_keep(run[done] + run[cap + done])]
+                done_walks += [(seeds[b].copy(), buf[:n[b], b].copy(),
+                                buf[:n[cap + b], cap + b].copy())
+                               for b in done]
+            # accepting costs a grid insert and the caller's candidate
+            # pass: a few lines at a time, not one per step
+            if done_walks and (len(done_walks) >= max(cap // 8, 1)
+                               or not live.any()):
+                acc = self._accept(done_walks, recheck=True)
+                done_walks = []
+                if acc:
+                    yield [pts for pts, _n, _i in acc]
+            elif not len(alive):
+                return
+
+
+def _grid_seeds(mask: np.ndarray, page, spacing_mm: float,
+                rng: np.random.Generator) -> np.ndarray:
+    """trace_streamlines' seed candidates (same draws): a jittered grid
+    over the mask bbox, in random order, mm."""
+    ys, xs = np.nonzero(mask)
+    lo = page.px_to_mm(np.array([[xs.min(), ys.min()]], float))[0]
+    hi = page.px_to_mm(np.array([[xs.max(), ys.max()]], float))[0]
+    s = spacing_mm * 1.5
+    gx = np.arange(lo[0], hi[0] + s, s)
+    gy = np.arange(lo[1], hi[1] + s, s)
+    seeds = np.array(np.meshgrid(gx, gy)).reshape(2, -1).T
+    seeds = seeds + rng.uniform(-s / 3, s / 3, seeds.shape)
+    return seeds[rng.permutation(len(seeds))]
+
+
+def trace_streamlines_lockstep(mask: np.ndarray, ctx: dict, spacing_mm: float,
+                               rng: np.random.Generator,
+                               step_mm: float = 0.8,
+                               max_len_mm: float = 500.0,
+                               fallback_angle_deg: float = 50.0,
+                               min_coherence: float = 0.05,
+                               angle_offset_deg: float = 0.0,
+                               min_len_mm: float = 2.0,
+                               integrator: str = "euler",
+                               max_step_mm: float = 3.0,
+                               max_sag_mm: float = 0.1,
+                               batch: int = 16) -> list[np.ndarray]:
+    """trace_streamlines, a batch of seeds at a time.
+
+    Seeds (same draws, same order) that survive the spacing test are
+    traced by _BatchTracer; with the euler integrator the lines are the
+    reference tracer's up to float rounding."""
+    if not mask.any():
+        return []
+    page = ctx["page"]
+    tr = _BatchTracer(mask, ctx, spacing_mm, step_mm, max_len_mm,
+                      fallback_angle_deg, min_coherence, angle_offset_deg,
+                      min_len_mm, integrator, max_step_mm, max_sag_mm)
+    seeds = _grid_seeds(tr.mask, page, spacing_mm, rng)
+    seeds_px = page.mm_to_px(seeds)
+    live = tr.inside(seeds_px)
+    seeds, seeds_px = seeds[live], seeds_px[live]
+
+    lines: list[np.ndarray] = []
+    for pts, n_back, j in _lockstep(tr, seeds_px, batch):
+        ln = page.px_to_mm(pts)
+        ln[n_back] = seeds[j]  # the exact mm seed, as serially
+        lines.append(ln)
+    return lines
+
+
+def _lockstep(tr: "_BatchTracer", seeds_px: np.ndarray, batch: int):
+    """Feed seeds (in order) through tr, a batch at a time; yields
+    (pts_px, n_back, seed index) per accepted line. The batch size adapts
+    to how much integration in-batch collisions throw away."""
+    i = 0
+    while i < len(seeds_px):
+        # next `batch` seeds the accepted lines don't already veto
+        take = []
+        while i < len(seeds_px) and len(take) < batch:
+            j = np.arange(i, min(i + 2 * batch, len(seeds_px)))
+            i = int(j[-1]) + 1
+            take.extend(j[~tr.grid.too_close(seeds_px[j])])
+        if len(take) > batch:
+            i = take[batch]
+            take = take[:batch]
+        take = np.array(take, np.int64)
+        if not len(take):
+            break
+        for pts, n_back, b in tr.trace(seeds_px[take]):
+            yield pts, n_back, int(take[b])
+        # wide batches while batch-mates rarely collide, narrow when
+        # much of the integration is thrown away
+        waste = tr.lost / max(tr.integrated, 1)
+        batch = int(np.clip(batch * (2 if waste < 0.1 else
+                                     0.5 if waste > 0.3 else 1), 4, 512))
+
+
+def trace_streamlines_jobard(mask: np.ndarray, ctx: dict, spacing_mm: float,
+                             rng: np.random.Generator,
+                             step_mm: float = 0.8,
+                             max_len_mm: float = 500.0,
+                             fallback_angle_deg: float = 50.0,
+                             min_coherence: float = 0.05,
+                             angle_offset_deg: float = 0.0,
+                             min_len_mm: float = 2.0,
+                             integrator: str = "rk4",
+                             max_step_mm: float = 3.0,
+                             max_sag_mm: float = 0.1,
+                             batch: int = 256) -> list[np.ndarray]:
+    """Jobard & Lehrer (1997) seed propagation: new streamlines start at
+    exactly spacing_mm to either side of accepted ones, so the spacing
+    is met by construction instead of by rejecting random seeds.
+
+    Every side of every accepted line queues candidate seeds in arc
+    order. `batch` seeds are in flight at once (_BatchTracer.stream);
+    a freed slot takes the next free candidate of the current
+    generation, which holds the first candidate of every side, then
+    every stride-th — stride being the mean accepted line length in
+    spacings, as candidates closer than that mostly trace one line.
+    Only with no candidate left does a slot take the next free
+    jittered-grid seed, to start a new front. Adaptive RK4 lets straight
+    runs take long steps."""
+    if not mask.any():
+        return []
+    page = ctx["page"]
+    tr = _BatchTracer(mask, ctx, spacing_mm, step_mm, max_len_mm,
+                      fallback_angle_deg, min_coherence, angle_offset_deg,
+                      min_len_mm, integrator, max_step_mm, max_sag_mm)
+    starts = page.mm_to_px(_grid_seeds(tr.mask, page, spacing_mm, rng))
+    starts = starts[tr.inside(starts)]
+
+    lines: list[np.ndarray] = []
+    cand = np.zeros((0, 2))
+    side = np.zeros(0, np.int64)  # queue id, ascending along cand
+    ready = np.zeros((0, 2))      # the generation being fed
+    n_sides = 0
+    traced = 0.0  # px of accepted line, for the stride
+    si = 0
+
+    def feed(m: int) -> np.ndarray:
+        nonlocal cand, side, ready, si
+        out = []
+        while m > 0:
+            if not len(ready) and len(cand):
+                free = ~tr.grid.too_close(cand)
+                cand, side = cand[free], side[free]
+                ids, first = np.unique(side, return_index=True)
+                rank = np.arange(len(side)) - first[np.searchsorted(ids,
+                                                                    side)]
+                stride = max(int(traced / max(len(lines), 1) / tr.spacing),
+                             1)
+                take = rank % stride == 0
+                ready, cand, side = cand[take], cand[~take], side[~take]
+            if len(ready):
+                got, ready = ready[:m], ready[m:]
+            elif si < len(starts):
+                got = starts[si:si + 4 * m]
+                si += len(got)
+            else:
+                break
+            got = got[~tr.grid.too_close(got)][:m]
+            out.append(got)
+            m -= len(got)
+        return np.concatenate(out) if out else np.zeros((0, 2))
+
+    for got in tr.stream(feed, batch):
+        new = PolylineBatch.from_lines(got)
+        lines += PolylineBatch(page.px_to_mm(new.verts), new.offsets).lines()
+        traced += float(new.lengths().sum())
+        # candidates: every spacing along each new line, spacing off it
+        # on both sides; a side's queue is contiguous and in arc order
+        rs = new.resample(tr.spacing)
+        q, a, b = rs.verts, rs.offsets[:-1], rs.offsets[1:] - 1
+        t = np.empty_like(q)
+        t[1:-1] = (q[2:] - q[:-2]) / 2  # np.gradient, line by line
+        t[a], t[b] = q[a + 1] - q[a], q[b] - q[b - 1]
+        t /= np.maximum(np.hypot(t[:, 0], t[:, 1]), 1e-9)[:, None]
+        nrm = np.column_stack([-t[:, 1], t[:, 0]]) * tr.spacing
+        ids = n_sides + 2 * rs.line_ids()
+        c = np.concatenate([q + nrm, q - nrm])
+        s = np.concatenate([ids, ids + 1])
+        order = np.argsort(s, kind="stable")
+        c, s = c[order], s[order]
+        ok = tr.inside(c)
+        cand = np.concatenate([cand, c[ok]])
+        side = np.concatenate([side, s[ok]])
+        n_sides += 2 * len(got)
+    return lines
+
+
+def _first(hit: np.ndarray, default: int) -> int:
+    """Index of the first True, else default."""
+    idx = np.flatnonzero(hit)
+    return int(idx[0]) if idx.size else default
+
+
+# ------------------------------------------------------------------ atlas
+
+ATLAS_COARSEST_MM = 8.0
+ATLAS_LEVELS_PER_OCTAVE = 4  # spacing ladder ratio 2^(1/4), ~19%
+# page area / ink length that trace_streamlines lays, per mm of spacing
+# (measured on the fixtures: 1.16-1.23 from 0.8 to 2 mm)
+ATLAS_KAPPA = 1.2
+
+
+def atlas_level(spacing_mm: float) -> int:
+    """Atlas level whose nominal spacing is nearest (in log) spacing_mm."""
+    return max(int(round(ATLAS_LEVELS_PER_OCTAVE *
+                         np.log2(ATLAS_COARSEST_MM / spacing_mm))), 0)
+
+
+def atlas_spacing(level: int) -> float:
+    return ATLAS_COARSEST_MM * 2.0 ** (-level / ATLAS_LEVELS_PER_OCTAVE)
+
+
+def _atlas_level(ctx: dict, level: int, field_args: tuple,
+                 batch: int = 16) -> tuple[np.ndarray, np.ndarray]:
+    """The lines level `level` adds to the ones above it: traced over the
+    whole page at atlas_spacing(level), against an occupancy grid that
+    already holds every coarser level. -> (verts px, offsets), memoized
+    per ctx."""
+    def build():
+        above = [PolylineBatch(*_atlas_level(ctx, j, field_args))
+                 for j in range(level)]
+        page = ctx["page"]
+        full = np.ones(np.shape(ctx["gray"])[:2], bool)
+        tr = _BatchTracer(full, ctx, atlas_spacing(level), *field_args)
+        for b in above:
+            if len(b.verts):
+                tr.grid.add(b.verts)
+        rng = np.random.default_rng([level])
+        seeds = page.mm_to_px(_grid_seeds(full, page, atlas_spacing(level),
+                                          rng))
+        seeds = seeds[tr.inside(seeds)]
+        b = PolylineBatch.from_lines(
+            [pts for pts, _n, _j in _lockstep(tr, seeds, batch)])
+        return b.verts, b.offsets
+    return derived(ctx, ("_atlas", field_args, level), build)
+
+
+def trace_streamlines_atlas(mask: np.ndarray, ctx: dict, spacing_mm: float,
+                            rng: np.random.Generator | None = None,
+                            step_mm: float = 0.8,
+                            max_len_mm: float = 500.0,
+                            fallback_angle_deg: float = 50.0,
+                            min_coherence: float = 0.05,
+                            angle_offset_deg: float = 0.0,
+                            min_len_mm: float = 2.0,
+                            integrator: str = "euler",
+                            max_step_mm: float = 3.0,
+                            max_sag_mm: float = 0.1) -> list[np.ndarray]:
+    """Streamlines at ~spacing_mm cut from a per-ctx multi-density atlas.
+
+    The atlas is traced once per photo (and field settings), over the
+    whole page, coarsest spacing first; each finer level only fills in
+    between the lines of the coarser ones. So the set for one spacing is
+    a nested subset of every denser set, and a dark band's hatching
+    extends the lighter band's beside it instead of re-randomizing.
+    Every call after the first only clips lines to its mask.
+
+    Nesting leaves gaps a free tracer would fill, so the level is picked
+    by ink, not by name: the one whose page-wide density is nearest what
+    trace_streamlines lays at spacing_mm (usually a level or two finer).
+    rng is not drawn from: the atlas belongs to the photo."""
+    field_args = (step_mm, max_len_mm, fallback_angle_deg, min_coherence,
+                  angle_offset_deg, 2.0, integrator, max_step_mm,
+                  max_sag_mm)  # atlas lines keep the default min length
+    page = ctx["page"]
+    area = np.prod(np.shape(ctx["gray"])[:2]) * page.mm_per_px ** 2
+    target = np.log(ATLAS_KAPPA * spacing_mm)
+    levels, ink, err = [], 0.0, np.inf
+    for k in range(atlas_level(spacing_mm) + ATLAS_LEVELS_PER_OCTAVE + 1):
+        b = PolylineBatch(*_atlas_level(ctx, k, field_args))
+        ink += float(b.lengths().sum()) * page.mm_per_px
+        e = np.log(area / max(ink, 1e-9)) - target
+        if e < 0 and -e >= err:
+            break  # the level above was nearer
+        levels.append(b)
+        err = abs(e)
+        if e <= 0:
+            break
+    b = PolylineBatch.concat(levels)
+    if not len(b.verts):
+        return []
+    m = np.asarray(mask)
+    h, w = m.shape
+    xi = b.verts[:, 0].astype(np.int64)
+    yi = b.verts[:, 1].astype(np.int64)
+    keep = (xi >= 0) & (xi < w) & (yi >= 0) & (yi < h)
+    keep[keep] = m[yi[keep], xi[keep]]
+    runs = b.slice_runs(keep)
+    runs = PolylineBatch(page.px_to_mm(runs.verts), runs.offsets)
+    return [ln for ln, n in zip(runs.lines(), runs.lengths())
+            if n >= min_len_mm]
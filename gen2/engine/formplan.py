@@ -29,7 +29,7 @@ import shapely
 from shapely.geometry import Polygon, box
 from shapely.ops import unary_union
 
-from .hatch import fixed_hatch
+from .hatch import HatchBatch
 from .plan import OPS, _adjacency, _kmeans1d, _masses
 from .regions import aniso_mesh, object_scene
 from .scene import load_normals, load_scene, load_semantic, normals_field
@@ -176,13 +176,13 @@ def render_form_plan(plan: dict, rng: np.random.Generator,
     finer pen resolution (user: 'little lines much higher res')."""
     w_mm, h_mm = plan["w_mm"], plan["h_mm"]
     forms = plan["forms"]
-    hatch = []
+    hb = HatchBatch()
 
     land_union = unary_union([f["poly"] for f in forms])
     if plan["sky"] is not None:
         sky_fill = plan["sky"].difference(land_union.buffer(1.4))
-        hatch += fixed_hatch(sky_fill, 2.0, 1.15 * spacing_scale, rng,
-                             spacing_jitter=0.05)
+        hb.add(sky_fill, 2.0, 1.15 * spacing_scale, rng,
+               spacing_jitter=0.05)
 
     auras = [1.1 if f["level"] >= 2 else 0.0 for f in forms]
     pairs = object_scene([f["poly"] for f in forms], auras)
@@ -196,8 +196,7 @@ def render_form_plan(plan: dict, rng: np.random.Generator,
         sp = sp * spacing_scale
         if f["level"] <= 1:
             # calm register: one unbroken sweep at the committed angle
-            hatch += fixed_hatch(fill, f["angle"], sp, rng,
-                                 spacing_jitter=0.05)
+            hb.add(fill, f["angle"], sp, rng, spacing_jitter=0.05)
             continue
         # rock register: faceted fill, micro-commitments around the angle
         cells, _nb, _th = aniso_mesh(
@@ -212,15 +211,14 @@ def render_form_plan(plan: dict, rng: np.random.Generator,
                 continue
             ang = f["angle"] + float(rng.choice(
                 [-15.0, 0.0, 0.0, 0.0, 15.0]))
-            hatch += fixed_hatch(cc, ang, sp, rng, spacing_jitter=0.05)
+            hb.add(cc, ang, sp, rng, spacing_jitter=0.05)
             covered = cc if covered is None else covered.union(cc)
         rest = (fill if covered is None
                 else fill.difference(covered)).buffer(-0.55).buffer(0.5)
         for part in getattr(rest, "geoms", [rest]):
             if not part.is_empty and part.area > 3.0:
-                hatch += fixed_hatch(part, f["angle"], sp, rng,
-                                     spacing_jitter=0.05)
-    return {"black03": hatch}
+                hb.add(part, f["angle"], sp, rng, spacing_jitter=0.05)
+    return {"black03": hb.run().lines()}
 
 
 def build_normal_form_plan(photo_path: str, w_mm: float = 130.0,
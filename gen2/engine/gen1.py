@@ -24,6 +24,7 @@ Scale rule: original px -> mm at 0.38 (500px canvas ≈ 190mm sheet).
 import numpy as np
 
 from .geom import clip_lines
+from .hatch import HatchBatch
 from .regions import (composite_outline, effective_regions, make_shape,
                       material_union)
 
@@ -77,6 +78,8 @@ def styled_lines(region, pattern: dict, rng: np.random.Generator,
     minx, miny, maxx, maxy = minx - pad, miny - pad, maxx + pad, maxy + pad
     diag = float(np.hypot(maxx - minx, maxy - miny))
     cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    if style in ("regular", "exponential"):
+        hb = HatchBatch(pattern.get("clip", "shapely"))
     out = []
     for angle in pattern["angles"]:
         th = np.deg2rad(angle)
@@ -92,24 +95,26 @@ def styled_lines(region, pattern: dict, rng: np.random.Generator,
         else:
             k = int(np.ceil(diag / spacing))
             offs = [i * spacing - diag / 2 for i in range(2 * k + 1)]
+        if style in ("regular", "exponential"):
+            hb.add_offsets(region, (cx, cy), angle, offs, diag / 2,
+                           min_len_mm)
+            continue
         for off in offs:
             base = np.array([cx, cy]) + n * off
-            if style in ("regular", "exponential"):
-                ln = np.array([base - d * diag / 2, base + d * diag / 2])
-            else:
-                npts = pattern.get("num_points", 10)
-                t = np.linspace(-0.5, 0.5, npts + 1)
-                pts = base[None] + d[None] * (t * diag)[:, None]
-                if style == "wavy":
-                    amp = pattern.get("wave_amplitude", 5) * PX2MM
-                    freq = pattern.get("wave_frequency", 0.1)
-                    wob = np.sin((t + .5) * np.pi * 2 * freq * npts) * amp
-                else:  # noisy
-                    amp = pattern.get("noise_amplitude", 10) * PX2MM \
-                        * pattern.get("noise_scale", 0.1) * diag / 10
-                    wob = rng.uniform(-1, 1, len(t)) * amp
-                ln = pts - n[None] * wob[:, None]
-            out.append(ln)
+            npts = pattern.get("num_points", 10)
+            t = np.linspace(-0.5, 0.5, npts + 1)
+            pts = base[None] + d[None] * (t * diag)[:, None]
+            if style == "wavy":
+                amp = pattern.get("wave_amplitude", 5) * PX2MM
+                freq = pattern.get("wave_frequency", 0.1)
+                wob = np.sin((t + .5) * np.pi * 2 * freq * npts) * amp
+            else:  # noisy
+                amp = pattern.get("noise_amplitude", 10) * PX2MM \
+                    * pattern.get("noise_scale", 0.1) * diag / 10
+                wob = rng.uniform(-1, 1, len(t)) * amp
+            out.append(pts - n[None] * wob[:, None])
+    if style in ("regular", "exponential"):
+        return hb.run().lines()
     return clip_lines(out, region, min_len_mm=min_len_mm)
 
 
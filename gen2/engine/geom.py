@@ -1,4 +1,5 @@
-"""Polyline helpers. A Polyline is an (N,2) float64 ndarray in page mm."""
+"""Polyline helpers. A Polyline is an (N,2) float64 ndarray in page mm;
+a PolylineBatch packs many of them into one vertex buffer."""
 
 import numpy as np
 import shapely
@@ -56,3 +57,210 @@ def clip_lines(lines: list[Polyline], region,
             if len(piece) >= 2 and length(piece) >= min_len_mm:
                 out.append(piece)
     return out
+
+
+class PolylineBatch:
+    """Many polylines packed: one contiguous (V,2) float64 vertex buffer,
+    (n+1,) int64 offsets (line i = verts[offsets[i]:offsets[i+1]]) and
+    (n,) int32 per-line tags (source stage, pen, ... — caller's choice).
+
+    A dense render is 100k+ tiny (N,2) arrays; packed, a pass is one NumPy
+    op over all vertices instead of a Python loop over lines. It is also a
+    Sequence of Polyline views, so any list consumer accepts it as is, and
+    lines() is the list form back (views, no copy)."""
+
+    __slots__ = ("verts", "offsets", "tags")
+
+    def __init__(self, verts: np.ndarray, offsets: np.ndarray,
+                 tags: np.ndarray | None = None):
+        self.verts = np.asarray(verts, np.float64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, np.int64)
+        n = len(self.offsets) - 1
+        self.tags = (np.zeros(n, np.int32) if tags is None
+                     else np.asarray(tags, np.int32))
+
+    @classmethod
+    def from_lines(cls, lines, tags=None) -> "PolylineBatch":
+        if isinstance(lines, cls):
+            return lines if tags is None else cls(lines.verts, lines.offsets,
+                                                  np.broadcast_to(
+                                                      tags, len(lines)))
+        lines = list(lines)
+        counts = [len(ln) for ln in lines]
+        verts = (np.concatenate(lines) if lines and sum(counts)
+                 else np.zeros((0, 2)))
+        off = np.zeros(len(lines) + 1, np.int64)
+        np.cumsum(counts, out=off[1:])
+        if tags is not None:
+            tags = np.broadcast_to(tags, len(lines))
+        return cls(verts, off, tags)
+
+    @classmethod
+    def concat(cls, batches) -> "PolylineBatch":
+        batches = [cls.from_lines(b) for b in batches]
+        if not batches:
+            return cls.from_lines([])
+        base = np.cumsum([0] + [len(b.verts) for b in batches[:-1]])
+        off = np.concatenate([[0]] + [b.offsets[1:] + s
+                                      for b, s in zip(batches, base)])
+        return cls(np.concatenate([b.verts for b in batches]), off,
+                   np.concatenate([b.tags for b in batches]))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.take(np.arange(len(self))[i])
+        if i < 0:
+            i += len(self)
+        return self.verts[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        return iter(self.lines())
+
+    def lines(self) -> list[Polyline]:
+        """The list[Polyline] compatibility view (no copies)."""
+        return np.split(self.verts, self.offsets[1:-1]) if len(self) else []
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def line_ids(self) -> np.ndarray:
+        """Owning line index of every vertex."""
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def take(self, idx) -> "PolylineBatch":
+        """Lines idx (indices or bool mask), in that order."""
+        idx = np.arange(len(self))[idx]
+        c = self.counts[idx]
+        off = np.zeros(len(idx) + 1, np.int64)
+        np.cumsum(c, out=off[1:])
+        src = np.repeat(self.offsets[idx] - off[:-1], c) + np.arange(off[-1])
+        return PolylineBatch(self.verts[src], off, self.tags[idx])
+
+    def seg_lengths(self) -> np.ndarray:
+        """(V-1,) segment lengths; the seams between lines count 0."""
+        d = np.diff(self.verts, axis=0)
+        seg = np.hypot(d[:, 0], d[:, 1])
+        seams = self.offsets[1:-1] - 1
+        seg[seams[(seams >= 0) & (seams < len(seg))]] = 0.0
+        return seg
+
+    def _arclen(self) -> np.ndarray:
+        """(V,) cumulative arc length, continuous across lines."""
+        return np.concatenate([[0.0], np.cumsum(self.seg_lengths())])
+
+    def lengths(self) -> np.ndarray:
+        """Per-line arc length (== length() per line, to float rounding)."""
+        if not len(self.verts):
+            return np.zeros(len(self))
+        cum = self._arclen()
+        a = self.offsets[:-1]
+        b = np.maximum(self.offsets[1:] - 1, a)
+        return np.where(self.counts > 0,
+                        cum[np.minimum(b, len(cum) - 1)] -
+                        cum[np.minimum(a, len(cum) - 1)], 0.0)
+
+    def resample(self, step_mm: float) -> "PolylineBatch":
+        """resample() on every line at once (same sample counts; positions
+        agree to float rounding). Endpoints are kept exactly; degenerate
+        lines pass through unchanged, as in resample()."""
+        total = self.lengths()
+        move = total >= 1e-9
+        n = np.where(move, np.maximum(np.ceil(total / step_mm), 1), 0
+                     ).astype(np.int64)
+        m = np.where(move, n + 1, self.counts)
+        off = np.zeros(len(self) + 1, np.int64)
+        np.cumsum(m, out=off[1:])
+        out = np.empty((off[-1], 2))
+        # degenerate lines: copied through
+        keep = np.flatnonzero(~move)
+        if keep.size:
+            kc = self.counts[keep]
+            k = np.arange(kc.sum()) - np.repeat(np.cumsum(kc) - kc, kc)
+            out[np.repeat(off[keep], kc) + k] = \
+                self.verts[np.repeat(self.offsets[keep], kc) + k]
+        mv = np.flatnonzero(move)
+        if mv.size:
+            cum = self._arclen()
+            mc = m[mv]
+            line = np.repeat(mv, mc)
+            k = np.arange(mc.sum()) - np.repeat(np.cumsum(mc) - mc, mc)
+            s = k * (1.0 / n[line]) * total[line]
+            start = self.offsets[line]
+            j = np.searchsorted(cum, cum[start] + s, side="right") - 1
+            j = np.clip(j, start, self.offsets[line + 1] - 2)
+            seg = cum[j + 1] - cum[j]
+            t = np.where(seg > 0, (cum[start] + s - cum[j]) /
+                         np.where(seg > 0, seg, 1.0), 0.0)
+            t = np.clip(t, 0.0, 1.0)[:, None]
+            pts = self.verts[j] * (1 - t) + self.verts[j + 1] * t
+            first = k == 0
+            last = k == mc.repeat(mc) - 1
+            pts[first] = self.verts[self.offsets[mv]]
+            pts[last] = self.verts[self.offsets[mv + 1] - 1]
+            out[off[line] + k] = pts
+        return PolylineBatch(out, off, self.tags)
+
+    def slice_runs(self, keep: np.ndarray,
+                   min_verts: int = 2) -> "PolylineBatch":
+        """Cut every line into its maximal runs of kept vertices (one
+        bool per vertex); runs shorter than min_verts are dropped. Tags
+        follow their line."""
+        keep = np.asarray(keep, bool)
+        if not keep.any():
+            return PolylineBatch.from_lines([])
+        starts = np.zeros(len(self.verts), bool)
+        starts[self.offsets[:-1][self.counts > 0]] = True
+        prev = np.concatenate([[False], keep[:-1]])
+        head = keep & (starts | ~prev)
+        run = np.cumsum(head)[keep] - 1
+        rc = np.bincount(run)
+        ok = rc >= min_verts
+        sel = ok[run]
+        off = np.zeros(int(ok.sum()) + 1, np.int64)
+        np.cumsum(rc[ok], out=off[1:])
+        tags = self.tags[self.line_ids()[head]][ok]
+        return PolylineBatch(self.verts[keep][sel], off, tags)
+
+    def cut(self, line, lo, hi) -> "PolylineBatch":
+        """Pieces by arc length: piece k is line[k] between lo[k] and hi[k]
+        mm along it — interpolated end points around the vertices strictly
+        inside. lo < 0 / hi > length extrapolate along the first / last
+        segment. Lines need >= 2 vertices; tags follow their line."""
+        line = np.asarray(line, np.int64)
+        cum = self._arclen()
+        start, end = self.offsets[line], self.offsets[line + 1]
+        c0 = cum[start]
+        a, z = c0 + lo, c0 + hi
+
+        def at(s):
+            k = np.clip(np.searchsorted(cum, s, side="right") - 1, start,
+                        end - 2)
+            seg = cum[k + 1] - cum[k]
+            t = np.where(seg > 0, (s - cum[k]) / np.where(seg > 0, seg, 1.0),
+                         0.0)[:, None]
+            return self.verts[k] + t * (self.verts[k + 1] - self.verts[k])
+
+        j0 = np.clip(np.searchsorted(cum, a, side="right"), start, end)
+        j1 = np.clip(np.searchsorted(cum, z, side="left"), start, end)
+        inner = np.maximum(j1 - j0, 0)
+        off = np.zeros(len(line) + 1, np.int64)
+        np.cumsum(inner + 2, out=off[1:])
+        out = np.empty((off[-1], 2))
+        k = np.arange(inner.sum()) - np.repeat(np.cumsum(inner) - inner,
+                                               inner)
+        out[np.repeat(off[:-1] + 1, inner) + k] = \
+            self.verts[np.repeat(j0, inner) + k]
+        out[off[:-1]] = at(a)
+        out[off[1:] - 1] = at(z)
+        return PolylineBatch(out, off, self.tags[line])
+
+
+Lines = list[Polyline] | PolylineBatch
+
+
+def as_batch(lines: Lines, tags=None) -> PolylineBatch:
+    return PolylineBatch.from_lines(lines, tags)
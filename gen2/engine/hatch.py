@@ -3,43 +3,176 @@
 Generates raw polylines clipped to a region. No humanization here —
 wobble/jitter/overshoot is the shared post-pass in humanize.py, never baked
 into a module.
+
+Clipping is geom.clip_lines (shapely) by default. clip="scanline" clips
+analytically instead: the region's edges, holes included, go into the
+hatch frame — across-offset for parallel lines, angle about the pivot for
+fans — every line's crossings come out of one sorted search, and sorted
+along the line they pair up into inside intervals. Same pieces as
+clip_lines to float rounding, ~190x faster, without a LineString and an
+intersection() per line. Opt-in, because that rounding can move a piece
+across min_len_mm or a humanize resample count by one, so stored genomes
+would not replay line for line. HatchBatch / hatch_many batch many small
+regions either way (patch, mosaic, shingle, formplan, gen1); by default
+as one vectorized shapely intersection over all their lines, ~2x faster
+than clip_lines region by region, with the same pieces.
 """
 
 import numpy as np
+import shapely
 
-from .geom import Polyline, clip_lines
+from .geom import Polyline, PolylineBatch, clip_lines, length
 
 
 def fixed_hatch(region, angle_deg: float, spacing_mm: float,
                 rng: np.random.Generator,
                 spacing_jitter: float = 0.12,
-                min_len_mm: float = 0.8) -> list[Polyline]:
+                min_len_mm: float = 0.8,
+                clip: str = "shapely") -> list[Polyline]:
     """Parallel lines at angle_deg clipped to a shapely region (mm)."""
-    if region.is_empty:
-        return []
-    minx, miny, maxx, maxy = region.bounds
-    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
-    th = np.deg2rad(angle_deg)
-    d = np.array([np.cos(th), np.sin(th)])    # along-line direction
-    nrm = np.array([-np.sin(th), np.cos(th)])  # across-line normal
+    hb = HatchBatch(clip)
+    hb.add(region, angle_deg, spacing_mm, rng, spacing_jitter, min_len_mm)
+    return hb.run().lines()
 
-    # cover the bbox diagonal from the center in both normal directions
-    half = float(np.hypot(maxx - minx, maxy - miny)) / 2 + spacing_mm
-    lines = []
-    off = -half
-    while off <= half:
-        base = np.array([cx, cy]) + nrm * off
-        lines.append(np.array([base - d * half, base + d * half]))
-        off += spacing_mm * (1.0 + rng.uniform(-spacing_jitter,
-                                               spacing_jitter))
-    return clip_lines(lines, region, min_len_mm=min_len_mm)
+
+class HatchBatch:
+    """fixed_hatch for many regions, clipped in one pass.
+
+    add() draws a region's spacing jitter on the spot, so draws the caller
+    makes between regions (angle jitter, swatch shapes) interleave exactly
+    as around per-region fixed_hatch calls; run() then clips every line of
+    every region at once (one shapely call, or clip="scanline") and packs
+    the pieces, tagged per region (by default its add() index)."""
+
+    def __init__(self, clip: str = "shapely"):
+        self.clip = clip
+        self._items: list[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, region, angle_deg: float, spacing_mm: float,
+            rng: np.random.Generator, spacing_jitter: float = 0.12,
+            min_len_mm: float = 0.8, tag: int | None = None) -> None:
+        if region.is_empty:
+            return
+        minx, miny, maxx, maxy = region.bounds
+        # cover the bbox diagonal from the center in both normal directions
+        half = float(np.hypot(maxx - minx, maxy - miny)) / 2 + spacing_mm
+        offs = []
+        off = -half
+        while off <= half:
+            offs.append(off)
+            off += spacing_mm * (1.0 + rng.uniform(-spacing_jitter,
+                                                   spacing_jitter))
+        self.add_offsets(region, ((minx + maxx) / 2, (miny + maxy) / 2),
+                         angle_deg, offs, half, min_len_mm, tag)
+
+    def add_offsets(self, region, center, angle_deg: float, offs,
+                    half: float, min_len_mm: float = 0.8,
+                    tag: int | None = None) -> None:
+        """The lines center + nrm*off +- d*half, offs ascending (d along
+        angle_deg, nrm across it), clipped to region."""
+        if region.is_empty or not len(offs):
+            return
+        th = np.deg2rad(angle_deg)
+        d = np.array([np.cos(th), np.sin(th)])    # along-line direction
+        nrm = np.array([-np.sin(th), np.cos(th)])  # across-line normal
+        self._items.append((region, np.asarray(center, float), d, nrm,
+                            np.asarray(offs, float), float(half),
+                            float(min_len_mm),
+                            len(self._items) if tag is None else tag))
+
+    def run(self) -> PolylineBatch:
+        if not self._items:
+            return PolylineBatch.from_lines([])
+        if self.clip != "scanline":
+            return self._run_shapely()
+        region, c, d, nrm, offs, half, min_len, tag = zip(*self._items)
+        c, d, nrm = np.array(c), np.array(d), np.array(nrm)
+        half, min_len = np.array(half), np.array(min_len)
+        lg = np.repeat(np.arange(len(offs)), [len(o) for o in offs])
+        offs = np.concatenate(offs)
+        a, b, eg = _edges(region)
+        # edges in their region's hatch frame: u along the lines, v across
+        ua, ub = _dot(a - c[eg], d[eg]), _dot(b - c[eg], d[eg])
+        va, vb = _dot(a - c[eg], nrm[eg]), _dot(b - c[eg], nrm[eg])
+        line, edge = _spans(offs, np.minimum(va, vb), np.maximum(va, vb),
+                            *((lg, eg) if len(self._items) > 1 else ()))
+        f = (offs[line] - va[edge]) / (vb[edge] - va[edge])
+        u = ua[edge] + f * (ub[edge] - ua[edge])
+        line, u0, u1 = _inside(line, u, -half[lg], half[lg])
+        g = lg[line]
+        base = c[g] + nrm[g] * offs[line, None]
+        p0, p1 = base + d[g] * u0[:, None], base + d[g] * u1[:, None]
+        keep = np.hypot(*(p1 - p0).T) >= min_len[g]
+        n = int(keep.sum())
+        return PolylineBatch(np.stack([p0[keep], p1[keep]], axis=1),
+                             np.arange(0, 2 * n + 1, 2),
+                             np.asarray(tag)[g[keep]])
+
+    def _run_shapely(self) -> PolylineBatch:
+        """clip_lines over every line of every region, vectorized: one
+        LineString array, one intersects() and one intersection() call
+        against the regions repeated per line. Same pieces, bit for bit,
+        in the same order."""
+        ends, counts, regions, min_len, tags = [], [], [], [], []
+        for region, c, d, nrm, offs, half, ml, tag in self._items:
+            # offsets cast to the angle's dtype, as fixed_hatch always
+            # built its lines with python floats: a float32 angle keeps
+            # nrm * off in float32
+            base = c + nrm * offs.astype(nrm.dtype)[:, None]
+            ends.append(np.stack([base - d * half, base + d * half], 1))
+            counts.append(len(offs))
+            shapely.prepare(region)
+            regions.append(region)
+            min_len.append(ml)
+            tags.append(tag)
+        g = np.repeat(np.arange(len(regions)), counts)
+        reg = np.empty(len(regions), object)
+        reg[:] = regions
+        lines = shapely.linestrings(np.concatenate(ends))
+        hit = np.flatnonzero(shapely.intersects(reg[g], lines))
+        got = shapely.intersection(reg[g[hit]], lines[hit])
+        parts, i = shapely.get_parts(got, return_index=True)
+        line = shapely.get_type_id(parts) == 1  # points etc. dropped
+        parts, g = parts[line], g[hit[i[line]]]
+        xy, j = shapely.get_coordinates(parts, return_index=True)
+        n = np.bincount(j, minlength=len(parts))
+        b = PolylineBatch(xy, np.concatenate([[0], np.cumsum(n)]),
+                          np.asarray(tags, np.int32)[g])
+        # length() per piece, bit for bit: sequential sums, which is how
+        # numpy sums fewer than 8 segments; longer pieces ask length()
+        ln, two = np.zeros(len(b)), np.flatnonzero(n >= 2)
+        if len(two):
+            ln[two] = np.add.reduceat(b.seg_lengths(), b.offsets[two])
+        for k in np.flatnonzero(n > 8):
+            ln[k] = length(b[k])
+        return b.take((n >= 2) & (ln >= np.asarray(min_len)[g]))
+
+
+def hatch_many(polys, angles, spacings, jitters,
+               rng: np.random.Generator,
+               min_len_mm: float = 0.8,
+               clip: str = "shapely") -> PolylineBatch:
+    """fixed_hatch over a list of regions in one pass — same draws, in the
+    same order, as calling it per region. angles/spacings/jitters are
+    per region (or one value for all); pieces are tagged by region
+    index."""
+    n = len(polys)
+    hb = HatchBatch(clip)
+    for i, (poly, a, s, j) in enumerate(zip(
+            polys, np.broadcast_to(angles, n), np.broadcast_to(spacings, n),
+            np.broadcast_to(jitters, n))):
+        hb.add(poly, float(a), float(s), rng, float(j), min_len_mm, tag=i)
+    return hb.run()
 
 
 def fan_hatch(region, pivot_mm, spacing_mm: float,
               rng: np.random.Generator,
               spacing_jitter: float = 0.12,
-              min_len_mm: float = 0.8, max_rays: int = 4000
-              ) -> list[Polyline]:
+              min_len_mm: float = 0.8, max_rays: int = 4000,
+              clip: str = "shapely") -> list[Polyline]:
     """Rays through a pivot point clipped to a shapely region (mm).
 
     With the pivot far off-page the strokes read as near-parallel but
@@ -69,10 +202,128 @@ def fan_hatch(region, pivot_mm, spacing_mm: float,
         a1 = float(ang[0] + rel.max()) + dth
         r0 = max(float(rad.min()) - spacing_mm, 0.0)
     r1 = float(rad.max()) + spacing_mm
-    lines = []
+    ths = []
     th = a0
-    while th <= a1 and len(lines) < max_rays:
+    while th <= a1 and len(ths) < max_rays:
+        ths.append(th)
+        th += dth * (1.0 + rng.uniform(-spacing_jitter, spacing_jitter))
+    if not ths:
+        return []
+    if clip == "scanline":
+        return _clip_fan(region, p, np.array(ths), r0, r1, min_len_mm)
+    lines = []
+    for th in ths:
         d = np.array([np.cos(th), np.sin(th)])
         lines.append(np.array([p + d * r0, p + d * r1]))
-        th += dth * (1.0 + rng.uniform(-spacing_jitter, spacing_jitter))
     return clip_lines(lines, region, min_len_mm=min_len_mm)
+
+
+def _clip_fan(region, p: np.ndarray, ths: np.ndarray, r0: float, r1: float,
+              min_len_mm: float) -> list[Polyline]:
+    """clip_lines of the rays p + (cos th, sin th)*[r0, r1] (ths
+    ascending, spanning < 2pi), as a scanline fill in polar form."""
+    a, b, _ = _edges([region])
+    # edges as angle intervals about the pivot, from the first ray
+    tau = 2 * np.pi
+    pa = (np.arctan2(a[:, 1] - p[1], a[:, 0] - p[0]) - ths[0]) % tau
+    pb = (np.arctan2(b[:, 1] - p[1], b[:, 0] - p[0]) - ths[0]) % tau
+    lo, hi = np.minimum(pa, pb), np.maximum(pa, pb)
+    wrap = hi - lo > np.pi  # the edge spans angle 0: [hi, lo + 2pi)
+    lo, hi = np.where(wrap, hi, lo), np.where(wrap, lo + tau, hi)
+    rel = ths - ths[0]
+    hits = [_spans(rel, lo + k, hi + k) for k in (0.0, -tau)]
+    line = np.concatenate([h[0] for h in hits])
+    edge = np.concatenate([h[1] for h in hits])
+    d = np.column_stack([np.cos(ths), np.sin(ths)])
+    e = b - a
+    ap = a - p
+    den = d[line, 0] * e[edge, 1] - d[line, 1] * e[edge, 0]
+    ok = den != 0
+    line, edge, den = line[ok], edge[ok], den[ok]
+    r = (ap[edge, 0] * e[edge, 1] - ap[edge, 1] * e[edge, 0]) / den
+    # an odd number of crossings: the ray starts inside (pivot in region)
+    odd = np.bincount(line, minlength=len(ths)) % 2 == 1
+    line, t0, t1 = _inside(line, r, r0, r1, start_inside=odd)
+    return _segments(p + d[line] * t0[:, None], p + d[line] * t1[:, None],
+                     min_len_mm)
+
+
+def _edges(regions) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Start and end points (E,2) of every ring edge of the (Multi)Polygon
+    regions, holes included, and the index of the region each is from."""
+    parts, owner = shapely.get_parts(np.asarray(regions, object),
+                                     return_index=True)
+    poly = shapely.get_type_id(parts) == 3  # polygons only
+    rings, rown = shapely.get_rings(parts[poly], return_index=True)
+    xy, ring = shapely.get_coordinates(rings, return_index=True)
+    same = ring[1:] == ring[:-1]
+    return (xy[:-1][same], xy[1:][same],
+            owner[poly][rown[ring[:-1][same]]])
+
+
+def _dot(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    return p[:, 0] * q[:, 0] + p[:, 1] * q[:, 1]
+
+
+def _spans(pos: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+           pos_group: np.ndarray | None = None,
+           group: np.ndarray | None = None
+           ) -> tuple[np.ndarray, np.ndarray]:
+    """Every (line, edge) with lo[edge] <= pos[line] < hi[edge] — within
+    the edge's group, if grouped (pos then sorted per group, groups
+    ascending). Half-open, so a line through a shared vertex crosses
+    once."""
+    if pos_group is None:
+        i0, i1 = np.searchsorted(pos, lo), np.searchsorted(pos, hi)
+    else:
+        i0 = _group_search(pos, pos_group, lo, group)
+        i1 = _group_search(pos, pos_group, hi, group)
+    n = np.maximum(i1 - i0, 0)
+    edge = np.repeat(np.arange(len(lo)), n)
+    line = np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n - i0, n)
+    return line, edge
+
+
+def _group_search(pos, pos_group, v, group) -> np.ndarray:
+    """np.searchsorted(pos within v's group, v), as an index into pos."""
+    key = np.concatenate([group, pos_group])
+    val = np.concatenate([v, pos])
+    is_pos = np.concatenate([np.zeros(len(v), bool),
+                             np.ones(len(pos), bool)])
+    order = np.lexsort((is_pos, val, key))  # ties: query before pos
+    before = np.cumsum(is_pos[order]) - is_pos[order]
+    out = np.empty(len(val), np.int64)
+    out[order] = before
+    return out[:len(v)]
+
+
+def _inside(line: np.ndarray, t: np.ndarray, t_min, t_max,
+            start_inside: np.ndarray | None = None) -> tuple:
+    """Crossings (line, parameter) -> the inside intervals (line, t0, t1)
+    clipped to [t_min, t_max] (scalars or per line), in line order then
+    along the line. Each
+    crossing toggles inside/outside, from outside (or from inside, for
+    lines flagged in start_inside)."""
+    order = np.lexsort((t, line))
+    line, t = line[order], t[order]
+    if start_inside is not None and start_inside.any():
+        head = np.flatnonzero(start_inside)
+        at = np.searchsorted(line, head)
+        line = np.insert(line, at, head)
+        t = np.insert(t, at, -np.inf)
+    first = np.searchsorted(line, line)
+    opening = np.flatnonzero((np.arange(len(line)) - first) % 2 == 0)
+    opening = opening[opening + 1 < len(line)]
+    opening = opening[line[opening + 1] == line[opening]]
+    ln = line[opening]
+    t0 = np.maximum(t[opening], t_min if np.isscalar(t_min) else t_min[ln])
+    t1 = np.minimum(t[opening + 1],
+                    t_max if np.isscalar(t_max) else t_max[ln])
+    ok = t1 > t0
+    return ln[ok], t0[ok], t1[ok]
+
+
+def _segments(p0: np.ndarray, p1: np.ndarray,
+              min_len_mm: float) -> list[Polyline]:
+    keep = np.hypot(*(p1 - p0).T) >= min_len_mm
+    return list(np.stack([p0[keep], p1[keep]], axis=1))
@@ -2,13 +2,31 @@
 
 Applied to every module's output so all lines get the same hand-feel.
 Wobble is sampled in PAGE space (x,y in mm), not per-line parameter space,
-so parallel lines never wobble in sync.
+so parallel lines never wobble in sync. The noise is engine.simplex, a
+per-array port of opensimplex that returns its exact floats, so one call
+per line covers every vertex, both octaves, and stored genomes still
+render bit-identically.
+
+wobble="field" (previews use it) samples the same noise from a lattice
+instead: noise space is cut into tiles of FIELD_TILE x FIELD_TILE cells
+of field_step noise units, each tile evaluated once per noise seed and
+kept in a process-wide LRU, and every vertex is a bilinear read. Only
+tiles the lines reach are built. The wobble depends on page position and
+seed only, so re-rendering a band (mutated params, same seed) reads warm
+tiles. Error vs exact evaluation: bilinear error is <= ~1.6 *
+field_step**2 noise units per octave (measured), so |displacement error|
+<= 1.6 * field_step**2 * wobble_amp_mm * (1 + wobble_octave2): ~32 um at
+the defaults, a tenth of a pixel in an 850 px preview of an 11x17 page.
 """
 
+import os
+
 import numpy as np
-from opensimplex import OpenSimplex
 
-from .geom import Polyline, resample, length
+from .ctxcache import LRUCache
+from .geom import (Lines, Polyline, PolylineBatch, as_batch, length,
+                   resample)
+from .simplex import Simplex2
 
 DEFAULTS = {
     "resample_mm": 0.7,
@@ -20,8 +38,13 @@ DEFAULTS = {
     "overshoot_mm": 1.3,
     "break_per_mm": 0.006,      # probability of a gap per mm of length
     "break_gap_mm": 1.1,
+    "wobble": "exact",          # "field": cached lattice, see module doc
+    "field_step": 0.25,         # lattice spacing, noise units
 }
 
+FIELD_TILE = 32  # lattice cells per cached tile side
+_TILES = LRUCache(float(os.environ.get("GART_WOBBLE_MEM_MB", 256)))
+
 
 def _trim_or_extend(line: Polyline, amt_start: float,
                     amt_end: float) -> Polyline:
@@ -65,14 +88,46 @@ def _trim_or_extend(line: Polyline, amt_start: float,
     return out
 
 
-def humanize(lines: list[Polyline], seed: int,
+def _wobble(lines: Lines, seed: int, p: dict):
+    """-> wobble(pts): pts + the page-space displacement, exact or from
+    the cached lattice (wobble="field")."""
+    nx = Simplex2(seed * 2 + 1)
+    ny = Simplex2(seed * 2 + 2)
+    f, f2 = p["wobble_freq"], p["wobble_freq"] * 3.1
+    amp, w2 = p["wobble_amp_mm"], p["wobble_octave2"]
+    if p["wobble"] == "field":
+        # tiles touched by the lines, sampled finer than a tile, padded
+        # by the longest overshoot and half a sample gap
+        pts = as_batch(lines).resample(4.0).verts
+        pad = p["overshoot_mm"] + 3.0
+        step = p["field_step"]
+        lx = (_Lattice(nx, seed * 2 + 1, step, pts * f, pad * f),
+              _Lattice(nx, seed * 2 + 1, step, pts * f2, pad * f2))
+        ly = (_Lattice(ny, seed * 2 + 2, step, pts * f, pad * f),
+              _Lattice(ny, seed * 2 + 2, step, pts * f2, pad * f2))
+
+        def wobble(ln: np.ndarray) -> np.ndarray:
+            x, y = ln[:, 0], ln[:, 1]
+            dx = lx[0](x * f, y * f) + w2 * lx[1](x * f2, y * f2)
+            dy = ly[0](x * f, y * f) + w2 * ly[1](x * f2, y * f2)
+            return ln + amp * np.column_stack([dx, dy])
+    else:
+        def wobble(ln: np.ndarray) -> np.ndarray:
+            n = len(ln)
+            sx = np.concatenate([ln[:, 0] * f, ln[:, 0] * f2])
+            sy = np.concatenate([ln[:, 1] * f, ln[:, 1] * f2])
+            wx, wy = nx.noise2(sx, sy), ny.noise2(sx, sy)
+            dx = wx[:n] + w2 * wx[n:]
+            dy = wy[:n] + w2 * wy[n:]
+            return ln + amp * np.column_stack([dx, dy])
+    return wobble
+
+
+def humanize(lines: Lines, seed: int,
              params: dict | None = None) -> list[Polyline]:
     p = {**DEFAULTS, **(params or {})}
     rng = np.random.default_rng(seed)
-    nx = OpenSimplex(seed * 2 + 1)
-    ny = OpenSimplex(seed * 2 + 2)
-    f, f2 = p["wobble_freq"], p["wobble_freq"] * 3.1
-    amp, w2 = p["wobble_amp_mm"], p["wobble_octave2"]
+    wobble = _wobble(lines, seed, p)
 
     out: list[Polyline] = []
     for ln in lines:
@@ -87,14 +142,7 @@ def humanize(lines: list[Polyline], seed: int,
         if len(ln) < 2 or length(ln) < 0.4:
             continue
 
-        ln = resample(ln, p["resample_mm"])
-        dx = np.array([nx.noise2(x * f, y * f) +
-                       w2 * nx.noise2(x * f2, y * f2)
-                       for x, y in ln])
-        dy = np.array([ny.noise2(x * f, y * f) +
-                       w2 * ny.noise2(x * f2, y * f2)
-                       for x, y in ln])
-        ln = ln + amp * np.column_stack([dx, dy])
+        ln = wobble(resample(ln, p["resample_mm"]))
 
         # break long lines with small pen-lift gaps
         total = length(ln)
@@ -120,6 +168,108 @@ def humanize(lines: list[Polyline], seed: int,
     return out
 
 
+def humanize_batch(lines: Lines, seed: int,
+                   params: dict | None = None) -> PolylineBatch:
+    """humanize() in array ops over the whole batch: same parameters,
+    same distributions, same RNG stream — but drawn in bulk (all ends,
+    then all break counts, then all cuts), so not the same lines as
+    humanize(). For post-passes that already left the staged draw
+    sequence (postpass.py)."""
+    p = {**DEFAULTS, **(params or {})}
+    rng = np.random.default_rng(seed)
+    b = as_batch(lines)
+    b = b.take(b.counts >= 2)
+    n = len(b)
+    # endpoint character: + extends along the end tangent, - trims
+    over = rng.random((n, 2)) < p["overshoot_prob"]
+    amt = np.where(over, rng.uniform(0, p["overshoot_mm"], (n, 2)),
+                   -rng.uniform(0, p["end_jitter_mm"], (n, 2)))
+    lo, hi = -amt[:, 0], b.lengths() + amt[:, 1]
+    ok = np.flatnonzero(hi - lo >= 0.4)
+    b = b.cut(ok, lo[ok], hi[ok])
+    b = b.take(b.lengths() >= 0.4).resample(p["resample_mm"])
+    b = PolylineBatch(_wobble(b, seed, p)(b.verts), b.offsets, b.tags)
+
+    # pen-lift gaps: piece r of a line runs from cut r-1 to cut r
+    total = b.lengths()
+    nb = rng.poisson(total * p["break_per_mm"])
+    owner = np.repeat(np.arange(len(b)), nb)
+    cuts = rng.uniform(0.15, 0.85, nb.sum())
+    cuts = cuts[np.lexsort((cuts, owner))] * total[owner]
+    broken = np.flatnonzero(nb)
+    line = np.repeat(broken, nb[broken] + 1)
+    r = np.arange(len(line)) - np.repeat(np.cumsum(nb[broken] + 1)
+                                         - nb[broken] - 1, nb[broken] + 1)
+    ci = (np.cumsum(nb) - nb)[line] + r
+    gap = p["break_gap_mm"]
+    plo = np.where(r > 0, cuts[np.maximum(ci - 1, 0)] + gap / 2, 0.0) \
+        if len(cuts) else np.zeros(len(line))
+    phi = np.where(r < nb[line], np.maximum(
+        cuts[np.minimum(ci, len(cuts) - 1)] - gap / 2, plo), total[line]) \
+        if len(cuts) else total[line]
+    keep = phi - plo >= 0.5
+    whole = np.flatnonzero(nb == 0)
+    pieces = PolylineBatch.concat([b.take(whole),
+                                   b.cut(line[keep], plo[keep],
+                                         phi[keep])])
+    order = np.argsort(np.concatenate([whole, line[keep]]), kind="stable")
+    return pieces.take(order)
+
+
+def _tile(noise: Simplex2, key: int, step: float, ti: int,
+          tj: int) -> np.ndarray:
+    """(FIELD_TILE+1)^2 lattice values of one tile, [v, u] order; tiles
+    share their edge nodes."""
+    k = (key, step, ti, tj)
+    t = _TILES.get(k)
+    if t is None:
+        g = np.arange(FIELD_TILE + 1)
+        u, v = np.meshgrid((ti * FIELD_TILE + g) * step,
+                           (tj * FIELD_TILE + g) * step)
+        t = noise.noise2(u, v)
+        _TILES.put(k, t)
+    return t
+
+
+class _Lattice:
+    """One noise's lattice, as the cached tiles within pad of pts (noise
+    units); called with (u, v) arrays it
+    interpolates bilinearly. Node values depend only on (key, step, node),
+    never on which tiles are loaded, so the result is pure in the point."""
+
+    def __init__(self, noise: Simplex2, key: int, step: float,
+                 pts: np.ndarray, pad: float):
+        T = FIELD_TILE
+        # probe offsets no further apart than a tile side
+        d = np.linspace(-pad, pad, int(np.ceil(2 * pad / (T * step))) + 1)
+        probe = np.concatenate([pts + [a, b] for a in d for b in d])
+        tiles = np.floor(probe / step).astype(np.int64) // T
+        self.step = step
+        if not len(tiles):
+            tiles = np.zeros((1, 2), np.int64)
+        self.t0 = tiles.min(axis=0)
+        tiles = np.unique(tiles - self.t0, axis=0)
+        self.slot = np.zeros(tiles.max(axis=0)[::-1] + 1, np.int64)
+        self.slot[tiles[:, 1], tiles[:, 0]] = np.arange(len(tiles))
+        self.tiles = np.stack([_tile(noise, key, step, *(t + self.t0))
+                               for t in tiles])
+
+    def __call__(self, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        T = FIELD_TILE
+        gu, gv = u / self.step, v / self.step
+        fu, fv = np.floor(gu), np.floor(gv)
+        iu, iv = fu.astype(np.int64), fv.astype(np.int64)
+        ti, tj = iu // T, iv // T
+        k = self.slot[np.clip(tj - self.t0[1], 0, self.slot.shape[0] - 1),
+                      np.clip(ti - self.t0[0], 0, self.slot.shape[1] - 1)]
+        iu, iv = iu - ti * T, iv - tj * T
+        fu, fv = gu - fu, gv - fv
+        g = self.tiles
+        return ((g[k, iv, iu] * (1 - fu) + g[k, iv, iu + 1] * fu) * (1 - fv)
+                + (g[k, iv + 1, iu] * (1 - fu) + g[k, iv + 1, iu + 1] * fu)
+                * fv)
+
+
 def _slice_by_arclen(ln: Polyline, cum: np.ndarray,
                      lo: float, hi: float) -> Polyline | None:
     if hi - lo < 0.5:
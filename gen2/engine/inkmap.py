@@ -6,6 +6,10 @@ coverage map. Used by the tone_close stage to compute the DEFICIT between
 the tone the source demands and the ink laid so far — Salisbury's (1997)
 importance-driven loop: add strokes where the drawing is still too light,
 stop when matched.
+
+InkCanvas keeps that map alive across the loop: each add() rasterizes
+only the new lines and re-filters only the tiles whose coverage they can
+change, and its coverage is always exactly ink_map() of everything added.
 """
 
 import re
@@ -13,7 +17,7 @@ import re
 import cv2
 import numpy as np
 
-from .geom import Polyline
+from .geom import Lines, as_batch
 
 
 def pen_width_mm(pen: str) -> float:
@@ -21,16 +25,105 @@ def pen_width_mm(pen: str) -> float:
     return int(m.group(1)) / 10.0 if m else 0.3
 
 
-def ink_map(layers: dict[str, list[Polyline]], page,
+def ink_map(layers: dict[str, Lines], page,
             shape: tuple[int, int], blur_mm: float = 1.4) -> np.ndarray:
-    """-> HxW float32 coverage 0..1 (1 = solid ink at this blur scale)."""
-    canvas = np.zeros(shape, np.uint8)
-    for pen, lines in layers.items():
-        t = max(int(round(pen_width_mm(pen) / page.mm_per_px)), 1)
-        pts = [np.round(page.mm_to_px(np.asarray(ln))).astype(np.int32)
-               for ln in lines if len(ln) >= 2]
-        if pts:
-            cv2.polylines(canvas, pts, False, 255, t)
-    k = max(int(round(blur_mm / page.mm_per_px)), 1) * 2 + 1
-    cov = cv2.boxFilter(canvas.astype(np.float32) / 255.0, -1, (k, k))
-    return np.clip(cov, 0.0, 1.0)
+    """-> HxW float32 coverage 0..1 (1 = solid ink at this blur scale).
+    Layers may be lists or PolylineBatches; either way the px transform
+    runs once per layer, over the packed vertices."""
+    return InkCanvas(page, shape, blur_mm, layers).coverage
+
+
+def coverage_of(layers, page, shape: tuple[int, int],
+                blur_mm: float = 1.4) -> np.ndarray:
+    """ink_map(), or the coverage an InkCanvas passed as layers already
+    holds (rebuilt only if its blur differs)."""
+    if isinstance(layers, InkCanvas) and layers.blur_mm == blur_mm:
+        return layers.coverage
+    if isinstance(layers, InkCanvas):
+        layers = layers.layers
+    return ink_map(layers, page, shape, blur_mm)
+
+
+class InkCanvas:
+    """Incremental ink_map. Holds the uint8 canvas and its blurred
+    coverage; add() draws new lines — rasterizing and diffing only
+    inside their pixel bbox grown by half the pen, never a page-sized
+    buffer — and refreshes coverage only in the TILE x TILE tiles within
+    the blur radius of a changed pixel (runs of them as one rectangle,
+    filtered with a blur-radius apron, which gives the same floats as
+    filtering the whole page). Lines are painted as
+    255, so drawing order never matters. coverage is read-only."""
+
+    TILE = 64
+
+    def __init__(self, page, shape: tuple[int, int], blur_mm: float = 1.4,
+                 layers: dict[str, Lines] | None = None):
+        self.page, self.blur_mm = page, blur_mm
+        self.canvas = np.zeros(shape, np.uint8)
+        self.k = max(int(round(blur_mm / page.mm_per_px)), 1) * 2 + 1
+        self.coverage = np.zeros(shape, np.float32)
+        self.layers: dict[str, list] = {}
+        for pen, lines in (layers or {}).items():
+            self._draw(pen, lines)
+        if layers:
+            self._filter(0, shape[0], 0, shape[1])
+
+    def _draw(self, pen: str, lines: Lines):
+        """Paint lines, touching only the canvas rect they can reach
+        (their pixel bbox grown by half the pen). -> (y0, x0, changed):
+        that rect's origin and its changed-pixel mask, or None."""
+        self.layers.setdefault(pen, []).extend(lines)
+        t = max(int(round(pen_width_mm(pen) / self.page.mm_per_px)), 1)
+        b = as_batch(lines)
+        px = np.round(self.page.mm_to_px(b.verts)).astype(np.int32)
+        pts = [p for p in np.split(px, b.offsets[1:-1]) if len(p) >= 2]
+        if not pts:
+            return None
+        h, w = self.canvas.shape
+        g = t // 2 + 2  # half the pen, and a pixel of cv2 rounding
+        x0, y0 = np.maximum(np.min([p.min(0) for p in pts], 0) - g, 0)
+        x1, y1 = np.minimum(np.max([p.max(0) for p in pts], 0) + g + 1,
+                            (w, h))
+        if x0 >= x1 or y0 >= y1:
+            return None
+        sub = self.canvas[y0:y1, x0:x1]  # a view: cv2 paints the canvas
+        before = sub.copy()
+        o = np.array([x0, y0], np.int32)
+        cv2.polylines(sub, [p - o for p in pts], False, 255, t)
+        return int(y0), int(x0), sub != before
+
+    def _filter(self, y0: int, y1: int, x0: int, x1: int) -> None:
+        """Recompute coverage[y0:y1, x0:x1] from the canvas."""
+        r = self.k // 2
+        h, w = self.canvas.shape
+        wy0, wx0 = max(y0 - r, 0), max(x0 - r, 0)
+        wy1, wx1 = min(y1 + r, h), min(x1 + r, w)
+        win = self.canvas[wy0:wy1, wx0:wx1].astype(np.float32) / 255.0
+        cov = cv2.boxFilter(win, -1, (self.k, self.k))
+        self.coverage[y0:y1, x0:x1] = np.clip(
+            cov[y0 - wy0:y1 - wy0, x0 - wx0:x1 - wx0], 0.0, 1.0)
+
+    def add(self, pen: str, lines: Lines) -> "InkCanvas":
+        drawn = self._draw(pen, lines)
+        if drawn is None or not drawn[2].any():
+            return self
+        y0, x0, changed = drawn
+        # coverage moves within the blur radius of a changed pixel: dilate
+        # in a window one radius past the drawn rect, then snap it to tiles
+        T, r = self.TILE, self.k // 2
+        h, w = self.canvas.shape
+        ty0, tx0 = max(y0 - r, 0) // T, max(x0 - r, 0) // T
+        ty1 = -(-min(y0 + changed.shape[0] + r, h) // T)
+        tx1 = -(-min(x0 + changed.shape[1] + r, w) // T)
+        pad = np.zeros(((ty1 - ty0) * T, (tx1 - tx0) * T), np.uint8)
+        py, px = y0 - ty0 * T, x0 - tx0 * T
+        pad[py:py + changed.shape[0], px:px + changed.shape[1]] = changed
+        pad = cv2.dilate(pad, np.ones((self.k, self.k), np.uint8))
+        dirty = pad.reshape(ty1 - ty0, T, tx1 - tx0, T).any(axis=(1, 3))
+        for i, ty in enumerate(range(ty0, ty1)):
+            row = np.flatnonzero(np.diff(np.concatenate(
+                [[0], dirty[i].astype(np.int8), [0]])))
+            for a, z in zip(row[::2] + tx0, row[1::2] + tx0):
+                self._filter(ty * T, min((ty + 1) * T, h),
+                             a * T, min(z * T, w))
+        return self
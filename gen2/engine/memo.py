@@ -0,0 +1,160 @@
+"""Stage memo — incremental re-render of mutated genomes.
+
+A mutated child usually differs from its parent in one band's params or
+one zone's pen, yet render() would redo every module call, tone_gate,
+emphasis_gate and humanize pass. Each run() stage is a pure function of
+
+    (ctx, genome humanize + postpass, band entry, input mask, band_i,
+     seed, engine)
+
+so its output polylines are memoized under a hash of exactly those
+inputs: rendering child B after child A (or the parent again) re-executes
+only the stages whose inputs changed. The ctx enters by its content key
+plus a digest of its render overlay (the plan compiler's plan_masses,
+plan_outline_mask, ... that modules read), the mask by a digest of its
+bits, the engine by a digest of its own source files — editing any engine
+module invalidates every entry.
+
+Entries are frozen copies: put() packs the lines into one read-only
+buffer and get() hands out read-only views, so no caller can edit what
+the next render will be served.
+
+In memory: a byte-bounded LRU ($GART_STAGE_MEM_MB, default 256).
+On disk, opt-in: $GART_STAGE_CACHE=<dir> persists entries across
+processes (preview subprocesses, review builds), one .npz per stage.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .ctxcache import ENGINE_VERSION, LRUCache
+from .geom import PolylineBatch
+
+log = logging.getLogger(__name__)
+
+MISS = object()
+STAGE_MEM_MB = float(os.environ.get("GART_STAGE_MEM_MB", 256))
+_MEM = LRUCache(STAGE_MEM_MB)
+
+
+@functools.cache
+def engine_digest() -> str:
+    h = hashlib.sha256(f"engine v{ENGINE_VERSION}".encode())
+    for p in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(p.name.encode())
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+def ctx_digest(ctx) -> str:
+    """ctx content key + a digest of its overlay (per-render state a
+    stage may read). Once per render, not per stage."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(str(ctx.key).encode())
+    for k in sorted(getattr(ctx, "overlay", {})):
+        h.update(k.encode())
+        _digest(h, ctx.overlay[k])
+    return h.hexdigest()
+
+
+def _digest(h, v) -> None:
+    if isinstance(v, np.ndarray):
+        h.update(f"{v.dtype}{v.shape}".encode())
+        h.update(np.ascontiguousarray(v).tobytes())
+    elif isinstance(v, dict):
+        for k in sorted(v, key=repr):
+            h.update(repr(k).encode())
+            _digest(h, v[k])
+    elif isinstance(v, (list, tuple)):
+        h.update(f"{type(v).__name__}{len(v)}".encode())
+        for x in v:
+            _digest(h, x)
+    else:
+        h.update(repr(v).encode())
+
+
+def stage_key(ctx_key: str, genome: dict, entry: dict, mask: np.ndarray,
+              band_i: int, seed: int) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    h.update(engine_digest().encode())
+    h.update(ctx_key.encode())
+    # the pen only routes lines to a layer: a pen swap is a pure hit
+    stage = {k: v for k, v in entry.items() if k != "pen"}
+    h.update(json.dumps([genome.get("humanize", {}),
+                         genome.get("postpass", "staged"),
+                         genome.get("lod", 1.0), genome.get("crop", False),
+                         stage, band_i, seed],
+                        sort_keys=True).encode())
+    h.update(repr(mask.shape).encode())
+    h.update(np.packbits(mask, axis=None).tobytes())
+    return h.hexdigest()
+
+
+def _disk_path(key: str) -> Path | None:
+    d = os.environ.get("GART_STAGE_CACHE")
+    return Path(d) / key[:2] / f"{key}.npz" if d else None
+
+
+def _freeze(lines) -> PolylineBatch | None:
+    """-> a read-only packed copy of lines (None stays None)."""
+    if lines is None:
+        return None
+    b = PolylineBatch.from_lines(lines)
+    b = PolylineBatch(b.verts.copy(), b.offsets.copy())
+    b.verts.flags.writeable = b.offsets.flags.writeable = False
+    return b
+
+
+def _put_mem(key: str, b: PolylineBatch | None) -> None:
+    _MEM.put(key, b, 0 if b is None else b.verts.nbytes + b.offsets.nbytes)
+
+
+def get(key: str):
+    """-> the stage's lines (None = region cleaned away), or MISS. A new
+    list each call, of read-only views."""
+    b = _MEM.get(key, MISS)
+    if b is not MISS:
+        return None if b is None else b.lines()
+    p = _disk_path(key)
+    if p is None or not p.exists():
+        return MISS
+    try:
+        with np.load(p) as z:
+            verts, off = z["verts"], z["offsets"]
+        b = None if off.size == 0 else _freeze(PolylineBatch(verts, off))
+    except (OSError, ValueError, KeyError) as e:
+        log.warning("stage memo %s unreadable (%s)", key[:12], e)
+        return MISS
+    _put_mem(key, b)
+    return None if b is None else b.lines()
+
+
+def put(key: str, lines) -> None:
+    """Store a copy of lines: the caller keeps its own arrays."""
+    b = _freeze(lines)
+    _put_mem(key, b)
+    p = _disk_path(key)
+    if p is None or p.exists():
+        return
+    if b is None:
+        verts, offsets = np.zeros((0, 2)), np.zeros(0, np.int64)
+    else:
+        verts, offsets = b.verts, b.offsets
+    tmp = p.with_name(f"{p.stem}.tmp{os.getpid()}.npz")
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(tmp, verts=verts, offsets=offsets)
+        os.replace(tmp, p)
+    except OSError as e:
+        log.warning("stage memo write failed (%s)", e)
+        tmp.unlink(missing_ok=True)
+
+
+def clear() -> None:
+    _MEM.clear()
@@ -10,14 +10,30 @@ structure_ctx = {
     "page":        Page mapping working pixels -> mm
 }
 
-Renderer modules consume this dict and never see the photo itself.
+Renderer modules consume this dict and never see the photo itself. It is
+built lazily: GRAPH declares each channel's inputs and the params it
+reads, and a ctxcache.LazyCtx computes (and caches) a channel only when
+something asks for it.
 """
 
+import dataclasses
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
 import cv2
 import numpy as np
 
+from .ctxcache import Channel, CtxView, LazyCtx, LRUCache
 from .page import Page
 
+# working images above this many megapixels are extracted out of core
+TILED_MIN_MPX = float(os.environ.get("GART_TILED_MPX", 24))
+TILE_ROWS = 512  # stripe height of the out-of-core path
+# mask -> region conversions, memoized by mask digest + params
+REGION_CACHE = LRUCache(float(os.environ.get("GART_REGION_MEM_MB", 128)))
+
 DEFAULTS = {
     "work_px_per_mm": 4.0,     # working resolution relative to drawable area
     "clahe_clip": 2.0,
@@ -38,6 +54,20 @@ DEFAULTS = {
 }
 
 
+def tone_band_edges(g: np.ndarray, n: int, band_gamma: float = 1.0,
+                    band_anchor: str | None = None) -> np.ndarray:
+    """The n+1 band thresholds compute_tone_bands() cuts g at."""
+    edges = np.linspace(0.0, 1.0, n + 1) ** band_gamma
+    if band_anchor == "quantile":
+        edges = np.quantile(g, edges)
+    return edges
+
+
+def _band_index(g: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    n = len(edges) - 1
+    return (n - 1) - np.clip(np.digitize(g, edges[1:-1]), 0, n - 1)
+
+
 def compute_tone_bands(g: np.ndarray, n: int, band_gamma: float = 1.0,
                        band_anchor: str | None = None) -> list[np.ndarray]:
     """Tone bands from a 0..1 tone image: thresholds warped by band_gamma;
@@ -45,64 +75,30 @@ def compute_tone_bands(g: np.ndarray, n: int, band_gamma: float = 1.0,
     essential for high-key sources (pale engravings) or low-key ones,
     where absolute thresholds dump everything into one band. Band 0 is
     always the LIGHTEST."""
-    edges = np.linspace(0.0, 1.0, n + 1) ** band_gamma
-    if band_anchor == "quantile":
-        edges = np.quantile(g, edges)
-    idx = np.clip(np.digitize(g, edges[1:-1]), 0, n - 1)
-    band_idx = (n - 1) - idx
+    band_idx = _band_index(g, tone_band_edges(g, n, band_gamma, band_anchor))
     return [(band_idx == i) for i in range(n)]
 
 
-def load_structure_ctx(path: str, page_size: str = "letter",
-                       margin_mm: float = 15.0,
-                       params: dict | None = None) -> dict:
-    p = {**DEFAULTS, **(params or {})}
-    p["region"] = {**DEFAULTS["region"], **(p.get("region") or {})}
-    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-    if img is None:
-        raise FileNotFoundError(path)
-    bgr = cv2.imread(path, cv2.IMREAD_COLOR)  # for hsv only; the tonal
-    # pipeline stays on the grayscale read so goldens are untouched
-
-    # pick portrait/landscape page to match the image
-    if "landscape" not in page_size and img.shape[1] > img.shape[0]:
-        alt = f"{page_size}-landscape"
-        from .page import PAGE_SIZES_MM
-        if alt in PAGE_SIZES_MM:
-            page_size = alt
-
-    # working resolution: drawable area at work_px_per_mm
-    probe = Page.fit_image(page_size, margin_mm, img.shape[1], img.shape[0])
-    scale = p["work_px_per_mm"] * probe.mm_per_px
-    img = cv2.resize(img, None, fx=scale, fy=scale,
-                     interpolation=cv2.INTER_AREA)
-    h, w = img.shape
-    page = Page.fit_image(page_size, margin_mm, w, h)
-    bgr = cv2.resize(bgr, (w, h), interpolation=cv2.INTER_AREA)
+def _hsv(bgr: np.ndarray) -> np.ndarray:
     hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV).astype(np.float32)
     hsv *= np.array([2.0, 1 / 255.0, 1 / 255.0], np.float32)  # H deg 0-360,
     # S and V 0-1 — the scale zone selectors are written against
+    return hsv
 
-    def mm_px(mm: float) -> int:
-        return max(int(round(mm / page.mm_per_px)), 1)
 
-    if p["clahe_clip"] > 0:
-        clahe = cv2.createCLAHE(clipLimit=p["clahe_clip"],
-                                tileGridSize=(8, 8))
-        img = clahe.apply(img)
+def _tone(img: np.ndarray, k: int, gamma: float) -> np.ndarray:
     g = img.astype(np.float32) / 255.0
-    k = mm_px(p["blur_mm"]) * 2 + 1
     g = cv2.GaussianBlur(g, (k, k), 0)
-    if p["gamma"] != 1.0:
-        g = np.power(g, p["gamma"])
+    if gamma != 1.0:
+        g = np.power(g, gamma)
+    return g
 
-    tone_bands = compute_tone_bands(g, p["n_bands"], p["band_gamma"],
-                                    p.get("band_anchor"))
 
-    # structure tensor orientation, smoothed in doubled-angle space
+def _tensor(g: np.ndarray, win: int) -> tuple[np.ndarray, np.ndarray]:
+    """-> (orientation, coherence) float32: the structure tensor,
+    smoothed in doubled-angle space."""
     gx = cv2.Sobel(g, cv2.CV_32F, 1, 0, ksize=3)
     gy = cv2.Sobel(g, cv2.CV_32F, 0, 1, ksize=3)
-    win = mm_px(p["tensor_window_mm"]) * 2 + 1
     jxx = cv2.GaussianBlur(gx * gx, (win, win), 0)
     jxy = cv2.GaussianBlur(gx * gy, (win, win), 0)
     jyy = cv2.GaussianBlur(gy * gy, (win, win), 0)
@@ -110,14 +106,294 @@ def load_structure_ctx(path: str, page_size: str = "letter",
     theta = 0.5 * np.arctan2(2 * jxy, jxx - jyy) + np.pi / 2
     lam = np.sqrt((jxx - jyy) ** 2 + 4 * jxy ** 2)
     coherence = lam / (jxx + jyy + 1e-8)
+    return theta.astype(np.float32), coherence.astype(np.float32)
+
+
+# -- channels -------------------------------------------------------------
+#
+# Working images over TILED_MIN_MPX megapixels (or any, given a scratch
+# dir) are extracted out of core: TILE_ROWS rows at a time, straight into
+# .npy memmaps. Each stripe is computed over a halo of its filters' radii,
+# so its rows get exactly the in-core floats (stripes are full width: the
+# only borders they see are the image's own). CLAHE and Canny need the
+# whole image and run on uint8 — a byte per pixel. In core, the one
+# "stripe" is the whole image.
+
+def _tiled(ctx: LazyCtx, shape: tuple) -> bool:
+    return (ctx.scratch is not None
+            or shape[0] * shape[1] > TILED_MIN_MPX * 1e6)
+
+
+def _stripes(h: int, tiled: bool) -> list[tuple[int, int]]:
+    step = TILE_ROWS if tiled else max(h, 1)
+    return [(y0, min(y0 + step, h)) for y0 in range(0, h, step)]
+
+
+def _out(ctx: LazyCtx, name: str, shape: tuple, dtype,
+         tiled: bool) -> np.ndarray:
+    """Output buffer: in core, or a memmap — <scratch>/<name>.npy, else a
+    temporary file unlinked at once (the mapping outlives it)."""
+    if not tiled:
+        return np.empty(shape, dtype)
+    if ctx.scratch is not None:
+        Path(ctx.scratch).mkdir(parents=True, exist_ok=True)
+        return np.lib.format.open_memmap(Path(ctx.scratch) / f"{name}.npy",
+                                         "w+", dtype, shape)
+    fd, tmp = tempfile.mkstemp(prefix="gart-ctx-", suffix=".npy")
+    os.close(fd)
+    try:
+        return np.lib.format.open_memmap(tmp, "w+", dtype, shape)
+    finally:
+        os.unlink(tmp)
+
+
+def _mm_px(page: Page, mm: float) -> int:
+    return max(int(round(mm / page.mm_per_px)), 1)
+
+
+def _work(ctx: LazyCtx) -> tuple[np.ndarray, Page]:
+    """-> (uint8 gray at working resolution, its Page): the drawable area
+    at work_px_per_mm, on a page turned to match the image."""
+    p = ctx.p
+    img = cv2.imread(ctx.path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise FileNotFoundError(ctx.path)
+    page_size = p["page_size"]
+    if "landscape" not in page_size and img.shape[1] > img.shape[0]:
+        alt = f"{page_size}-landscape"
+        from .page import PAGE_SIZES_MM
+        if alt in PAGE_SIZES_MM:
+            page_size = alt
+    probe = Page.fit_image(page_size, p["margin_mm"], img.shape[1],
+                           img.shape[0])
+    scale = p["work_px_per_mm"] * probe.mm_per_px
+    img = cv2.resize(img, None, fx=scale, fy=scale,
+                     interpolation=cv2.INTER_AREA)
+    h, w = img.shape
+    return img, Page.fit_image(page_size, p["margin_mm"], w, h)
+
+
+def _img(ctx, work):
+    return work[0]
+
+
+def _page(ctx, work):
+    return work[1]
+
+
+def _clahe(ctx, img):
+    if ctx.p["clahe_clip"] <= 0:
+        return img
+    clahe = cv2.createCLAHE(clipLimit=ctx.p["clahe_clip"],
+                            tileGridSize=(8, 8))
+    return clahe.apply(img)
+
+
+def _tone_ch(ctx, img, page):
+    k = _mm_px(page, ctx.p["blur_mm"]) * 2 + 1
+    h, w = img.shape
+    tiled = _tiled(ctx, img.shape)
+    g = _out(ctx, "gray", (h, w), np.float32, tiled)
+    for y0, y1 in _stripes(h, tiled):
+        a, z = max(y0 - k // 2, 0), min(y1 + k // 2, h)
+        g[y0:y1] = _tone(img[a:z], k, ctx.p["gamma"])[y0 - a:y1 - a]
+    return g
+
+
+def _gray(ctx, tone):
+    return tone  # render rebinds "gray" for relit tone sources
+
+
+def _tensor_ch(ctx, g, page):
+    win = _mm_px(page, ctx.p["tensor_window_mm"]) * 2 + 1
+    h, w = g.shape
+    tiled = _tiled(ctx, g.shape)
+    theta = _out(ctx, "orientation", (h, w), np.float32, tiled)
+    coh = _out(ctx, "coherence", (h, w), np.float32, tiled)
+    halo = win // 2 + 1  # Sobel's row, then the tensor blur
+    for y0, y1 in _stripes(h, tiled):
+        a, z = max(y0 - halo, 0), min(y1 + halo, h)
+        t, c = _tensor(np.asarray(g[a:z]), win)
+        theta[y0:y1], coh[y0:y1] = t[y0 - a:y1 - a], c[y0 - a:y1 - a]
+    return theta, coh
+
+
+def _orientation(ctx, tensor):
+    return tensor[0]
+
+
+def _coherence(ctx, tensor):
+    return tensor[1]
+
+
+def _edge_map(ctx, g):
+    h, w = g.shape
+    tiled = _tiled(ctx, g.shape)
+    u8 = np.empty((h, w), np.uint8)
+    for y0, y1 in _stripes(h, tiled):
+        u8[y0:y1] = (g[y0:y1] * 255).astype(np.uint8)
+    edge = cv2.Canny(u8, ctx.p["canny_lo"], ctx.p["canny_hi"]) > 0
+    if not tiled:
+        return edge
+    out = _out(ctx, "edge_map", (h, w), bool, tiled)
+    out[:] = edge
+    return out
+
+
+def _hsv_ch(ctx, img):
+    h, w = img.shape
+    # colour for hsv only; the tonal channels stay on the grayscale read
+    # so goldens are untouched
+    bgr = cv2.resize(cv2.imread(ctx.path, cv2.IMREAD_COLOR), (w, h),
+                     interpolation=cv2.INTER_AREA)
+    tiled = _tiled(ctx, img.shape)
+    hsv = _out(ctx, "hsv", (h, w, 3), np.float32, tiled)
+    for y0, y1 in _stripes(h, tiled):
+        hsv[y0:y1] = _hsv(bgr[y0:y1])
+    return hsv
 
-    edge_map = cv2.Canny((g * 255).astype(np.uint8),
-                         p["canny_lo"], p["canny_hi"]) > 0
 
-    return {"gray": g, "tone_bands": tone_bands, "edge_map": edge_map,
-            "orientation": theta.astype(np.float32),
-            "coherence": coherence.astype(np.float32), "page": page,
-            "hsv": hsv, "region_params": p["region"]}
+def _tone_bands(ctx, g):
+    p = ctx.p
+    if not _tiled(ctx, g.shape):
+        return compute_tone_bands(g, p["n_bands"], p["band_gamma"],
+                                  p.get("band_anchor"))
+    edges = tone_band_edges(g, p["n_bands"], p["band_gamma"],
+                            p.get("band_anchor"))
+    bands = _out(ctx, "tone_bands", (p["n_bands"],) + g.shape, bool, True)
+    for y0, y1 in _stripes(g.shape[0], True):
+        idx = _band_index(g[y0:y1], edges)
+        for i in range(p["n_bands"]):
+            bands[i, y0:y1] = idx == i
+    return list(bands)
+
+
+PAGE_PARAMS = ("page_size", "margin_mm", "work_px_per_mm")
+
+GRAPH = {
+    "work": Channel(_work, (), PAGE_PARAMS),
+    "img": Channel(_img, ("work",), disk=False, memo=False),
+    "page": Channel(_page, ("work",), disk=False, memo=False),
+    "clahe": Channel(_clahe, ("img",), ("clahe_clip",), disk=False),
+    "tone": Channel(_tone_ch, ("clahe", "page"), ("blur_mm", "gamma")),
+    "gray": Channel(_gray, ("tone",), disk=False, memo=False),
+    "tensor": Channel(_tensor_ch, ("tone", "page"), ("tensor_window_mm",)),
+    "orientation": Channel(_orientation, ("tensor",), disk=False,
+                           memo=False),
+    "coherence": Channel(_coherence, ("tensor",), disk=False, memo=False),
+    "edge_map": Channel(_edge_map, ("tone",), ("canny_lo", "canny_hi")),
+    "hsv": Channel(_hsv_ch, ("img",)),
+    "tone_bands": Channel(_tone_bands, ("gray",),
+                          ("n_bands", "band_gamma", "band_anchor")),
+}
+# what load_structure_ctx hands out (the rest are intermediates)
+CHANNELS = ("gray", "tone_bands", "edge_map", "orientation", "coherence",
+            "hsv", "page")
+
+
+# -- pyramid ---------------------------------------------------------------
+#
+# Level k of a ctx is level k-1 halved (ctxcache.pyramid): 2x2 blocks, the
+# last row / column edge-padded, each channel reduced the way that keeps
+# its meaning. Page mm stay put — only mm_per_px doubles — so modules
+# running on a coarse level still emit polylines in the same page mm.
+
+def _blocks(a: np.ndarray) -> np.ndarray:
+    """-> (h/2, w/2, 2, 2, ...) view of a's 2x2 blocks."""
+    h, w = a.shape[:2]
+    a = np.pad(a, [(0, h % 2), (0, w % 2)] + [(0, 0)] * (a.ndim - 2),
+               mode="edge")
+    return a.reshape(a.shape[0] // 2, 2, a.shape[1] // 2, 2,
+                     *a.shape[2:]).swapaxes(1, 2)
+
+
+def halve(ctx, v):
+    """Floats average, masks keep any set pixel (thin edges survive),
+    labels are picked; dicts (scene, semantic) halve entry by entry."""
+    if isinstance(v, Page):
+        return dataclasses.replace(v, mm_per_px=v.mm_per_px * 2)
+    if isinstance(v, dict):
+        return {k: halve(ctx, x) for k, x in v.items()}
+    if not isinstance(v, np.ndarray):
+        return v
+    if v.dtype == bool:
+        return _blocks(v).any(axis=(2, 3))
+    if np.issubdtype(v.dtype, np.integer):
+        return _half_pick(ctx, v)
+    return _blocks(v).mean(axis=(2, 3)).astype(v.dtype)
+
+
+def _half_pick(ctx, a):
+    """Top-left of each block: for values that must not blend (hue
+    wraps at 360, labels are ids)."""
+    return np.ascontiguousarray(a[::2, ::2])
+
+
+def _half_angle(ctx, theta):
+    """Mean in doubled-angle space (orientation is mod pi), kept in
+    (0, pi] like the full-resolution field."""
+    b = _blocks(2.0 * theta.astype(np.float64))
+    t = 0.5 * np.arctan2(np.sin(b).mean(axis=(2, 3)),
+                         np.cos(b).mean(axis=(2, 3)))
+    return np.where(t <= 0, t + np.pi, t).astype(np.float32)
+
+
+def _half_bands(ctx, bands):
+    """Each block goes to its majority band (ties: the lighter), so the
+    bands still partition the image."""
+    if not bands:
+        return []
+    count = np.stack([_blocks(b).sum(axis=(2, 3)) for b in bands])
+    idx = count.argmax(axis=0)
+    return [idx == i for i in range(len(bands))]
+
+
+HALVERS = {"gray": halve, "tone_bands": _half_bands, "edge_map": halve,
+           "orientation": _half_angle, "coherence": halve, "hsv": _half_pick,
+           "page": halve}
+
+
+def source_params(params: dict | None, page_size: str,
+                  margin_mm: float) -> dict:
+    """DEFAULTS + overrides + the page config: what channels read."""
+    p = {**DEFAULTS, **(params or {})}
+    p["region"] = {**DEFAULTS["region"], **(p.get("region") or {})}
+    p["page_size"], p["margin_mm"] = page_size, margin_mm
+    return p
+
+
+def structure_ctx(path: str, page_size: str = "letter",
+                  margin_mm: float = 15.0, params: dict | None = None,
+                  graph: dict | None = None, root: str | None = None,
+                  scratch: str | Path | None = None) -> LazyCtx:
+    """The lazy structure_ctx: nothing is computed until asked for.
+    root (ctxcache.photo_digest) turns on the channel caches."""
+    p = source_params(params, page_size, margin_mm)
+    return LazyCtx(graph or GRAPH, path, p, root=root,
+                   values={"region_params": p["region"]}, scratch=scratch)
+
+
+def load_structure_ctx(path: str, page_size: str = "letter",
+                       margin_mm: float = 15.0,
+                       params: dict | None = None,
+                       out_dir: str | Path | None = None) -> dict:
+    """Every channel, computed now, as a plain dict. out_dir: extract out
+    of core into memory-mapped .npy files there (working images over
+    TILED_MIN_MPX megapixels take that path anyway, through temporary
+    files). Both paths give the same floats."""
+    ctx = structure_ctx(path, page_size, margin_mm, params, scratch=out_dir)
+    return {"region_params": ctx["region_params"],
+            **{name: ctx[name] for name in CHANNELS}}
+
+
+def _mask_key(kind: str, mask: np.ndarray, page: Page, **params) -> str:
+    """Digest of a mask (bits, shape) + page + conversion params."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((kind, mask.shape, str(mask.dtype), page,
+                   sorted(params.items()))).encode())
+    h.update(np.packbits(mask).tobytes() if mask.dtype == bool
+             else np.ascontiguousarray(mask).tobytes())
+    return h.hexdigest()
 
 
 def region_to_mask(region, page: Page, shape: tuple[int, int]) -> np.ndarray:
@@ -138,46 +414,142 @@ def region_to_mask(region, page: Page, shape: tuple[int, int]) -> np.ndarray:
     return m.astype(bool)
 
 
-def mask_to_region(mask: np.ndarray, page: Page,
-                   simplify_mm: float = 0.3,
-                   min_area_mm2: float = 4.0,
-                   open_mm: float = 0.5,
-                   close_mm: float = 0.0):
-    """Bool mask (working px) -> shapely MultiPolygon in page mm."""
+def _polygonize(m: np.ndarray, page: Page, simplify_mm: float,
+                min_area_mm2: float):
+    """Cleaned uint8 mask -> simplified region. All rings go through one
+    shapely.linearrings / shapely.polygons call instead of a Polygon per
+    contour; validity, repair and the area cut are array ops too."""
     import shapely
-    from shapely.geometry import Polygon
-    from shapely.ops import unary_union
 
-    m = mask.astype(np.uint8)
-    if close_mm > 0:  # merge nearby islands into masses BEFORE despeckling
-        kc = max(int(round(close_mm / page.mm_per_px)), 1)
-        m = cv2.morphologyEx(m, cv2.MORPH_CLOSE, np.ones((kc, kc), np.uint8))
-    k = max(int(round(open_mm / page.mm_per_px)), 1)
-    m = cv2.morphologyEx(m, cv2.MORPH_OPEN,
-                         np.ones((k, k), np.uint8))
     contours, hierarchy = cv2.findContours(m, cv2.RETR_CCOMP,
                                            cv2.CHAIN_APPROX_SIMPLE)
     if hierarchy is None:
         return shapely.MultiPolygon()
     hierarchy = hierarchy[0]
-    polys = []
+    rings, ring_poly = [], []
     for i, c in enumerate(contours):
         if hierarchy[i][3] != -1 or len(c) < 3:  # holes handled below
             continue
-        shell = page.px_to_mm(c[:, 0, :].astype(np.float64))
-        holes = []
+        n = len(ring_poly) and ring_poly[-1] + 1
+        rings.append(c)
+        ring_poly.append(n)
         j = hierarchy[i][2]  # first child
         while j != -1:
             if len(contours[j]) >= 3:
-                holes.append(page.px_to_mm(
-                    contours[j][:, 0, :].astype(np.float64)))
+                rings.append(contours[j])
+                ring_poly.append(n)
             j = hierarchy[j][0]
-        poly = Polygon(shell, holes)
-        if not poly.is_valid:
-            poly = poly.buffer(0)
-        if poly.area >= min_area_mm2:
-            polys.append(poly)
-    if not polys:
+    if not rings:
         return shapely.MultiPolygon()
-    region = unary_union(polys)
-    return region.simplify(simplify_mm)
+    sizes = [len(r) for r in rings]
+    coords = page.px_to_mm(np.concatenate(rings)[:, 0, :].astype(np.float64))
+    rings = shapely.linearrings(coords, indices=np.repeat(np.arange(
+        len(sizes)), sizes))
+    polys = shapely.polygons(rings, indices=ring_poly)
+    bad = ~shapely.is_valid(polys)
+    polys[bad] = shapely.buffer(polys[bad], 0)
+    polys = polys[shapely.area(polys) >= min_area_mm2]
+    if not len(polys):
+        return shapely.MultiPolygon()
+    return shapely.union_all(polys).simplify(simplify_mm)
+
+
+def _geom_bytes(region) -> int:
+    import shapely
+    return 16 * int(shapely.get_num_coordinates(region)) + 256
+
+
+def mask_to_region(mask: np.ndarray, page: Page,
+                   simplify_mm: float = 0.3,
+                   min_area_mm2: float = 4.0,
+                   open_mm: float = 0.5,
+                   close_mm: float = 0.0):
+    """Bool mask (working px) -> shapely MultiPolygon in page mm. Memoized
+    on the mask's digest + params: evolve re-renders mostly re-clean the
+    same masks."""
+    key = _mask_key("region", mask, page, simplify_mm=simplify_mm,
+                    min_area_mm2=min_area_mm2, open_mm=open_mm,
+                    close_mm=close_mm)
+    region = REGION_CACHE.get(key)
+    if region is not None:
+        return region
+    m = mask.astype(np.uint8)
+    if close_mm > 0:  # merge nearby islands into masses BEFORE despeckling
+        kc = max(int(round(close_mm / page.mm_per_px)), 1)
+        m = cv2.morphologyEx(m, cv2.MORPH_CLOSE, np.ones((kc, kc), np.uint8))
+    k = max(int(round(open_mm / page.mm_per_px)), 1)
+    m = cv2.morphologyEx(m, cv2.MORPH_OPEN,
+                         np.ones((k, k), np.uint8))
+    region = _polygonize(m, page, simplify_mm, min_area_mm2)
+    REGION_CACHE.put(key, region, size=_geom_bytes(region))
+    return region
+
+
+def clean_mask(mask: np.ndarray, page: Page, **params):
+    """-> (region, mask): mask_to_region and the rasterized region, the
+    pair a band stage starts from (mask None when the region cleaned away
+    to nothing). Memoized as a pair; the mask is shared, hence read-only."""
+    key = _mask_key("clean", mask, page, **params)
+    hit = REGION_CACHE.get(key)
+    if hit is not None:
+        return hit
+    region = mask_to_region(mask, page, **params)
+    m = None
+    if not region.is_empty:
+        m = region_to_mask(region, page, mask.shape)
+        m.flags.writeable = False
+    REGION_CACHE.put(key, (region, m),
+                     size=_geom_bytes(region) + (m.nbytes if m is not None
+                                                 else 0))
+    return region, m
+
+
+CROP_PAD_MM = 5.0  # context kept around a cropped mask (filter support)
+
+
+def mask_box(mask: np.ndarray, page: Page,
+             pad_mm: float = CROP_PAD_MM) -> tuple[int, int, int, int] | None:
+    """(y0, y1, x0, x1): the mask's bounding box grown by pad_mm, clipped
+    to the frame. None = empty mask."""
+    x, y, w, h = cv2.boundingRect(mask.view(np.uint8))
+    if not w:
+        return None
+    p = _mm_px(page, pad_mm)
+    H, W = mask.shape
+    return max(y - p, 0), min(y + h + p, H), max(x - p, 0), min(x + w + p, W)
+
+
+def crop(v, box: tuple[int, int, int, int], shape: tuple[int, int]):
+    """A ctx value seen through a pixel box of a shape-sized frame: the
+    Page moves its offset so mm stay put, frame-sized arrays become
+    views, lists and dicts (tone_bands, scene) crop entry by entry."""
+    y0, y1, x0, x1 = box
+    if isinstance(v, Page):
+        return dataclasses.replace(
+            v, offset_x_mm=v.offset_x_mm + x0 * v.mm_per_px,
+            offset_y_mm=v.offset_y_mm + y0 * v.mm_per_px)
+    if isinstance(v, dict):
+        return {k: crop(x, box, shape) for k, x in v.items()}
+    if isinstance(v, list):
+        return [crop(x, box, shape) for x in v]
+    if isinstance(v, np.ndarray) and v.shape[:2] == shape:
+        return v[y0:y1, x0:x1]
+    return v
+
+
+class CropView(CtxView):
+    """A render's ctx cut down to one box: every channel a module reads
+    is cropped on first access, and derived() channels (flow fields,
+    atlases) are keyed by the box, so they are built over the box too.
+    Over a plain dict (no stable key) they live on the view alone."""
+
+    def __init__(self, base, box: tuple[int, int, int, int]):
+        super().__init__(base, f"{base.key}{box}"
+                         if isinstance(base, CtxView) else None)
+        self.box = box
+        self.shape = np.shape(base["gray"])[:2]
+
+    def __getitem__(self, k):
+        if k not in self.overlay:
+            self.overlay[k] = crop(self.base[k], self.box, self.shape)
+        return self.overlay[k]
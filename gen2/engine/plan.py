@@ -47,6 +47,8 @@ from pathlib import Path
 import cv2
 import numpy as np
 
+from .labels import LabelStats
+
 log = logging.getLogger(__name__)
 
 _MARKS_PATH = Path(__file__).parent.parent / "marks.json"
@@ -156,28 +158,35 @@ def _adjacency(labels):
     return pairs
 
 
+def _touching(stats: LabelStats, a: int, b: int):
+    """-> (box, m): pixels of mass b 8-adjacent to mass a, within a's
+    bbox grown by the 3x3 dilation's reach."""
+    box, ma = stats.mask(a, pad=1)
+    ma = cv2.dilate(ma.astype(np.uint8), np.ones((3, 3), np.uint8)) > 0
+    return box, ma & (stats.labels[box] == b)
+
+
 # ---------------- compose ops (registry — add your own) --------------------
 def op_commit_levels(state, params, ctx):
-    lev_map, k = state["lev_map"], state["k"]
+    stats = LabelStats(state["labels"])
+    major = stats.majority(state["lev_map"], state["k"])
     for mid in state["ids"]:
-        m = state["labels"] == mid
-        vals, cts = np.unique(lev_map[m], return_counts=True)
-        state["level"][mid] = int(vals[cts.argmax()])
+        state["level"][mid] = int(major[mid])
 
 
 def op_weld_small(state, params, ctx):
     min_px = params.get("min_frac", 0.01) * state["labels"].size
     adj = _adjacency(state["labels"])
+    stats = LabelStats(state["labels"])
     for mid in list(state["ids"]):
-        m = state["labels"] == mid
-        if m.sum() >= min_px:
+        if stats.area[mid] >= min_px:
             continue
         nbrs = [(b if a == mid else a, c) for (a, b), c in adj.items()
                 if mid in (a, b)]
         if not nbrs:
             continue
         tgt = max(nbrs, key=lambda t: t[1])[0]
-        state["labels"][m] = tgt
+        stats.merge(mid, tgt)
         state["ids"].remove(mid)
         state["level"].pop(mid, None)
 
@@ -200,8 +209,9 @@ def op_force_tone(state, params, ctx):
 
 def op_elect_extremes(state, params, ctx):
     """Principal light mass -> bare paper; principal dark -> max level."""
+    area = LabelStats(state["labels"]).area
     big = [i for i in state["ids"]
-           if (state["labels"] == i).mean() > params.get("min_frac", 0.04)]
+           if area[i] / state["labels"].size > params.get("min_frac", 0.04)]
     if big:
         state["level"][min(big, key=lambda i: state["dark"][i])] = 0
         state["level"][max(big, key=lambda i: state["dark"][i])] = \
@@ -220,13 +230,12 @@ def op_focal(state, params, ctx):
             adj.items(),
             key=lambda kv: abs(state["dark"][kv[0][0]]
                                - state["dark"][kv[0][1]]) * kv[1])
-        m = (cv2.dilate((state["labels"] == a).astype(np.uint8),
-                        np.ones((3, 3), np.uint8)) > 0) \
-            & (state["labels"] == b)
+        (by, bx), m = _touching(LabelStats(state["labels"]), a, b)
         ys, xs = np.nonzero(m)
         if not len(xs):
             return
-        pmm = page.px_to_mm(np.array([[xs.mean(), ys.mean()]]))[0]
+        cx, cy = (xs + bx.start).mean(), (ys + by.start).mean()
+        pmm = page.px_to_mm(np.array([[cx, cy]]))[0]
     else:
         pmm = (float(pos[0]) * page.width_mm,
                float(pos[1]) * page.height_mm)
@@ -283,12 +292,14 @@ def compile_plan(spec: dict, ctx: dict) -> list[dict]:
     # level 0 = LIGHTEST (bare paper), k-1 = darkest
 
     ids = [int(i) for i in np.unique(labels) if i != 0]
+    stats = LabelStats(labels)
     state = {"labels": labels, "ids": ids, "k": k, "lev_map": lev_map,
              "level": {}, "focal": None,
-             "dark": {i: float(1 - g[labels == i].mean()) for i in ids}}
+             "dark": {i: float(1 - stats.mean(i, g)) for i in ids}}
     for step in spec.get("compose", [{"op": "commit_levels"}]):
         OPS[step["op"]](state, step, ctx)
-    state["dark"] = {i: float(1 - g[state["labels"] == i].mean())
+    stats = LabelStats(state["labels"])
+    state["dark"] = {i: float(1 - stats.mean(i, g))
                      for i in state["ids"]}
 
     ctx["plan_masses"] = state["labels"]
@@ -322,10 +333,7 @@ def compile_plan(spec: dict, ctx: dict) -> list[dict]:
             continue  # principal lights stay bare paper
         stack = _stack_for(targets[level], palette, prefer,
                            asg.get("modules"))
-        m = state["labels"] == mid
-        t = theta[m]
-        ang = float(np.degrees(0.5 * np.arctan2(
-            np.sin(2 * t).mean(), np.cos(2 * t).mean())))
+        ang = float(np.degrees(stats.mean_angle(mid, theta)))
         snap = dirspec.get("snap_deg", 0)
         if snap:
             ang = round(ang / snap) * snap
@@ -360,9 +368,8 @@ def compile_plan(spec: dict, ctx: dict) -> list[dict]:
             # against paper needs no line (the whites weld, per Payne)
             if min(la, lb) >= 1 and abs(la - lb) \
                     <= ol.get("max_level_gap", 0):
-                ma = cv2.dilate((state["labels"] == a).astype(np.uint8),
-                                np.ones((3, 3), np.uint8)) > 0
-                need |= ma & (state["labels"] == b)
+                box, m = _touching(stats, a, b)
+                need[box] |= m
         ctx["plan_outline_mask"] = cv2.dilate(
             need.astype(np.uint8), np.ones((3, 3), np.uint8)) > 0
         zones.append({"name": "outline",
@@ -401,16 +408,18 @@ def arrangement_score(layers, ctx) -> float:
     """Tonecheck v2, the Guptill doctrine: fraction of adjacent mass
     pairs whose rendered-ink ORDER agrees with the source-darkness order
     (weighted by boundary length; pairs the source calls equal are
-    ignored). Requires a compiled plan in ctx."""
-    from .inkmap import ink_map
+    ignored). Requires a compiled plan in ctx. layers may be an
+    InkCanvas already holding them."""
+    from .inkmap import coverage_of
     labels = ctx.get("plan_masses")
     if labels is None:
         return -1.0
-    cov = ink_map(layers, ctx["page"], ctx["gray"].shape)
+    cov = coverage_of(layers, ctx["page"], ctx["gray"].shape)
     g = ctx["gray"]
     ids = [i for i in np.unique(labels) if i != 0]
-    src = {i: float(1 - g[labels == i].mean()) for i in ids}
-    ink = {i: float(cov[labels == i].mean()) for i in ids}
+    stats = LabelStats(labels)
+    src = {i: float(1 - stats.mean(i, g)) for i in ids}
+    ink = {i: float(stats.mean(i, cov)) for i in ids}
     good = tot = 0.0
     for (a, b), n in _adjacency(labels).items():
         ds = src[a] - src[b]
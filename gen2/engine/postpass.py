@@ -0,0 +1,110 @@
+"""Fused post-pass: tone_gate + emphasis_gate + humanize in one traversal.
+
+The staged chain resamples every line three times and loops over chunks in
+Python twice. postpass() packs the band into one PolylineBatch, resamples
+it once (0.7 mm, as the gates do), chunks every line for each gate in one
+shot and reduces darkness / feature distance per chunk with bincount, so
+both keep-masks are plain array expressions over all vertices. Their AND
+is cut into maximal runs (>= 0.6 mm, the gates' own floor) and
+humanize_batch() — humanize in array ops — runs on what survives.
+
+Opt-in, genome-wide or per entry: {"postpass": "fused"}. The default
+("staged") is the compatibility mode: the three original passes, so stored
+genomes keep their exact lines. Fused draws from the same RNG streams
+([seed, band_i, 7] tone, [seed, band_i, 11] emphasis) and keeps chunks
+with the same probabilities, but not with the same draws: one uniform per
+chunk, drawn in bulk, instead of per-chunk draws that skip sure cases;
+humanize's stream ([seed*1000 + band_i]) is drawn in bulk the same way.
+Emphasis also chunks the whole resampled line rather than re-chunking
+each tone survivor. The look is statistically the same; the lines are not.
+"""
+
+import numpy as np
+
+from .emphasis import DEFAULTS as EMPHASIS_DEFAULTS, _feature_dist_mm
+from .geom import Lines, Polyline, PolylineBatch, as_batch
+from .humanize import humanize_batch
+from .tonemod import DEFAULTS as TONE_DEFAULTS
+
+MODES = ("staged", "fused")
+
+
+def _chunks(b: PolylineBatch, cum: np.ndarray, seg_mm: float,
+            rng: np.random.Generator) -> tuple[np.ndarray, int]:
+    """-> (chunk index per vertex, n chunks): every line cut by arc length
+    into seg_mm chunks from a jittered origin, as the gates do."""
+    line = b.line_ids()
+    jit = rng.uniform(0, seg_mm, len(b))
+    local = cum - cum[np.minimum(b.offsets[:-1], len(cum) - 1)][line]
+    ids = ((local + jit[line]) // seg_mm).astype(np.int64)
+    new = np.ones(len(ids), bool)
+    new[1:] = (ids[1:] != ids[:-1]) | (line[1:] != line[:-1])
+    chunk = np.cumsum(new) - 1
+    return chunk, int(chunk[-1]) + 1 if len(chunk) else 0
+
+
+def _mean(chunk: np.ndarray, n: int, v: np.ndarray) -> np.ndarray:
+    return np.bincount(chunk, v, n) / np.maximum(np.bincount(chunk,
+                                                             minlength=n), 1)
+
+
+def _tone_keep(b, cum, xi, yi, ctx, params, rng, dark_map) -> np.ndarray:
+    p = {**TONE_DEFAULTS, **(params or {})}
+    lo, hi = float(p["low"]), max(float(p["high"]), float(p["low"]) + 1e-6)
+    dark = (dark_map[yi, xi] if dark_map is not None
+            else 1.0 - ctx["gray"][yi, xi])
+    if p["gamma"] != 1.0:
+        dark = dark ** p["gamma"]
+    chunk, n = _chunks(b, cum, p["seg_mm"], rng)
+    d = _mean(chunk, n, dark)
+    keep = (d >= hi) | ((d > lo) & (rng.random(n) < (d - lo) / (hi - lo)))
+    return keep[chunk]
+
+
+def _emphasis_keep(b, cum, xi, yi, ctx, params, rng) -> np.ndarray:
+    p = {**EMPHASIS_DEFAULTS, **(params or {})}
+    dist = _feature_dist_mm(ctx, tuple(p["sources"]))
+    falloff = max(float(p["falloff_mm"]), 1e-3)
+    floor = float(p["floor"])
+    chunk, n = _chunks(b, cum, p["seg_mm"], rng)
+    weight = floor + (1 - floor) * np.exp(
+        -_mean(chunk, n, dist[yi, xi].astype(np.float64)) / falloff)
+    focal = p.get("focal")
+    if focal:
+        df = np.hypot(b.verts[:, 0] - focal[0], b.verts[:, 1] - focal[1])
+        fw = 0.5 + 0.5 * np.exp(-_mean(chunk, n, df) / max(focal[2], 1.0))
+        weight = np.minimum(weight * fw + 0.05, 1.0)
+    keep = rng.random(n) < weight
+    protect = float(p["protect_dark"])
+    if protect > 0:
+        keep |= _mean(chunk, n, 1.0 - ctx["gray"][yi, xi]) >= protect
+    return keep[chunk]
+
+
+def postpass(lines: Lines, ctx: dict, tone_mod: dict | None,
+             emphasis: dict | None, humanize_params: dict | None,
+             tone_rng: np.random.Generator,
+             emphasis_rng: np.random.Generator, humanize_seed: int,
+             dark_map: np.ndarray | None = None) -> list[Polyline]:
+    """The fused chain. tone_mod / emphasis None = that gate is off (as in
+    a band entry); humanize always runs."""
+    if tone_mod is not None or emphasis is not None:
+        b = as_batch(lines).resample(0.7)
+        if len(b.verts):
+            cum = np.concatenate([[0.0], np.cumsum(b.seg_lengths())])
+            px = ctx["page"].mm_to_px(b.verts)
+            h, w = ctx["gray"].shape
+            xi = np.clip(px[:, 0].astype(int), 0, w - 1)
+            yi = np.clip(px[:, 1].astype(int), 0, h - 1)
+            keep = np.ones(len(b.verts), bool)
+            if tone_mod is not None:
+                keep &= _tone_keep(b, cum, xi, yi, ctx, tone_mod, tone_rng,
+                                   dark_map)
+            if emphasis is not None:
+                keep &= _emphasis_keep(b, cum, xi, yi, ctx, emphasis,
+                                       emphasis_rng)
+            b = b.slice_runs(keep)
+            lines = b.take(b.lengths() >= 0.6)
+        else:
+            lines = []
+    return humanize_batch(lines, humanize_seed, humanize_params).lines()
@@ -0,0 +1,183 @@
+"""Render profiler — where the preview budget actually goes.
+
+    prof = Profiler()
+    layers, page = render(genome, seed, photo, profile=prof)
+    prof.write_trace("render.trace.json")   # chrome://tracing or Perfetto
+    print(prof.summary())
+
+Every span records wall time, CPU time, peak traced-memory delta and,
+where it produced polylines, line and vertex counts. render() opens one
+span per zone/band stage with the module, tone_gate, emphasis_gate,
+humanize and mask_to_region passes nested inside, so the summary answers
+both "which stage is slow" and "which kind of work is slow". Spans from
+pool workers come back with their own pid and land on their own track.
+
+Peak memory is opt-in, Profiler(memory=True): it runs tracemalloc (NumPy
+reports its buffers to it), which slows Python-heavy passes like
+humanize ~8x — take wall times from a run without it. Tracing started by
+a profiler stops when it finishes: summary(), close(), or the end of a
+`with Profiler(memory=True) as prof:` block; spans opened after that
+record no memory. render(profile=True) times only, logs the summary and
+keeps the profiler in profile.last().
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+_LAST = None
+
+
+def last() -> "Profiler | None":
+    """The profiler of the most recent render(profile=True)."""
+    return _LAST
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "t0", "cpu0", "mem0", "peak")
+
+    def __init__(self, name, cat, args):
+        self.name, self.cat, self.args = name, cat, args
+        self.t0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+        self.mem0 = self.peak = 0
+
+
+class Profiler:
+    def __init__(self, memory: bool = False, t0: float | None = None):
+        self.memory = memory
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.events: list[dict] = []
+        self._stack: list[_Span] = []
+        self._started = memory and not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+
+    def __enter__(self) -> "Profiler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop tracemalloc if this profiler started it (idempotent)."""
+        if self._started:
+            self._started = False
+            tracemalloc.stop()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        sp = _Span(name, cat, dict(args))
+        mem = self.memory and tracemalloc.is_tracing()
+        if mem:
+            cur, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                top = self._stack[-1]
+                top.peak = max(top.peak, peak)
+            tracemalloc.reset_peak()
+            sp.mem0 = cur
+        self._stack.append(sp)
+        try:
+            yield sp
+        finally:
+            self._stack.pop()
+            ev = {"name": name, "cat": cat, "ph": "X", "pid": os.getpid(),
+                  "tid": 0,
+                  "ts": (sp.t0 - self.t0) * 1e6,
+                  "dur": (time.perf_counter() - sp.t0) * 1e6,
+                  "args": {**sp.args,
+                           "cpu_ms": (time.process_time() - sp.cpu0) * 1e3}}
+            if mem and tracemalloc.is_tracing():
+                peak = max(sp.peak, tracemalloc.get_traced_memory()[1])
+                ev["args"]["peak_mb"] = max(peak - sp.mem0, 0) / 2**20
+                if self._stack:
+                    top = self._stack[-1]
+                    top.peak = max(top.peak, peak)
+            self.events.append(ev)
+
+    def note(self, **args) -> None:
+        """Attach args to the innermost open span."""
+        if self._stack:
+            self._stack[-1].args.update(args)
+
+    def count(self, lines) -> None:
+        """Line/vertex counts onto the innermost open span."""
+        if lines is not None:
+            self.note(lines=len(lines),
+                      verts=int(sum(len(ln) for ln in lines)))
+
+    def trace(self) -> dict:
+        return {"traceEvents": sorted(self.events, key=lambda e: e["ts"]),
+                "displayTimeUnit": "ms"}
+
+    def write_trace(self, path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+
+    def summary(self, top: int = 25) -> str:
+        """Totals per kind of work, then the slowest stages. Finishes
+        the profile: memory tracing this profiler started stops."""
+        def mb(v):
+            return f"{v:>8.1f}" if self.memory else f"{'-':>8}"
+        self.close()
+        agg: dict = {}
+        for e in self.events:
+            if e["cat"] == "stage":
+                continue
+            a = agg.setdefault((e["cat"], e["name"]),
+                               [0, 0.0, 0.0, 0.0, 0, 0])
+            a[0] += 1
+            a[1] += e["dur"] / 1e6
+            a[2] += e["args"]["cpu_ms"] / 1e3
+            a[3] = max(a[3], e["args"].get("peak_mb", 0.0))
+            a[4] += e["args"].get("lines", 0)
+            a[5] += e["args"].get("verts", 0)
+        rows = [f"{'kind':<8} {'name':<18} {'calls':>5} {'wall s':>8} "
+                f"{'cpu s':>8} {'peak MB':>8} {'lines':>7} {'verts':>9}"]
+        for (cat, name), a in sorted(agg.items(), key=lambda kv: -kv[1][1]):
+            rows.append(f"{cat:<8} {name:<18} {a[0]:>5} {a[1]:>8.3f} "
+                        f"{a[2]:>8.3f} {mb(a[3])} {a[4]:>7} {a[5]:>9}")
+        stages = sorted((e for e in self.events if e["cat"] == "stage"),
+                        key=lambda e: -e["dur"])
+        rows.append("")
+        rows.append(f"{'stage (slowest first)':<28} {'wall s':>8} "
+                    f"{'cpu s':>8} {'peak MB':>8} {'lines':>7} "
+                    f"{'verts':>9}")
+        for e in stages[:top]:
+            a = e["args"]
+            rows.append(f"{e['name']:<28} {e['dur'] / 1e6:>8.3f} "
+                        f"{a['cpu_ms'] / 1e3:>8.3f} "
+                        f"{mb(a.get('peak_mb', 0.0))} "
+                        f"{a.get('lines', 0):>7} {a.get('verts', 0):>9}")
+        return "\n".join(rows)
+
+
+class _NullProfiler:
+    """Stand-in when profiling is off: spans cost one call."""
+    memory = False
+
+    def span(self, name, cat="stage", **args):
+        return nullcontext()
+
+    def note(self, **args) -> None:
+        pass
+
+    def count(self, lines) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+NULL = _NullProfiler()
+
+
+def resolve(profile) -> "Profiler | _NullProfiler":
+    """render()'s profile argument -> a profiler (True = a fresh one)."""
+    global _LAST
+    if profile is True:
+        _LAST = Profiler()
+        return _LAST
+    return profile or NULL
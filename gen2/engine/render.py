@@ -6,6 +6,12 @@ Genome schema (v1):
   "page": {"size": "11x17", "margin_mm": 20},
   "source": {"type": "photo", "path": "optional.jpg", "params": {...photo.DEFAULTS}},
   "humanize": {...humanize.DEFAULTS overrides, global},
+  "postpass": "staged" | "fused",  # optional, postpass.py; entries may
+                                   # override it
+  "lod": 1.0,                      # optional level of detail (_lod)
+  "crop": false,                   # optional; true runs modules on the
+                                   # band's bbox (photo.CropView), not the
+                                   # page; entries may override it
   "bands": [                       # index = tone band, 0 = lightest
     {"module": "empty"},
     {"module": "flow_hatch", "pen": "blue03", "params": {...},
@@ -24,19 +30,27 @@ Genome schema (v1):
 Pure: same (genome, seed, photo bytes) → identical polylines, forever.
 """
 
-import json
 import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 
 import cv2
 import numpy as np
 
+from . import ctxcache
+from .ctxcache import Channel
+from . import memo as stage_memo
 from .emphasis import emphasis_gate
-from .humanize import humanize
-from .inkmap import ink_map
+from .geom import PolylineBatch
+from .humanize import DEFAULTS as HUMANIZE_DEFAULTS, humanize
+from .inkmap import InkCanvas
 from .modules import MODULES
-from .photo import (compute_tone_bands, load_structure_ctx, mask_to_region,
-                    region_to_mask)
+from .photo import (GRAPH, HALVERS, CropView, clean_mask, halve, mask_box,
+                    structure_ctx)
 from .plan import compile_plan, plan_outline
+from .postpass import MODES as POSTPASS_MODES, postpass
+from .profile import NULL as NO_PROFILE, Profiler
+from .profile import resolve as resolve_profiler
 from .scene import (load_normals, load_scene, load_semantic, normals_field,
                     relight)
 
@@ -46,80 +60,301 @@ from .zones import zone_mask
 
 log = logging.getLogger(__name__)
 
-_CTX_CACHE: dict = {}
 
+def _normals(ctx, img):
+    return load_normals(ctx.path, img.shape)
 
-def _structure_ctx(genome: dict, photo_path: str | None) -> dict:
+
+def _normals_field(ctx, normals, page):
+    """-> (theta, coherence, variance) of the normals sidecar, or None."""
+    if normals is None:
+        return None
+    return normals_field(normals, page.mm_per_px,
+                         smooth_mm=ctx.p.get("normals_smooth_mm", 4.0),
+                         mode=ctx.p.get("normals_stroke", "downslope"))
+
+
+def _normal_var(ctx, field):
+    return None if field is None else field[2]
+
+
+def _normals_orientation(ctx, field, tensor):
+    return (tensor if field is None else field)[0]
+
+
+def _normals_coherence(ctx, field, tensor):
+    return (tensor if field is None else field)[1]
+
+
+def _relit(ctx, tone, normals):
+    if normals is None:
+        return tone
+    ts = ctx.p["tone_source"]
+    shade = relight(normals, ts.get("azimuth_deg", 315.0),
+                    ts.get("elevation_deg", 40.0))
+    mix = float(ts.get("mix", 0.6))
+    return np.clip((1 - mix) * tone + mix * shade, 0.0,
+                   1.0).astype(np.float32)
+
+
+def _scene(ctx, img):
+    return load_scene(ctx.path, img.shape)
+
+
+def _semantic(ctx, img):
+    return load_semantic(ctx.path, img.shape)
+
+
+def _graph(sp: dict) -> dict:
+    """photo.GRAPH plus the sidecar channels, rebound as src.params ask:
+    normals-driven orientation, relit tone (bands follow it; tensor and
+    edges stay on the photo's own tone)."""
+    g = {**GRAPH,
+         "normals": Channel(_normals, ("img",)),
+         "normals_field": Channel(_normals_field, ("normals", "page"),
+                                  ("normals_smooth_mm", "normals_stroke")),
+         "normal_var": Channel(_normal_var, ("normals_field",),
+                               disk=False, memo=False),
+         "scene": Channel(_scene, ("img",), disk=False),
+         "semantic": Channel(_semantic, ("img",), disk=False)}
+    if sp.get("orientation_source") == "normals":
+        g["orientation"] = Channel(_normals_orientation,
+                                   ("normals_field", "tensor"),
+                                   disk=False, memo=False)
+        g["coherence"] = Channel(_normals_coherence,
+                                 ("normals_field", "tensor"),
+                                 disk=False, memo=False)
+    ts = sp.get("tone_source")
+    if ts and ts.get("type") == "relight":
+        g["gray"] = Channel(_relit, ("tone", "normals"), ("tone_source",))
+    return g
+
+
+def _structure_ctx(genome: dict, photo_path: str | None, level: int = 0
+                   ) -> ctxcache.CtxView:
+    """-> a fresh copy-on-write view over a lazy base ctx whose channels
+    come from the shared channel caches (ctxcache); level k = the ctx at
+    1/2^k resolution, halved from the cached full-resolution one."""
     src = genome.get("source", {})
     page_cfg = genome.get("page", {})
     path = photo_path or src.get("path")
     if not path:
         raise ValueError("no photo path in genome.source.path or argument")
-    key = (path, json.dumps(src.get("params", {}), sort_keys=True),
-           page_cfg.get("size", "11x17"), page_cfg.get("margin_mm", 20.0))
-    if key not in _CTX_CACHE:
-        sp = src.get("params", {})
-        ctx = load_structure_ctx(
-            path, page_size=page_cfg.get("size", "11x17"),
-            margin_mm=page_cfg.get("margin_mm", 20.0), params=sp)
-        ctx["scene"] = load_scene(path, ctx["gray"].shape)
-        ctx["semantic"] = load_semantic(path, ctx["gray"].shape)
-        normals = load_normals(path, ctx["gray"].shape)
-        ctx["normals"] = normals
-        if normals is not None:
-            # normals-derived channels are deterministic per src.params,
-            # which the cache key already includes
-            theta, coh, var = normals_field(
-                normals, ctx["page"].mm_per_px,
-                smooth_mm=sp.get("normals_smooth_mm", 4.0),
-                mode=sp.get("normals_stroke", "downslope"))
-            ctx["normal_var"] = var
-            if sp.get("orientation_source") == "normals":
-                ctx["orientation"], ctx["coherence"] = theta, coh
-            ts = sp.get("tone_source")
-            if ts and ts.get("type") == "relight":
-                shade = relight(normals, ts.get("azimuth_deg", 315.0),
-                                ts.get("elevation_deg", 40.0))
-                mix = float(ts.get("mix", 0.6))
-                g = np.clip((1 - mix) * ctx["gray"] + mix * shade,
-                            0.0, 1.0).astype(np.float32)
-                ctx["gray"] = g
-                ctx["tone_bands"] = compute_tone_bands(
-                    g, sp.get("n_bands", 5), sp.get("band_gamma", 1.0),
-                    sp.get("band_anchor"))
-        _CTX_CACHE[key] = ctx
-    return _CTX_CACHE[key]
-
-
-def render(genome: dict, seed: int, photo_path: str | None = None):
-    """→ (layers {pen: [Polyline]}, page). Pure in (genome, seed, photo)."""
-    ctx = _structure_ctx(genome, photo_path)
+    sp = src.get("params", {})
+    size = page_cfg.get("size", "11x17")
+    margin = page_cfg.get("margin_mm", 20.0)
+    # content-addressed: photo + sidecar bytes, not the path, so an
+    # edited photo can never be served a stale ctx
+    graph = ctxcache.pyramid(_graph(sp), level, {
+        **HALVERS, "normals": halve, "normal_var": halve, "scene": halve,
+        "semantic": halve})
+    base = structure_ctx(path, size, margin, sp, graph=graph,
+                         root=ctxcache.photo_digest(path))
+    key = ctxcache.ctx_key(path, sp, size, margin)
+    return ctxcache.CtxView(base, f"{key}@{level}" if level else key)
+
+
+def _run_entry(ctx: dict, genome: dict, seed: int, entry: dict, mask,
+               band_i: int, prof=NO_PROFILE) -> list | None:
+    """One band/zone stage: region cleanup -> module -> post-passes.
+    Depends only on its arguments and the (read-only) ctx, so stages are
+    independent of each other and may run in any process. None = the
+    region cleaned away to nothing (the pen gets no layer from it)."""
+    page = ctx["page"]
+    name = entry["module"]
+    with prof.span(f"band {band_i} {name}", module=name, band=band_i):
+        with prof.span("mask_to_region", "pass"):
+            rp = {**ctx.get("region_params", {}), **entry.get("region", {})}
+            region, mask = clean_mask(mask, page, **rp)
+            if mask is None:
+                return None
+        params, hp = _lod(genome, entry.get("params", {}),
+                          {**genome.get("humanize", {}),
+                           **entry.get("humanize", {})})
+        mctx, mask = _cropped(genome, entry, ctx, mask)
+        with prof.span(name, "module"):
+            rng = np.random.default_rng([seed, band_i])
+            lines = MODULES[name](mask, region, mctx, params, rng)
+            prof.count(lines)
+        tm = entry.get("tone_mod")
+        em = entry.get("emphasis")
+        if _postpass_mode(genome, entry) == "fused":
+            with prof.span("postpass", "pass"):
+                lines = postpass(lines, ctx, tm, em, hp,
+                                 np.random.default_rng([seed, band_i, 7]),
+                                 np.random.default_rng([seed, band_i, 11]),
+                                 seed * 1000 + band_i)
+                prof.count(lines)
+        else:
+            if tm is not None:
+                with prof.span("tone_gate", "pass"):
+                    lines = tone_gate(
+                        lines, ctx, tm,
+                        np.random.default_rng([seed, band_i, 7]))
+                    prof.count(lines)
+            if em is not None:
+                with prof.span("emphasis_gate", "pass"):
+                    lines = emphasis_gate(
+                        lines, ctx, em,
+                        np.random.default_rng([seed, band_i, 11]))
+                    prof.count(lines)
+            with prof.span("humanize", "pass"):
+                lines = humanize(lines, seed * 1000 + band_i, hp)
+                prof.count(lines)
+        prof.count(lines)
+    log.info("band %s %s: %d lines", band_i, name, len(lines))
+    return lines
+
+
+def _lod(genome: dict, params: dict, hp: dict) -> tuple[dict, dict]:
+    """Level of detail: genome["lod"] = f > 1 draws every hatch f times
+    sparser (modules.LOD_SCALED) and humanizes at an f times coarser
+    resample step, for thumbnails where that detail is below a pixel.
+    Deterministic like any other genome key; pair it with pen widths
+    times f (evolve/preview.py) and the tone reads the same."""
+    lod = float(genome.get("lod", 1.0))
+    if lod == 1.0:
+        return params, hp
+    if lod <= 0:
+        raise ValueError(f"lod must be > 0, got {lod}")
+    return {**params, "lod": lod}, {
+        **hp, "resample_mm": lod * hp.get("resample_mm",
+                                          HUMANIZE_DEFAULTS["resample_mm"])}
+
+
+def _cropped(genome: dict, entry: dict, ctx, mask) -> tuple:
+    """-> (ctx, mask) the module runs on. With "crop" (entry, else
+    genome) both are cut to the mask's padded bbox, so a small mass costs
+    its own area rather than the page's. Opt-in: modules that filter or
+    segment the frame see less border, so lines can differ slightly."""
+    if not entry.get("crop", genome.get("crop", False)):
+        return ctx, mask
+    y0, y1, x0, x1 = box = mask_box(mask, ctx["page"])
+    return CropView(ctx, box), mask[y0:y1, x0:x1]
+
+
+def _postpass_mode(genome: dict, entry: dict) -> str:
+    """"staged" (tone_gate, emphasis_gate, humanize) or "fused"
+    (postpass.py); an entry's own setting wins over the genome's."""
+    mode = entry.get("postpass", genome.get("postpass", "staged"))
+    if mode not in POSTPASS_MODES:
+        raise ValueError(f"unknown postpass {mode!r}")
+    return mode
+
+
+# worker-side state, inherited through fork() — the ctx arrays are never
+# pickled, only each job's (bit-packed) mask travels to the worker
+_WORKER: dict = {}
+
+
+def _worker_run(job) -> tuple:
+    """-> (lines, profile events); the events carry the worker's pid.
+    Lines travel back packed: two arrays to pickle, not 10k tiny ones."""
+    entry, packed, shape, band_i = job
+    mask = np.unpackbits(packed, count=shape[0] * shape[1]
+                         ).reshape(shape).astype(bool)
+    t0 = _WORKER["prof_t0"]
+    prof = (NO_PROFILE if t0 is None
+            else Profiler(memory=_WORKER["prof_memory"], t0=t0))
+    try:
+        lines = _run_entry(_WORKER["ctx"], _WORKER["genome"],
+                           _WORKER["seed"], entry, mask, band_i, prof)
+    finally:
+        prof.close()  # a worker that started tracing stops it per job
+    if lines is not None:
+        lines = PolylineBatch.from_lines(lines)
+    return lines, getattr(prof, "events", [])
+
+
+def _run_jobs(jobs: list, ctx, genome: dict, seed: int, workers: int,
+              memo: bool = True, prof=NO_PROFILE) -> list:
+    """Execute (entry, mask, band_i) jobs -> lines per job, in job order.
+    Every job owns its RNG streams ([seed, band_i, ...]), so a pool
+    changes wall time only: output is byte-identical to the serial path.
+    With memo, stages whose inputs are unchanged since an earlier render
+    are served from the stage memo and only the rest execute."""
+    out = [stage_memo.MISS] * len(jobs)
+    keys = None
+    if memo:
+        with prof.span("stage memo", "setup"):
+            ck = stage_memo.ctx_digest(ctx)
+            keys = [stage_memo.stage_key(ck, genome, e, m, b, seed)
+                    for e, m, b in jobs]
+            out = [stage_memo.get(k) for k in keys]
+            prof.note(hits=sum(r is not stage_memo.MISS for r in out),
+                      stages=len(jobs))
+    todo = [i for i, r in enumerate(out) if r is stage_memo.MISS]
+    if memo and len(todo) < len(jobs):
+        log.info("stage memo: %d/%d stages reused",
+                 len(jobs) - len(todo), len(jobs))
+    if workers > 1 and len(todo) > 1 \
+            and "fork" not in mp.get_all_start_methods():
+        log.warning("no fork() on this platform; rendering serially")
+        workers = 1
+    if workers <= 1 or len(todo) <= 1:
+        done = [_run_entry(ctx, genome, seed, *jobs[i], prof) for i in todo]
+    else:
+        ctx.materialize()
+        _WORKER.update(ctx=ctx, genome=genome, seed=seed,
+                       prof_t0=getattr(prof, "t0", None),
+                       prof_memory=prof.memory)
+        try:
+            with ProcessPoolExecutor(min(workers, len(todo)),
+                                     mp_context=mp.get_context("fork")
+                                     ) as ex:
+                res = list(ex.map(
+                    _worker_run,
+                    [(e, np.packbits(m, axis=None), m.shape, b)
+                     for e, m, b in (jobs[i] for i in todo)]))
+        finally:
+            _WORKER.clear()
+        done = [None if b is None else b.lines() for b, _ev in res]
+        if prof is not NO_PROFILE:
+            for _lines, ev in res:
+                prof.events.extend(ev)
+    for i, lines in zip(todo, done):
+        out[i] = lines
+        if memo:
+            stage_memo.put(keys[i], lines)
+    return out
+
+
+def render(genome: dict, seed: int, photo_path: str | None = None,
+           workers: int = 0, memo: bool = True, profile=False,
+           preview_level: int = 0, lod: float | None = None):
+    """→ (layers {pen: [Polyline]}, page). Pure in (genome, seed, photo).
+
+    workers > 1 runs the independent zone/band stages in a process pool
+    (fork); memo serves unchanged stages from the stage memo (memo.py);
+    profile (True or a profile.Profiler) records per-stage timings.
+    None of them changes the result.
+
+    preview_level k does: every mask, region and watershed runs on the
+    ctx pyramid's level k (work_px_per_mm / 2^k), polylines still come
+    out in page mm. A preview of the render, not the render. lod
+    overrides the genome's level of detail (_lod)."""
+    if lod is not None:
+        genome = {**genome, "lod": lod}
+    prof = resolve_profiler(profile)
+    with prof.span("render", "render", seed=seed):
+        out = _render(genome, seed, photo_path, workers, memo, prof,
+                      preview_level)
+    if profile is True:
+        log.info("render profile:\n%s", prof.summary())
+    return out
+
+
+def _render(genome: dict, seed: int, photo_path: str | None, workers: int,
+            memo: bool, prof, level: int = 0):
+    with prof.span("structure_ctx", "setup"):
+        ctx = _structure_ctx(genome, photo_path, level)
     page = ctx["page"]
     layers: dict[str, list] = {}
+    jobs: list = []
 
     def run(entry: dict, mask, band_i: int):
-        name = entry["module"]
-        if name == "empty":
-            return
-        rp = {**ctx.get("region_params", {}), **entry.get("region", {})}
-        region = mask_to_region(mask, page, **rp)
-        if region.is_empty:
-            return
-        mask = region_to_mask(region, page, mask.shape)
-        rng = np.random.default_rng([seed, band_i])
-        lines = MODULES[name](mask, region, ctx, entry.get("params", {}), rng)
-        tm = entry.get("tone_mod")
-        if tm is not None:
-            lines = tone_gate(lines, ctx, tm,
-                              np.random.default_rng([seed, band_i, 7]))
-        em = entry.get("emphasis")
-        if em is not None:
-            lines = emphasis_gate(lines, ctx, em,
-                                  np.random.default_rng([seed, band_i, 11]))
-        hp = {**genome.get("humanize", {}), **entry.get("humanize", {})}
-        lines = humanize(lines, seed * 1000 + band_i, hp)
-        log.info("band %s %s: %d lines", band_i, name, len(lines))
-        layers.setdefault(entry.get("pen", "black03"), []).extend(lines)
+        if entry["module"] != "empty":
+            jobs.append((entry, mask, band_i))
 
     def run_stack(bands, edges, zmask, base_i, edges_i, base=None):
         if base:
@@ -144,46 +379,76 @@ def render(genome: dict, seed: int, photo_path: str | None = None):
         gamma = float(tc.get("gamma", 1.15))
         max_cov = float(tc.get("max_cov", 0.85))
         target = np.clip(1.0 - ctx["gray"], 0, 1) ** gamma * max_cov
+        pen = tc.get("pen", "black03")
+        with prof.span("ink_map", "pass"):
+            canvas = InkCanvas(page, ctx["gray"].shape,
+                               float(tc.get("blur_mm", 1.4)), layers)
         for pass_i in range(int(tc.get("passes", 1))):
-            cov = ink_map(layers, page, ctx["gray"].shape,
-                          blur_mm=float(tc.get("blur_mm", 1.4)))
-            deficit = np.clip(target - cov, 0.0, 1.0)
-            mask = deficit > float(tc.get("min_deficit", 0.1))
-            if mask.mean() < 0.002:
+            with prof.span(f"tone_close {pass_i}"):
+                lines = close_pass(tc, target, canvas.coverage, pass_i)
+            if lines is None:
                 break
+            layers.setdefault(pen, []).extend(lines)
+            with prof.span("ink_map", "pass"):
+                canvas.add(pen, lines)
+
+    def close_pass(tc: dict, target, cov, pass_i: int):
+        deficit = np.clip(target - cov, 0.0, 1.0)
+        mask = deficit > float(tc.get("min_deficit", 0.1))
+        if mask.mean() < 0.002:
+            return None
+        with prof.span("mask_to_region", "pass"):
             rp = {**ctx.get("region_params", {}),
                   "close_mm": 1.5, "min_area_mm2": 15.0,
                   **tc.get("region", {})}
-            reg = mask_to_region(mask, page, **rp)
-            if reg.is_empty:
-                break
-            m = region_to_mask(reg, page, mask.shape)
+            reg, m = clean_mask(mask, page, **rp)
+            if m is None:
+                return None
+        name = tc.get("module", "flow_hatch")
+        params, hp = _lod(genome, tc.get("params", {}),
+                          {**genome.get("humanize", {}),
+                           **tc.get("humanize", {})})
+        mctx, m = _cropped(genome, tc, ctx, m)
+        with prof.span(name, "module"):
             rng = np.random.default_rng([seed, 990 + pass_i])
-            lines = MODULES[tc.get("module", "flow_hatch")](
-                m, reg, ctx, tc.get("params", {}), rng)
-            lines = tone_gate(
-                lines, ctx, tc.get("tone_mod",
-                                   {"low": 0.05, "high": 0.28,
-                                    "seg_mm": 2.5}),
-                np.random.default_rng([seed, 990 + pass_i, 7]),
-                dark_map=deficit)
-            hp = {**genome.get("humanize", {}), **tc.get("humanize", {})}
-            lines = humanize(lines, seed * 1000 + 990 + pass_i, hp)
-            log.info("tone_close pass %d: %d lines (deficit %.1f%%)",
-                     pass_i, len(lines), 100 * mask.mean())
-            layers.setdefault(tc.get("pen", "black03"), []).extend(lines)
-
-    full = np.ones_like(ctx["edge_map"], dtype=bool)
+            lines = MODULES[name](m, reg, mctx, params, rng)
+            prof.count(lines)
+        tm = tc.get("tone_mod", {"low": 0.05, "high": 0.28, "seg_mm": 2.5})
+        if _postpass_mode(genome, tc) == "fused":
+            with prof.span("postpass", "pass"):
+                lines = postpass(
+                    lines, ctx, tm, None, hp,
+                    np.random.default_rng([seed, 990 + pass_i, 7]), None,
+                    seed * 1000 + 990 + pass_i, dark_map=deficit)
+                prof.count(lines)
+        else:
+            with prof.span("tone_gate", "pass"):
+                lines = tone_gate(
+                    lines, ctx, tm,
+                    np.random.default_rng([seed, 990 + pass_i, 7]),
+                    dark_map=deficit)
+                prof.count(lines)
+            with prof.span("humanize", "pass"):
+                lines = humanize(lines, seed * 1000 + 990 + pass_i, hp)
+                prof.count(lines)
+        prof.count(lines)
+        log.info("tone_close pass %d: %d lines (deficit %.1f%%)",
+                 pass_i, len(lines), 100 * mask.mean())
+        return lines
+
+    full = np.ones(ctx["gray"].shape, bool)
     zones = genome.get("zones")
     if genome.get("plan"):
-        zones = compile_plan(genome["plan"], ctx)
+        with prof.span("compile_plan", "setup"):
+            zones = compile_plan(genome["plan"], ctx)
     if zones:
         # zones claim pixels in order; {"type": "rest"} takes the remainder
         claimed = np.zeros_like(full)
         for zi, zone in enumerate(zones):
             sel = zone.get("select", {"type": "rest"})
-            zm = (~claimed if sel.get("type") == "rest"
-                  else zone_mask(sel, ctx) & ~claimed)
+            with prof.span("zone_mask", "setup"):
+                zm = (~claimed if sel.get("type") == "rest"
+                      else zone_mask(sel, ctx) & ~claimed)
             claimed |= zm
             kl = float(zone.get("keyline_mm", 0.0))
             if kl > 0:
@@ -203,6 +468,11 @@ def render(genome: dict, seed: int, photo_path: str | None = None):
         # of every already-stored genome byte-identical
         run_stack(genome.get("bands", []), genome.get("edges"), full, 0, 99)
 
+    for (entry, _m, _b), lines in zip(
+            jobs, _run_jobs(jobs, ctx, genome, seed, workers, memo, prof)):
+        if lines is not None:
+            layers.setdefault(entry.get("pen", "black03"), []).extend(lines)
+
     tc = genome.get("tone_close")
     if tc:
         close_tone(tc)
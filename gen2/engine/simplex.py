@@ -0,0 +1,99 @@
+"""2D OpenSimplex noise over whole arrays.
+
+A NumPy port of opensimplex 0.4's noise2 (KdotJPG's original 2D
+OpenSimplex): Simplex2(seed).noise2(x, y) with x, y arrays returns, per
+point, exactly the float OpenSimplex(seed).noise2(x, y) returns — same
+permutation from the same seed, same operations in the same order — so
+swapping it in leaves every stored render bit-identical. The branchy
+scalar code becomes masks: every point computes every candidate vertex
+and np.where keeps the one its simplex would have picked.
+"""
+
+import numpy as np
+
+STRETCH = -0.211324865405187  # (1/sqrt(2+1)-1)/2
+SQUISH = 0.366025403784439    # (sqrt(2+1)-1)/2
+NORM = 47
+GRADIENTS = np.array([5, 2, 2, 5, -5, 2, -2, 5,
+                      5, -2, 2, -5, -5, -2, -2, -5], np.int64)
+
+
+def _perm(seed: int) -> np.ndarray:
+    """opensimplex's seed -> permutation (64-bit LCG shuffle)."""
+    def lcg(s):
+        s = (s * 6364136223846793005 + 1442695040888963407) & (2**64 - 1)
+        return s - 2**64 if s >= 2**63 else s  # as a signed int64
+    perm = np.zeros(256, np.int64)
+    source = list(range(256))
+    seed = lcg(lcg(lcg(seed)))
+    for i in range(255, -1, -1):
+        seed = lcg(seed)
+        r = (seed + 31) % (i + 1)
+        perm[i] = source[r]
+        source[r] = source[i]
+    return perm
+
+
+class Simplex2:
+    def __init__(self, seed: int):
+        self.perm = _perm(seed)
+
+    def _contrib(self, xsb, ysb, dx, dy) -> np.ndarray:
+        """One vertex's attn^4 * (gradient . offset), 0.0 where attn <= 0
+        (x + 0.0 == x, so skipped terms add nothing, as in the scalar)."""
+        attn = 2 - dx * dx - dy * dy
+        p = self.perm
+        i = p[(p[xsb & 0xFF] + ysb) & 0xFF] & 0x0E
+        ext = GRADIENTS[i] * dx + GRADIENTS[i + 1] * dy
+        a2 = attn * attn
+        return np.where(attn > 0, a2 * a2 * ext, 0.0)
+
+    def noise2(self, x, y) -> np.ndarray:
+        x = np.asarray(x, np.float64)
+        y = np.asarray(y, np.float64)
+        stretch = (x + y) * STRETCH
+        xs, ys = x + stretch, y + stretch
+        xsb, ysb = np.floor(xs), np.floor(ys)
+        squish = (xsb + ysb) * SQUISH
+        xins, yins = xs - xsb, ys - ysb
+        in_sum = xins + yins
+        dx0, dy0 = x - (xsb + squish), y - (ysb + squish)
+        xsb, ysb = xsb.astype(np.int64), ysb.astype(np.int64)
+
+        value = np.zeros_like(x)
+        value = value + self._contrib(xsb + 1, ysb, dx0 - 1 - SQUISH,
+                                      dy0 - 0 - SQUISH)
+        value = value + self._contrib(xsb, ysb + 1, dx0 - 0 - SQUISH,
+                                      dy0 - 1 - SQUISH)
+
+        low = in_sum <= 1  # the (0,0) triangle, else the (1,1) one
+        xgy = xins > yins
+        # (0,0) triangle: extra vertex beside (0,0), or at (1,1)
+        zl = 1 - in_sum
+        near0 = (zl > xins) | (zl > yins)
+        ex_l = np.where(near0, np.where(xgy, xsb + 1, xsb - 1), xsb + 1)
+        ey_l = np.where(near0, np.where(xgy, ysb - 1, ysb + 1), ysb + 1)
+        edx_l = np.where(near0, np.where(xgy, dx0 - 1, dx0 + 1),
+                         dx0 - 1 - 2 * SQUISH)
+        edy_l = np.where(near0, np.where(xgy, dy0 + 1, dy0 - 1),
+                         dy0 - 1 - 2 * SQUISH)
+        # (1,1) triangle: extra vertex beyond (1,1), or at (0,0)
+        zh = 2 - in_sum
+        near1 = (zh < xins) | (zh < yins)
+        ex_h = np.where(near1, np.where(xgy, xsb + 2, xsb + 0), xsb)
+        ey_h = np.where(near1, np.where(xgy, ysb + 0, ysb + 2), ysb)
+        edx_h = np.where(near1, np.where(xgy, dx0 - 2 - 2 * SQUISH,
+                                         dx0 + 0 - 2 * SQUISH), dx0)
+        edy_h = np.where(near1, np.where(xgy, dy0 + 0 - 2 * SQUISH,
+                                         dy0 - 2 - 2 * SQUISH), dy0)
+
+        # contribution (0,0) or (1,1)
+        value = value + self._contrib(
+            np.where(low, xsb, xsb + 1), np.where(low, ysb, ysb + 1),
+            np.where(low, dx0, dx0 - 1 - 2 * SQUISH),
+            np.where(low, dy0, dy0 - 1 - 2 * SQUISH))
+        # extra vertex
+        value = value + self._contrib(
+            np.where(low, ex_l, ex_h), np.where(low, ey_l, ey_h),
+            np.where(low, edx_l, edx_h), np.where(low, edy_l, edy_h))
+        return value / NORM
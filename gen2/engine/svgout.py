@@ -11,19 +11,25 @@ from pathlib import Path
 
 import numpy as np
 
-from .geom import Polyline
+from .geom import Lines, as_batch
 from .page import Page
 
 
-def _path_d(line: Polyline, nd: int = 2) -> str:
-    pts = np.round(line, nd)
-    coords = [f"{p[0]:.{nd}f},{p[1]:.{nd}f}" for p in pts]
-    return "M " + " L ".join(coords)
+def _paths(lines: Lines, nd: int = 2) -> list[str]:
+    """<path d="M x,y L ..."/> per line of >= 2 vertices, from one
+    round + format pass over the layer's packed vertices."""
+    b = as_batch(lines)
+    xy = np.round(b.verts, nd).tolist()
+    coords = [f"{x:.{nd}f},{y:.{nd}f}" for x, y in xy]
+    return [f'<path d="M {" L ".join(coords[s:e])}"/>'
+            for s, e in zip(b.offsets[:-1].tolist(), b.offsets[1:].tolist())
+            if e - s >= 2]
 
 
-def write_svg(layers: dict[str, list[Polyline]], pens: dict[str, dict],
+def write_svg(layers: dict[str, Lines], pens: dict[str, dict],
               page: Page, path: str) -> None:
-    """layers: {pen_name: polylines}; pens: {name: {color, width_mm}}."""
+    """layers: {pen_name: polylines or PolylineBatch};
+    pens: {name: {color, width_mm}}."""
     w, h = page.width_mm, page.height_mm
     parts = [
         '<?xml version="1.0" encoding="UTF-8"?>',
@@ -38,9 +44,7 @@ def write_svg(layers: dict[str, list[Polyline]], pens: dict[str, dict],
             f'<g inkscape:groupmode="layer" inkscape:label="{label}" '
             f'id="layer{i}" fill="none" stroke="{pen["color"]}" '
             f'stroke-width="{pen["width_mm"]}" stroke-linecap="round">')
-        for ln in lines:
-            if len(ln) >= 2:
-                parts.append(f'<path d="{_path_d(ln)}"/>')
+        parts.extend(_paths(lines))
         parts.append('</g>')
     parts.append('</svg>')
     Path(path).write_text("\n".join(parts))
@@ -16,7 +16,7 @@ Gray is sampled in page space via the one px<->mm transform (Page).
 
 import numpy as np
 
-from .geom import Polyline, resample
+from .geom import Lines, Polyline, resample
 
 DEFAULTS = {
     "low": 0.12,     # darkness at/below which chunks vanish (bare paper)
@@ -26,7 +26,7 @@ DEFAULTS = {
 }
 
 
-def tone_gate(lines: list[Polyline], ctx: dict, params: dict | None,
+def tone_gate(lines: Lines, ctx: dict, params: dict | None,
               rng: np.random.Generator,
               dark_map: np.ndarray | None = None) -> list[Polyline]:
     """dark_map overrides the default darkness source (1 - gray): the
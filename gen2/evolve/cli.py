@@ -80,6 +80,9 @@ def main() -> None:
                          "this many candidates and returns the best 2")
     ap.add_argument("--no-open", action="store_true",
                     help="don't auto-open composites")
+    ap.add_argument("--preview-level", type=int, default=0,
+                    help="render thumbnails on ctx pyramid level k "
+                         "(1/2^k resolution): faster, coarser masks")
     args = ap.parse_args()
 
     store = Store(args.db)
@@ -109,7 +112,8 @@ def main() -> None:
                            payload_dir=run_dir / "payloads")
 
     parent_png = render_thumb(parent_genome, seed, args.photo,
-                              run_dir / f"{parent_id}.png")
+                              run_dir / f"{parent_id}.png",
+                              preview_level=args.preview_level)
     history: list[dict] = []
     steer: str | None = None
     pick_streak, bad_streak = 0, 0
@@ -142,7 +146,8 @@ def main() -> None:
                                  steer or prop["rationale"])
             print(f"  rendering {slot.upper()} ({nid})...")
             pngs[slot] = render_thumb(prop[f"child_{slot}"], seed,
-                                      args.photo, run_dir / f"{nid}.png")
+                                      args.photo, run_dir / f"{nid}.png",
+                                      preview_level=args.preview_level)
             nodes[slot] = nid
         comp = run_dir / f"gen{gen:03d}_ab.png"
         composite(run_dir / f"{nodes['a']}.png",
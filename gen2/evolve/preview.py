@@ -4,6 +4,13 @@ Importable (used by evolve/cli.py) and runnable — the /mutate-genome
 command invokes it to see its own candidates before returning them:
 
     .venv/bin/python gen2/evolve/preview.py <genome.json> <photo> <seed> <out.png>
+
+--profile (anywhere on the line) also prints per-stage timings and writes
+<out>.trace.json for chrome://tracing; --profile-mem adds peak memory.
+--level=K renders on ctx pyramid level K (render's preview_level): masks
+at 1/2^K resolution, quicker, slightly off the real thing. --lod=F draws
+F times sparser with F times wider pens (render's lod): same tone, less
+detail than a thumbnail can't show anyway.
 """
 
 import json
@@ -16,14 +23,29 @@ HERE = Path(__file__).parent.parent
 
 sys.path.insert(0, str(HERE))
 
+from engine.profile import Profiler              # noqa: E402
 from engine.render import render                 # noqa: E402
 from engine.svgout import render_png, write_svg  # noqa: E402
 
 
 def render_thumb(genome: dict, seed: int, photo: str,
-                 out_png: Path, width_px: int = 850) -> Path:
-    layers, page = render(genome, seed, photo_path=photo)
+                 out_png: Path, width_px: int = 850,
+                 profile: Profiler | None = None,
+                 preview_level: int = 0, lod: float | None = None) -> Path:
+    # previews wobble from humanize's cached lattice (<= ~32 um off exact
+    # at the defaults, see engine/humanize.py) unless the genome pins a mode
+    genome = {**genome, "humanize": {"wobble": "field",
+                                     **genome.get("humanize", {})}}
+    if lod is not None:
+        genome["lod"] = lod
+    layers, page = render(genome, seed, photo_path=photo, profile=profile,
+                          preview_level=preview_level)
     pens = tomllib.loads((HERE / "pens.toml").read_text())
+    lod = float(genome.get("lod", 1.0))
+    if lod != 1.0:
+        # ink-weight compensation: lines lod x sparser, pens lod x wider
+        pens = {k: {**v, "width_mm": v["width_mm"] * lod}
+                for k, v in pens.items()}
     with tempfile.NamedTemporaryFile(suffix=".svg") as tf:
         write_svg(layers, pens, page, tf.name)
         render_png(tf.name, str(out_png), width_px=width_px)
@@ -31,9 +53,21 @@ def render_thumb(genome: dict, seed: int, photo: str,
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 5:
+    flags = {"--profile", "--profile-mem"}
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:]
+                if a.startswith(("--level=", "--lod=")))
+    args = [a for a in sys.argv[1:]
+            if a not in flags and not a.startswith(("--level=", "--lod="))]
+    if len(args) != 4:
         sys.exit(__doc__)
-    genome_path, photo, seed, out = sys.argv[1:]
+    genome_path, photo, seed, out = args
     genome = json.loads(Path(genome_path).read_text())
-    render_thumb(genome, int(seed), photo, Path(out))
+    prof = (Profiler(memory="--profile-mem" in sys.argv)
+            if flags & set(sys.argv) else None)
+    render_thumb(genome, int(seed), photo, Path(out), profile=prof,
+                 preview_level=int(opts.get("level", 0)),
+                 lod=float(opts["lod"]) if "lod" in opts else None)
+    if prof:
+        prof.write_trace(Path(out).with_suffix(".trace.json"))
+        print(prof.summary(), file=sys.stderr)
     print(out)
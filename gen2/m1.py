@@ -18,6 +18,7 @@ from pathlib import Path
 
 import numpy as np
 
+from engine.profile import Profiler
 from engine.render import render
 from engine.svgout import render_png, vpype_optimize, write_svg
 
@@ -49,9 +50,13 @@ def _parse_optimized(svg_path: str) -> list[np.ndarray]:
 
 
 def render_genome(genome_path: str, photo: str, seed: int,
-                  out_dir: Path) -> tuple[Path, Path]:
+                  out_dir: Path, workers: int = 0,
+                  profile: bool = False, profile_mem: bool = False
+                  ) -> tuple[Path, Path]:
     genome = json.loads(Path(genome_path).read_text())
-    layers, page = render(genome, seed, photo_path=photo)
+    prof = Profiler(memory=profile_mem) if profile or profile_mem else None
+    layers, page = render(genome, seed, photo_path=photo, workers=workers,
+                          profile=prof)
     pens = tomllib.loads((HERE / "pens.toml").read_text())
     ordered = {n: layers[n] for n in pens if layers.get(n)}
 
@@ -74,6 +79,10 @@ def render_genome(genome_path: str, photo: str, seed: int,
     png = out_dir / f"{stem}.png"
     write_svg(opt, pens, page, str(svg))
     render_png(str(svg), str(png))
+    if prof:
+        prof.write_trace(out_dir / f"{stem}.trace.json")
+        log.info("%s\ntrace: %s", prof.summary(),
+                 out_dir / f"{stem}.trace.json")
     return svg, png
 
 
@@ -84,8 +93,17 @@ if __name__ == "__main__":
     ap.add_argument("photo")
     ap.add_argument("--seed", type=int, default=1)
     ap.add_argument("--out", default="runs")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="render zones/bands in N processes (same output)")
+    ap.add_argument("--profile", action="store_true",
+                    help="per-stage timings + <stem>.trace.json "
+                         "(chrome://tracing)")
+    ap.add_argument("--profile-mem", action="store_true",
+                    help="--profile plus per-stage peak memory (slow)")
     args = ap.parse_args()
     svg, png = render_genome(args.genome, args.photo, args.seed,
-                             Path(args.out))
+                             Path(args.out), workers=args.workers,
+                             profile=args.profile,
+                             profile_mem=args.profile_mem)
     print(svg)
     print(png)
@@ -2,17 +2,24 @@
 
 1. Module smoke: every registered module renders a synthetic band without
    NaNs, stays within the region bbox (+ tolerance), returns valid polylines.
-2. Golden: render(genome, seed) twice -> identical polylines (purity).
-3. Real-photo benchmark: every preset genome renders against real photos.
+2. Golden: render(genome, seed) twice -> identical polylines (purity),
+   serially, through the worker pool and from the stage memo; a warm
+   (memory-mapped) disk ctx renders exactly like a cold one; profiling
+   records every stage and changes nothing.
+3. Real-photo benchmark: every preset genome renders against real photos;
+   the lockstep streamline tracer matches the reference one, faster.
 4. Pair benchmark: fixtures include (photo, human ink drawing) pairs of the
    SAME composition — renders are scored on whether they put ink where the
    artist did (density correlation, ink budget, bare paper).
+5. LOD: a level-of-detail thumbnail is deterministic and reads as the same
+   tone as the full one.
 """
 
 import json
 import sys
 from pathlib import Path
 
+import cv2
 import numpy as np
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -66,15 +73,659 @@ def golden() -> None:
     genome = json.loads(
         (Path(__file__).parent.parent / "genomes" / "classic_ink.json")
         .read_text())
-    a, _ = render(genome, 42, photo_path=FIXTURE)
-    b, _ = render(genome, 42, photo_path=FIXTURE)
+    a, _ = render(genome, 42, photo_path=FIXTURE, memo=False)
+    b, _ = render(genome, 42, photo_path=FIXTURE, workers=3, memo=False)
+    c, _ = render(genome, 42, photo_path=FIXTURE)         # fills the memo
+    child = json.loads(json.dumps(genome))
+    child["bands"][-1]["pen"] = "blue03"                  # pen mutation:
+    d, _ = render(child, 42, photo_path=FIXTURE)          # all memo hits
+    e, _ = render(child, 42, photo_path=FIXTURE, memo=False)
+    for x_, y_ in ((a, b), (a, c), (d, e)):
+        assert x_.keys() == y_.keys()
+        for pen in x_:
+            assert len(x_[pen]) == len(y_[pen]), pen
+            for x, y in zip(x_[pen], y_[pen]):
+                assert np.array_equal(x, y), f"{pen}: polyline mismatch"
+    # memo entries are frozen copies, keyed by the ctx overlay too
+    from engine import memo
+    from engine.ctxcache import CtxView
+    lines = [np.zeros((2, 2)), np.ones((3, 2))]
+    memo.put("golden", lines)
+    lines[0][:] = 7.0
+    got = memo.get("golden")
+    assert got[0].sum() == 0 and not got[0].flags.writeable
+    got.clear()
+    assert len(memo.get("golden")) == 2
+    view = CtxView({}, "k")
+    keys = {memo.ctx_digest(view)}
+    view["plan_outline_mask"] = np.zeros((4, 4), bool)
+    keys.add(memo.ctx_digest(view))
+    view["plan_outline_mask"][1, 1] = True
+    keys.add(memo.ctx_digest(view))
+    assert len(keys) == 3
+    n = sum(len(v) for v in a.values())
+    print(f"  golden ok: render(genome, 42) reproducible, serial == "
+          f"3 workers == memoized ({n} lines)")
+
+
+def ctx_cache() -> None:
+    import os
+    import tempfile
+    from engine import ctxcache, render as rmod
+    genome = json.loads(
+        (Path(__file__).parent.parent / "genomes" / "minimal.json")
+        .read_text())
+    old = os.environ.get("GART_CTX_CACHE")
+    with tempfile.TemporaryDirectory() as td:
+        os.environ["GART_CTX_CACHE"] = td
+        try:
+            ctxcache.CHANNEL_CACHE.clear()
+            a, _ = render(genome, 42, photo_path=FIXTURE)  # cold: writes
+            ctxcache.CHANNEL_CACHE.clear()
+            ctx = rmod._structure_ctx(genome, FIXTURE)
+            assert isinstance(ctx["gray"], np.memmap), "ctx not mmapped"
+            ctx["plan_masses"] = np.zeros(ctx["gray"].shape, np.int32)
+            assert "plan_masses" not in rmod._structure_ctx(genome,
+                                                            FIXTURE), \
+                "render state leaked into the shared ctx"
+            b, _ = render(genome, 42, photo_path=FIXTURE)  # warm
+            # channels re-key themselves when their source changes
+            key = ctx.base.channel_key("gray")
+            real = ctxcache.file_digest
+            ctxcache.source_digest.cache_clear()
+            ctxcache.file_digest = lambda p: (
+                "edited" if Path(p).name == "photo.py" else real(p))
+            try:
+                ctx = rmod._structure_ctx(genome, FIXTURE)
+                assert ctx.base.channel_key("gray") != key, "stale key"
+            finally:
+                ctxcache.file_digest = real
+                ctxcache.source_digest.cache_clear()
+            # the disk bound: least recently used entries go first
+            ents = [m.parent for m in Path(td).glob("*/*/meta.json")]
+            for i, e in enumerate(ents):
+                os.utime(e / "meta.json", ns=(i * 10**9, i * 10**9))
+            last = sum(f.stat().st_size for f in ents[-1].iterdir())
+            assert ctxcache.prune(max_mb=last / 2**20) == len(ents) - 1
+            assert [m.parent for m in Path(td).glob("*/*/meta.json")] \
+                == ents[-1:], "prune kept the wrong entry"
+        finally:
+            ctxcache.CHANNEL_CACHE.clear()
+            if old is None:
+                os.environ.pop("GART_CTX_CACHE", None)
+            else:
+                os.environ["GART_CTX_CACHE"] = old
     assert a.keys() == b.keys()
     for pen in a:
         assert len(a[pen]) == len(b[pen]), pen
         for x, y in zip(a[pen], b[pen]):
-            assert np.array_equal(x, y), f"{pen}: polyline mismatch"
-    n = sum(len(v) for v in a.values())
-    print(f"  golden ok: render(genome, 42) reproducible ({n} lines)")
+            assert np.array_equal(x, y), f"{pen}: warm ctx drifted"
+    lru = ctxcache.LRUCache(max_mb=2)
+    for i in range(4):
+        lru.put(i, np.zeros(2**19, np.uint8))  # 0.5 MB each
+    lru.put("big", np.zeros(2**20 + 2**19, np.uint8))
+    assert list(lru._d) == [3, "big"] and lru.nbytes == 2 * 2**20, \
+        "LRU byte accounting"
+    print("  ctx cache ok: warm mmapped ctx == cold ctx, copy-on-write "
+          "views, LRU budget, source keys, disk prune")
+
+
+def lazy_ctx() -> None:
+    """Channels compute on first access only, and a param change
+    recomputes just the channels that read it."""
+    import os
+    import tempfile
+    from engine import ctxcache, render as rmod
+    genome = {"source": {"params": {}}, "page": {"size": "letter"}}
+    old = os.environ.get("GART_CTX_CACHE")
+    with tempfile.TemporaryDirectory() as td:
+        os.environ["GART_CTX_CACHE"] = td
+
+        def entries():
+            return {d.name for d in Path(td).glob("*/*")}
+        try:
+            ctxcache.CHANNEL_CACHE.clear()
+            ctx = rmod._structure_ctx(genome, FIXTURE)
+            bands = ctx["tone_bands"]
+            first = entries()
+            assert len(first) == 3, first  # work, tone, tone_bands
+            assert ctx.base.channel_key("tensor") not in first, \
+                "orientation computed unasked"
+            genome["source"]["params"]["n_bands"] = 3
+            ctx = rmod._structure_ctx(genome, FIXTURE)
+            assert len(ctx["tone_bands"]) == 3 and \
+                ctx.base.channel_key("tone") in first
+            assert len(entries() - first) == 1, "n_bands rebuilt more " \
+                "than tone_bands"
+            eager = load_structure_ctx(FIXTURE, page_size="letter",
+                                       margin_mm=20.0)
+            for k in ("gray", "edge_map", "orientation", "coherence", "hsv"):
+                assert np.array_equal(ctx[k], eager[k]), k
+            assert ctx["page"] == eager["page"]
+        finally:
+            ctxcache.CHANNEL_CACHE.clear()
+            if old is None:
+                os.environ.pop("GART_CTX_CACHE", None)
+            else:
+                os.environ["GART_CTX_CACHE"] = old
+    assert len(bands) == 5
+    print(f"  lazy ctx ok: {len(first)} channels cached for tone_bands, "
+          f"n_bands change rebuilds 1")
+
+
+def pyramid() -> None:
+    """preview_level: the ctx halves per level, bands still partition it,
+    and the page mm it maps to stay put."""
+    from engine import render as rmod
+    genome = json.loads(
+        (Path(__file__).parent.parent / "genomes" / "minimal.json")
+        .read_text())
+    full = rmod._structure_ctx(genome, FIXTURE)
+    h, w = full["gray"].shape
+    for level in (1, 2):
+        ctx = rmod._structure_ctx(genome, FIXTURE, level)
+        f = 2 ** level
+        assert ctx["gray"].shape == (-(-h // f), -(-w // f)), level
+        assert ctx["hsv"].shape[:2] == ctx["gray"].shape
+        assert (np.sum(ctx["tone_bands"], axis=0) == 1).all(), \
+            "bands no longer partition"
+        corner = ctx["page"].px_to_mm(np.array([[w / f, h / f]]))
+        assert np.allclose(corner, full["page"].px_to_mm(
+            np.array([[w, h]]))), "pyramid moved the page"
+    layers, page = render(genome, 42, photo_path=FIXTURE, preview_level=1)
+    pts = np.concatenate([ln for v in layers.values() for ln in v])
+    assert pts.min() >= 0 and pts[:, 0].max() <= page.width_mm
+    print(f"  pyramid ok: levels 1-2 of {(h, w)}, level-1 render in page mm")
+
+
+def tiled() -> None:
+    """Out-of-core extraction == in-core, bit for bit (stripes cut at an
+    odd height so halos straddle every kind of row)."""
+    import tempfile
+    from engine import photo
+    a = load_structure_ctx(FIXTURE, params={"band_anchor": "quantile"})
+    rows = photo.TILE_ROWS
+    with tempfile.TemporaryDirectory() as td:
+        photo.TILE_ROWS = 97
+        try:
+            b = load_structure_ctx(FIXTURE, params={"band_anchor":
+                                                    "quantile"}, out_dir=td)
+        finally:
+            photo.TILE_ROWS = rows
+        assert isinstance(b["gray"], np.memmap)
+        for k in ("gray", "edge_map", "orientation", "coherence", "hsv"):
+            assert np.array_equal(a[k], b[k]), k
+        assert all(np.array_equal(x, y)
+                   for x, y in zip(a["tone_bands"], b["tone_bands"]))
+        print(f"  tiled ok: {a['gray'].shape} memmapped channels == in-core")
+
+
+def region_memo() -> None:
+    """mask -> region cleanup: one Polygon per contour (the reference)
+    == the vectorized build; clean_mask memoizes the round trip."""
+    import shapely
+    from engine import photo
+    ctx = load_structure_ctx(FIXTURE, page_size="letter")
+    page, mask = ctx["page"], ctx["tone_bands"][1]
+    m = cv2.morphologyEx(mask.astype(np.uint8), cv2.MORPH_OPEN,
+                         np.ones((2, 2), np.uint8))
+    contours, hier = cv2.findContours(m, cv2.RETR_CCOMP,
+                                      cv2.CHAIN_APPROX_SIMPLE)
+    polys = []
+    for i, c in enumerate(contours):
+        if hier[0][i][3] != -1 or len(c) < 3:
+            continue
+        holes, j = [], hier[0][i][2]
+        while j != -1:
+            if len(contours[j]) >= 3:
+                holes.append(page.px_to_mm(contours[j][:, 0, :] * 1.0))
+            j = hier[0][j][0]
+        p = shapely.Polygon(page.px_to_mm(c[:, 0, :] * 1.0), holes)
+        p = p if p.is_valid else p.buffer(0)
+        if p.area >= 4.0:
+            polys.append(p)
+    ref = shapely.union_all(polys).simplify(0.3)
+    photo.REGION_CACHE.clear()
+    region, rmask = photo.clean_mask(mask, page, open_mm=2 * page.mm_per_px)
+    assert shapely.to_wkb(region) == shapely.to_wkb(ref)
+    assert np.array_equal(rmask, region_to_mask(region, page, mask.shape))
+    again = photo.clean_mask(mask.copy(), page, open_mm=2 * page.mm_per_px)
+    assert again[0] is region and again[1] is rmask
+    assert not rmask.flags.writeable
+    print(f"  region_memo ok: {len(polys)} polygons, round trip memoized")
+
+
+def crop() -> None:
+    """genome["crop"]: modules run on the band's bbox (photo.CropView),
+    the page offset keeps their lines where the full-frame run puts
+    them."""
+    genome = json.loads(
+        (Path(__file__).parent.parent / "genomes" / "classic_ink.json")
+        .read_text())
+    a, _ = render(genome, 42, photo_path=FIXTURE, memo=False)
+    b, _ = render({**genome, "crop": True}, 42, photo_path=FIXTURE,
+                  memo=False)
+    assert a.keys() == b.keys()
+    for pen in a:
+        assert len(a[pen]) == len(b[pen]), pen
+        assert all(x.shape == y.shape and np.allclose(x, y, atol=1e-6)
+                   for x, y in zip(a[pen], b[pen])), pen
+    # over a plain dict there is no stable key: derived channels stay on
+    # the view and never enter the shared DERIVED cache
+    from engine import ctxcache
+    from engine.photo import CropView
+    ctx = load_structure_ctx(FIXTURE, page_size="letter")
+    n = len(ctxcache.DERIVED)
+    views = [CropView(ctx, (0, 40, 0, 40)) for _ in range(2)]
+    got = [ctxcache.derived(v, "probe", object) for v in views]
+    assert views[0].key is None and got[0] is not got[1]
+    assert len(ctxcache.DERIVED) == n
+    print(f"  crop ok: cropped render == full-frame "
+          f"({sum(map(len, b.values()))} lines)")
+
+
+def profile() -> None:
+    import os
+    import tracemalloc
+    from engine.profile import Profiler
+    genome = json.loads(
+        (Path(__file__).parent.parent / "genomes" / "minimal.json")
+        .read_text())
+    plain, _ = render(genome, 42, photo_path=FIXTURE, memo=False)
+    was = tracemalloc.is_tracing()
+    prof = Profiler(memory=True)
+    got, _ = render(genome, 42, photo_path=FIXTURE, memo=False, workers=2,
+                    profile=prof)
+    for pen in plain:
+        assert all(np.array_equal(x, y)
+                   for x, y in zip(plain[pen], got[pen])), pen
+    ev = prof.trace()["traceEvents"]
+    stages = [e for e in ev if e["cat"] == "stage"]
+    assert stages and all(e["ph"] == "X" and e["dur"] >= 0 for e in ev)
+    assert {e["pid"] for e in stages} - {os.getpid()}, \
+        "worker spans not merged"
+    assert sum(e["args"].get("lines", 0) for e in stages) == \
+        sum(len(v) for v in got.values())
+    assert all("peak_mb" in e["args"] for e in ev)
+    assert "humanize" in prof.summary()
+    assert tracemalloc.is_tracing() == was, "summary() left tracing on"
+    if not was:
+        with Profiler(memory=True) as p:
+            assert tracemalloc.is_tracing()
+        assert not tracemalloc.is_tracing(), "profiler leaked tracemalloc"
+    print(f"  profile ok: {len(stages)} stage spans, output unchanged")
+
+
+def batch() -> None:
+    import tempfile
+    from engine.geom import PolylineBatch, length, resample
+    from engine.inkmap import InkCanvas, ink_map
+    from engine.page import Page
+    from engine.svgout import write_svg
+    rng = np.random.default_rng(3)
+    lines = [np.cumsum(rng.normal(size=(int(n), 2)), 0) + 100
+             for n in rng.integers(1, 25, 400)]
+    lines[7] = np.repeat(lines[7][:1], 4, 0)  # degenerate: passes through
+    b = PolylineBatch.from_lines(lines, tags=5)
+    assert all(np.array_equal(x, y) for x, y in zip(b, lines))
+    assert np.allclose(b.lengths(), [length(ln) for ln in lines])
+    for x, ln in zip(b.resample(0.7), lines):
+        y = resample(ln, 0.7)
+        assert x.shape == y.shape and np.allclose(x, y, atol=1e-9)
+    keep = rng.random(len(b.verts)) < 0.6
+    runs = b.slice_runs(keep)
+    want = []
+    for ln, o in zip(lines, b.offsets[:-1]):
+        idx = np.flatnonzero(keep[o:o + len(ln)])
+        want += [ln[r] for r in np.split(idx, np.flatnonzero(
+            np.diff(idx) > 1) + 1) if len(r) >= 2]
+    assert len(runs) == len(want) and (runs.tags == 5).all()
+    assert all(np.array_equal(x, y) for x, y in zip(runs, want))
+    from engine.humanize import _slice_by_arclen
+    long = np.flatnonzero(b.lengths() > 2)
+    lo = rng.uniform(0, 0.4, len(long)) * b.lengths()[long]
+    hi = lo + 0.5 * (b.lengths()[long] - lo)
+    for x, i, a, z in zip(b.cut(long, lo, hi), long, lo, hi):
+        seg = np.diff(lines[i], axis=0)
+        cum = np.concatenate([[0.0], np.cumsum(np.hypot(seg[:, 0],
+                                                        seg[:, 1]))])
+        y = _slice_by_arclen(lines[i], cum, a, z)
+        assert x.shape == y.shape and np.allclose(x, y, atol=1e-9)
+    page = Page(280, 430, 20)
+    assert np.array_equal(ink_map({"black03": lines}, page, (450, 300)),
+                          ink_map({"black03": b}, page, (450, 300)))
+    canvas = InkCanvas(page, (450, 300), layers={"black03": lines[:300]})
+    canvas.add("blue05", [ln + 20 for ln in lines[300:]])
+    assert np.array_equal(canvas.coverage, ink_map(
+        {"black03": lines[:300], "blue05": [ln + 20 for ln in lines[300:]]},
+        page, (450, 300))), "InkCanvas.add drifted from ink_map"
+    # dirty-rect adds vs one full-page paint and blur, edges and all
+    import cv2
+    from engine.inkmap import pen_width_mm
+    full = np.zeros((450, 300), np.uint8)
+    edge = [np.array([[-40.0, 5.0], [30.0, 60.0]]),
+            np.array([[250.0, 400.0], [330.0, 470.0]]),
+            np.array([[-90.0, -90.0], [-50.0, -60.0]])]
+    adds = [("black03", lines[:300]), ("blue05", [ln + 20 for ln in
+                                                  lines[300:]]),
+            ("red12", edge), ("black03", [ln * 1.7 for ln in lines[::9]])]
+    canvas = InkCanvas(page, (450, 300))
+    for pen, lns in adds:
+        canvas.add(pen, lns)
+        t = max(int(round(pen_width_mm(pen) / page.mm_per_px)), 1)
+        px = [np.round(page.mm_to_px(ln)).astype(np.int32) for ln in lns]
+        cv2.polylines(full, [p for p in px if len(p) >= 2], False, 255, t)
+        assert np.array_equal(canvas.canvas, full), pen
+        want = np.clip(cv2.boxFilter(full.astype(np.float32) / 255.0, -1,
+                                     (canvas.k, canvas.k)), 0.0, 1.0)
+        assert np.array_equal(canvas.coverage, want), pen
+    pens = {"black03": {"color": "#000", "width_mm": 0.3}}
+    with tempfile.TemporaryDirectory() as td:
+        write_svg({"black03": lines}, pens, page, f"{td}/a.svg")
+        write_svg({"black03": b}, pens, page, f"{td}/b.svg")
+        assert Path(f"{td}/a.svg").read_text() == \
+            Path(f"{td}/b.svg").read_text()
+    print(f"  batch ok: {len(b)} lines packed; length/resample/slice_runs/"
+          "cut, ink_map (+ incremental), write_svg agree with the list form")
+
+
+def fused() -> None:
+    """postpass="fused": pure, and the same ink as the staged chain (its
+    draws differ, its distributions must not)."""
+    from engine.geom import PolylineBatch
+    genome = json.loads(
+        (Path(__file__).parent.parent / "genomes" / "pen_ink.json")
+        .read_text())
+    staged, _ = render(genome, 42, photo_path=FIXTURE)
+    a, _ = render({**genome, "postpass": "fused"}, 42, photo_path=FIXTURE,
+                  memo=False)
+    b, _ = render({**genome, "postpass": "fused"}, 42, photo_path=FIXTURE)
+    for pen in a:
+        assert all(np.array_equal(x, y) for x, y in zip(a[pen], b[pen])), pen
+    ink = {k: sum(PolylineBatch.from_lines(v).lengths().sum()
+                  for v in layers.values())
+           for k, layers in (("staged", staged), ("fused", a))}
+    assert abs(ink["fused"] / ink["staged"] - 1) < 0.02, ink
+    print(f"  fused ok: reproducible, ink {ink['fused']:.0f} mm vs staged "
+          f"{ink['staged']:.0f} mm")
+
+
+def scanline() -> None:
+    """hatch.py's clip="scanline" == shapely clip_lines, to float
+    rounding: parallel lines, and fans pivoting outside and inside. The
+    default clip is clip_lines on fixed_hatch's own lines, bit for bit."""
+    from engine.geom import clip_lines
+    from engine.hatch import HatchBatch, _clip_fan, fixed_hatch, hatch_many
+    ctx = load_structure_ctx(FIXTURE)
+    region = mask_to_region(ctx["tone_bands"][1], ctx["page"])  # holes
+    minx, miny, maxx, maxy = region.bounds
+    c = np.array([(minx + maxx) / 2, (miny + maxy) / 2])
+    half = float(np.hypot(maxx - minx, maxy - miny)) / 2 + 1
+    rng = np.random.default_rng(3)
+    th = np.deg2rad(37.0)
+    d, nrm = np.array([np.cos(th), np.sin(th)]), np.array([-np.sin(th),
+                                                          np.cos(th)])
+    offs = np.cumsum(rng.uniform(0.4, 0.6, int(2 * half / 0.5))) - half
+    base = c + nrm * offs[:, None]
+    hb = HatchBatch("scanline")
+    hb.add_offsets(region, c, 37.0, offs, half, 0.8)
+    cases = [(hb.run().lines(),
+              clip_lines(list(np.stack([base - d * half, base + d * half],
+                                       axis=1)), region, 0.8))]
+    for p, a0, a1, r0 in ((np.array([-250.0, 40.0]), -0.6, 0.6, 200.0),
+                          (c, -np.pi, np.pi - 0.01, 0.0)):
+        ths = np.sort(rng.uniform(a0, a1, 600))
+        ray = np.column_stack([np.cos(ths), np.sin(ths)])
+        cases.append((_clip_fan(region, p, ths, r0, 600.0, 0.8),
+                      clip_lines(list(np.stack([p + ray * r0, p + ray * 600],
+                                               axis=1)), region, 0.8)))
+    for got, want in cases:
+        assert len(got) == len(want), (len(got), len(want))
+        for x, y in zip(got, want):
+            assert np.allclose(x, y, atol=1e-7), (x, y)
+    # default: the lines fixed_hatch always built (a float32 angle, as
+    # mosaic_hatch passes, keeps nrm * off in float32), through clip_lines
+    a32 = np.float32(37.0)
+    th = np.deg2rad(a32)
+    d, nrm = np.array([np.cos(th), np.sin(th)]), np.array([-np.sin(th),
+                                                          np.cos(th)])
+    hb = HatchBatch()
+    hb.add_offsets(region, c, a32, offs, half, 0.8)
+    want = clip_lines([np.array([c + nrm * o - d * half,
+                                 c + nrm * o + d * half])
+                       for o in offs.tolist()], region, 0.8)
+    got = hb.run().lines()
+    assert len(got) == len(want)
+    assert all(np.array_equal(x, y) for x, y in zip(got, want))
+    # hatch_many == fixed_hatch per polygon: same draws, same pieces
+    polys = list(region.geoms)[:40]
+    angles = np.arange(len(polys)) * 7.0
+    for clip in ("shapely", "scanline"):
+        many = hatch_many(polys, angles, 0.8, 0.1,
+                          np.random.default_rng(5), clip=clip)
+        rng = np.random.default_rng(5)
+        one = [(i, ln) for i, (p, a) in enumerate(zip(polys, angles))
+               for ln in fixed_hatch(p, a, 0.8, rng, 0.1, clip=clip)]
+        assert (len(many) == len(one)
+                and list(many.tags) == [i for i, _ in one])
+        assert all(np.array_equal(x, y) for x, (_, y) in zip(many, one))
+    print(f"  scanline ok: {sum(len(g) for g, _ in cases)} clipped pieces "
+          f"match shapely; hatch_many == fixed_hatch x{len(polys)}")
+
+
+def simplex() -> None:
+    """engine.simplex returns opensimplex's exact floats (humanize relies
+    on it to keep stored genomes bit-identical), and is much faster."""
+    import time
+    from opensimplex import OpenSimplex
+    from engine.simplex import Simplex2
+    rng = np.random.default_rng(11)
+    x, y = rng.normal(0, 60, 3000), rng.normal(0, 60, 3000)
+    x[:100], y[:100] = np.round(x[:100]), np.round(y[:100])  # cell edges
+    for seed in (0, 85, -3, 2**40 + 7):
+        ref, fast = OpenSimplex(seed), Simplex2(seed)
+        t0 = time.perf_counter()
+        want = np.array([ref.noise2(a, b) for a, b in zip(x, y)])
+        t1 = time.perf_counter()
+        got = fast.noise2(x, y)
+        t2 = time.perf_counter()
+        assert np.array_equal(got, want), (seed, np.abs(got - want).max())
+    # humanize's wobble="field" lattice stays inside its documented bound
+    from engine.humanize import _Lattice
+    u, v = x * 0.13, y * 0.13  # the default wobble_freq
+    lat = _Lattice(fast, 0, 0.1, np.column_stack([u, v]), 0.5)
+    err = np.abs(lat(u, v) - fast.noise2(u, v)).max()
+    assert err <= 0.016, err
+    print(f"  simplex ok: bit-exact vs opensimplex, "
+          f"{(t1 - t0) / (t2 - t1):.0f}x faster on {len(x)} points; "
+          f"wobble lattice max err {err:.4f}")
+
+
+def walkers() -> None:
+    """scribble_fill / curl_fill "tracer": "lockstep": deterministic,
+    inside the band, the serial walkers' ink to within 3%."""
+    import time
+    from engine.photo import clean_mask
+    ctx = load_structure_ctx(FIXTURE, page_size="letter")
+    page = ctx["page"]
+    region, mask = clean_mask(ctx["tone_bands"][2], page)
+    for name in ("scribble_fill", "curl_fill"):
+        ink, dt = {}, {}
+        for tracer in ("serial", "lockstep", "lockstep"):
+            t0 = time.perf_counter()
+            lines = MODULES[name](mask, region, ctx, {"tracer": tracer},
+                                  np.random.default_rng(5))
+            dt[tracer] = time.perf_counter() - t0
+            mm = sum(np.linalg.norm(np.diff(ln, axis=0), axis=1).sum()
+                     for ln in lines)
+            assert ink.setdefault(tracer, mm) == mm, name  # deterministic
+        px = page.mm_to_px(np.concatenate(lines)).astype(int)
+        px = np.clip(px, 0, np.array(mask.shape[::-1]) - 1)  # curls overhang
+        assert mask[px[:, 1], px[:, 0]].mean() > 0.9, name
+        assert abs(ink["lockstep"] / ink["serial"] - 1) < 0.03, (name, ink)
+        print(f"  walkers ok: {name:13s} lockstep "
+              f"{dt['serial'] / dt['lockstep']:.1f}x, "
+              f"ink {ink['lockstep'] / ink['serial']:.3f} of serial")
+
+
+def distance_rings() -> None:
+    """contour_hatch "rings": "distance" on a disk: as many rings as the
+    buffered mode, each at the same radius to within half a pixel."""
+    import shapely
+    ctx = load_structure_ctx(FIXTURE, page_size="letter")
+    page = ctx["page"]
+    h, w = ctx["gray"].shape
+    cx, cy = page.px_to_mm(np.array([[w / 2, h / 2]]))[0]
+    disk = shapely.Point(cx, cy).buffer(40, quad_segs=64)
+    mask = region_to_mask(disk, page, (h, w))
+    rings = {mode: MODULES["contour_hatch"](
+        mask, disk, ctx, {"rings": mode}, np.random.default_rng(2))
+        for mode in ("buffer", "distance")}
+    assert len(rings["buffer"]) == len(rings["distance"])
+    for a, b in zip(rings["buffer"], rings["distance"]):
+        ra, rb = (np.hypot(x[:, 0] - cx, x[:, 1] - cy) for x in (a, b))
+        assert abs(ra.mean() - rb.mean()) < page.mm_per_px / 2
+    print(f"  distance_rings ok: {len(rings['distance'])} rings match "
+          f"the buffered ones")
+
+
+def shingle_raster() -> None:
+    """shingle_hatch "occlusion": "raster": the vector pile's ink to
+    within 2%, for a tenth of its geometry work — vertices fed to
+    shapely's set operations, counted, so the check does not hang on
+    the box's load. The wall time is printed, not asserted."""
+    import time
+    import shapely
+    from shapely.geometry.base import BaseGeometry
+    from engine.photo import clean_mask
+    ctx = load_structure_ctx(FIXTURE, page_size="letter")
+    region, mask = clean_mask(ctx["tone_bands"][1], ctx["page"])
+    work = [0]
+
+    def counted(fn):
+        def op(*args, **kw):
+            work[0] += sum(int(np.sum(shapely.get_num_coordinates(g)))
+                           for g in args
+                           if isinstance(g, (BaseGeometry, list)))
+            return fn(*args, **kw)
+        return op
+
+    ops = {(BaseGeometry, n): getattr(BaseGeometry, n)
+           for n in ("intersection", "difference", "union", "covers")}
+    ops.update({(shapely, n): getattr(shapely, n)
+                for n in ("union_all", "clip_by_rect")})
+    ink, dt, geo = {}, {}, {}
+    try:
+        for (obj, n), fn in ops.items():
+            setattr(obj, n, counted(fn))
+        for occ in ("vector", "raster"):
+            work[0] = 0
+            t0 = time.perf_counter()
+            lines = MODULES["shingle_hatch"](
+                mask, region, ctx, {"occlusion": occ, "swatch_mm": 6.0},
+                np.random.default_rng(4))
+            dt[occ] = time.perf_counter() - t0
+            geo[occ] = work[0]
+            ink[occ] = sum(np.linalg.norm(np.diff(ln, axis=0), axis=1).sum()
+                           for ln in lines)
+    finally:
+        for (obj, n), fn in ops.items():
+            setattr(obj, n, fn)
+    assert abs(ink["raster"] / ink["vector"] - 1) < 0.02, ink
+    assert geo["vector"] >= 10 * geo["raster"], geo
+    print(f"  shingle_raster ok: set-op vertices {geo['vector']} -> "
+          f"{geo['raster']}, ink {ink['raster'] / ink['vector']:.3f} of "
+          f"vector; {dt['vector']:.2f}s -> {dt['raster']:.2f}s")
+
+
+def label_stats() -> None:
+    """LabelStats == the per-label full-frame scans it replaces, bit for
+    bit, before and after a merge."""
+    from engine.labels import LabelStats
+    rng = np.random.default_rng(3)
+    labels = cv2.resize(rng.integers(0, 9, (12, 16)).astype(np.uint8),
+                        (160, 120), interpolation=cv2.INTER_NEAREST
+                        ).astype(np.int32)
+    img = rng.random(labels.shape, dtype=np.float32)
+    lev = rng.integers(0, 4, labels.shape)
+    stats = LabelStats(labels)
+    stats.merge(3, 5)
+    major = stats.majority(lev, 4)
+    for i in range(1, 9):
+        m = labels == i
+        assert stats.area[i] == m.sum(), i
+        if not m.any():
+            continue
+        assert stats.mean(i, img) == img[m].mean(), i
+        t = img[m]
+        assert stats.mean_angle(i, img) == 0.5 * np.arctan2(
+            np.sin(2 * t).mean(), np.cos(2 * t).mean()), i
+        vals, cts = np.unique(lev[m], return_counts=True)
+        assert major[i] == vals[cts.argmax()], i
+    assert not (labels == 3).any()
+    print("  label_stats ok: areas, means, angles, majorities, merge")
+
+
+def tracer_bench() -> None:
+    """Lockstep vs reference streamline tracer on the fixtures: same
+    statistics (lines, ink length). Jobard-Lehrer seeding must lay as
+    much ink with fewer plotter vertices. Timings are printed, not
+    asserted: they swing with the box's load."""
+    import time
+    from engine.field import (trace_streamlines, trace_streamlines_jobard,
+                              trace_streamlines_lockstep)
+    from engine.geom import length
+    for photo in [FIXTURE] + REAL_PHOTOS:
+        ctx = load_structure_ctx(photo)
+        mask = ctx["tone_bands"][2] | ctx["tone_bands"][3]
+        t = time.perf_counter()
+        a = trace_streamlines(mask, ctx, 0.9, np.random.default_rng(1))
+        ta = time.perf_counter() - t
+        t = time.perf_counter()
+        b = trace_streamlines_lockstep(mask, ctx, 0.9,
+                                       np.random.default_rng(1))
+        tb = time.perf_counter() - t
+        la = sum(length(ln) for ln in a)
+        lb = sum(length(ln) for ln in b)
+        assert abs(len(a) - len(b)) <= 0.02 * len(a), (len(a), len(b))
+        assert abs(la - lb) <= 0.02 * la, (la, lb)
+        print(f"  tracer {Path(photo).stem:<20} {len(b):5d} lines "
+              f"{lb:7.0f} mm   serial {ta:5.2f}s  lockstep {tb:5.2f}s  "
+              f"x{ta / tb:.1f}")
+        t = time.perf_counter()
+        c = trace_streamlines_jobard(mask, ctx, 0.9,
+                                     np.random.default_rng(1))
+        tc = time.perf_counter() - t
+        lc = sum(length(ln) for ln in c)
+        va, vc = sum(map(len, a)), sum(map(len, c))
+        assert lc >= 0.95 * la and vc < va, (la, lc, va, vc)
+        print(f"  jobard {Path(photo).stem:<20} {len(c):5d} lines "
+              f"{lc:7.0f} mm   verts {va} -> {vc}  serial {ta:5.2f}s  "
+              f"jobard {tc:5.2f}s")
+
+
+def atlas() -> None:
+    """Streamline atlas: denser sets extend sparser ones, the ink matches
+    the reference tracer's, and a second band reuses the trace."""
+    import time
+    from engine.field import trace_streamlines, trace_streamlines_atlas
+    from engine.geom import length
+    ctx = load_structure_ctx(FIXTURE)
+    mask = ctx["tone_bands"][2] | ctx["tone_bands"][3]
+    t = time.perf_counter()
+    fine = trace_streamlines_atlas(mask, ctx, 0.9)
+    cold = time.perf_counter() - t
+    t = time.perf_counter()
+    coarse = trace_streamlines_atlas(mask, ctx, 1.6)
+    warm = time.perf_counter() - t
+    on_fine = {p.tobytes() for ln in fine for p in ln}
+    assert all(p.tobytes() in on_fine for ln in coarse for p in ln), \
+        "coarse atlas lines are not a subset of the fine ones"
+    ref = trace_streamlines(mask, ctx, 0.9, np.random.default_rng(1))
+    la, lr = (sum(length(ln) for ln in x) for x in (fine, ref))
+    assert abs(la - lr) <= 0.15 * lr, (la, lr)
+    print(f"  atlas ok: {len(fine)} lines {la:.0f} mm (reference "
+          f"{lr:.0f} mm), cold {cold:.2f}s, next band {warm:.3f}s")
 
 
 def real_photo() -> None:
@@ -150,15 +801,61 @@ def pairs() -> None:
             assert 0.2 < ratio < 5.0, f"{gname}/{src}: ink budget x{ratio}"
 
 
+def lod() -> None:
+    """render(lod=2): half the lines, same lines every time, and a
+    thumbnail (pens widened to match) whose tone fidelity tracks the
+    full-detail thumbnail's."""
+    import tempfile
+    from evolve.preview import render_thumb
+    from evolve.tonecheck import tone_fidelity
+    genome = json.loads((Path(__file__).parent.parent / "genomes" /
+                         "classic_ink.json").read_text())
+    a, _ = render(genome, 42, photo_path=FIXTURE, lod=2.0, memo=False)
+    b, _ = render(genome, 42, photo_path=FIXTURE, lod=2.0, memo=False)
+    assert a.keys() == b.keys() and all(
+        len(a[p]) == len(b[p]) and all(np.array_equal(x, y)
+                                       for x, y in zip(a[p], b[p]))
+        for p in a), "lod render not deterministic"
+    with tempfile.TemporaryDirectory() as td:
+        full = render_thumb(genome, 42, FIXTURE, Path(td) / "full.png")
+        thin = render_thumb(genome, 42, FIXTURE, Path(td) / "lod.png",
+                            lod=2.0)
+        tf_full, _ = tone_fidelity(str(full), FIXTURE)
+        tf_lod, _ = tone_fidelity(str(thin), FIXTURE)
+    assert abs(tf_lod - tf_full) <= 0.08, (tf_full, tf_lod)
+    print(f"  lod ok: deterministic, tone fidelity {tf_lod:.3f} at lod 2 "
+          f"vs {tf_full:.3f} full")
+
+
 if __name__ == "__main__":
     print("module smoke tests:")
     smoke()
     print("golden test:")
     golden()
+    ctx_cache()
+    lazy_ctx()
+    pyramid()
+    tiled()
+    region_memo()
+    crop()
+    profile()
+    batch()
+    fused()
+    scanline()
+    simplex()
+    walkers()
+    distance_rings()
+    shingle_raster()
+    label_stats()
+    print("tracer benchmark:")
+    tracer_bench()
+    atlas()
     print("real-photo benchmark:")
     real_photo()
     print("pair benchmark (render vs human ink, same photo):")
     pairs()
+    print("level of detail:")
+    lod()
     import test_evolve
     print("evolve tests:")
     test_evolve.store_roundtrip()
@@ -15,21 +15,25 @@ import numpy as np
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from engine.inkmap import ink_map        # noqa: E402
+from engine.inkmap import InkCanvas      # noqa: E402
+from engine.plan import arrangement_score, compile_plan  # noqa: E402
 from engine.render import render         # noqa: E402
 from engine.render import _structure_ctx  # noqa: E402
 
 
 def check(genome: dict, photo: str, seed: int = 42):
-    layers, page = render(genome, seed, photo_path=photo)
-    ctx = _structure_ctx(genome, photo)
-    masses = ctx.get("plan_masses")
-    levels = ctx.get("plan_levels")
-    if masses is None:
+    if not genome.get("plan"):
         print("no compiled plan in genome — nothing to check")
         return []
+    layers, page = render(genome, seed, photo_path=photo)
+    # plan state lives in each render's private ctx view; compilation is
+    # deterministic, so recompiling on a fresh view reproduces it exactly
+    ctx = _structure_ctx(genome, photo)
+    compile_plan(genome["plan"], ctx)
+    masses, levels = ctx["plan_masses"], ctx["plan_levels"]
     targets = genome["plan"].get("assign", {}).get("targets", [])
-    cov = ink_map(layers, page, ctx["gray"].shape)
+    canvas = InkCanvas(page, ctx["gray"].shape, layers=layers)
+    cov = canvas.coverage
     rows = []
     print(f"{'mass':>5} {'lvl':>3} {'target':>7} {'achieved':>9} "
           f"{'ratio':>6}  verdict")
@@ -51,7 +55,8 @@ def check(genome: dict, photo: str, seed: int = 42):
               f"{ratio:>6.2f}  {verdict}")
     bad = [r for r in rows if r["verdict"] != "ok"]
     print(f"\n{len(rows) - len(bad)}/{len(rows)} masses deliver their "
-          f"promised value")
+          f"promised value; arrangement score "
+          f"{arrangement_score(canvas, ctx):.2f}")
     return rows
 
 